@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Shared Agent Runtime for All Entry Points
+API key check, model client and the chat agent, built on first use
+
+app.py, gradio_app.py, app_multiagent.py, web-chat/server.py and the day1a /
+day1b scripts all start the same way: check GOOGLE_API_KEY, create the
+retrying Gemini client and (mostly) the same helpful_assistant agent. They
+do it through this module, which imports google.adk only when a model or
+agent is actually built - combined with RunnerPool's on-demand runners, an
+entry point can serve its UI or health check before any agent exists.
+
+    require_api_key()                          # cheap, fails fast
+    runner = RunnerPool(build_chat_agent, "chat")
+    ...                                        # first request builds the agent
+
+benchmark_startup.py tracks import time and time to first use of every
+entry point.
+"""
+
+import os
+import functools
+
+MODEL_NAME = "gemini-2.5-flash-lite"
+
+CHAT_AGENT_DESCRIPTION = "A helpful AI assistant that can answer questions and search the web."
+CHAT_AGENT_INSTRUCTION = """You are a helpful and friendly AI assistant.
+    Use Google Search for current information, news, weather, or any time-sensitive queries.
+    Provide clear, concise, and accurate responses.
+    Be conversational and engaging.
+    Format your responses nicely with markdown when appropriate."""
+
+
+def require_api_key(hint="Set it with: export GOOGLE_API_KEY=your-key"):
+    """Return GOOGLE_API_KEY (or the first of GOOGLE_API_KEYS), raising ValueError if it is missing"""
+    api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEYS", "").split(",")[0].partition(":")[0].strip()
+    if not api_key:
+        raise ValueError(f"GOOGLE_API_KEY environment variable is required.\n{hint}")
+
+    os.environ["GOOGLE_API_KEY"] = api_key
+    os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "FALSE"
+    return api_key
+
+
+@functools.lru_cache(maxsize=None)
+def get_model():
+    """The process-wide retrying, circuit-broken model (see resilience.py).
+
+    Its calls go out through the key/model pool (see model_pool.py), with a
+    pooled HTTP client per key shared by every runner (see model_client.py).
+    """
+    from resilience import resilient_model
+
+    return resilient_model(MODEL_NAME)
+
+
+def build_chat_agent(model=None, tools=None, **overrides):
+    """A fresh helpful_assistant agent with Google Search.
+
+    Keyword arguments override the Agent fields (instruction, callbacks, ...).
+    """
+    from google.adk.agents import Agent
+    from google.adk.tools import google_search
+
+    fields = {
+        "name": "helpful_assistant",
+        "description": CHAT_AGENT_DESCRIPTION,
+        "instruction": CHAT_AGENT_INSTRUCTION,
+        **overrides,
+    }
+    return Agent(
+        model=model or get_model(),
+        tools=[google_search] if tools is None else tools,
+        **fields,
+    )
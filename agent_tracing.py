@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Structured Event Tracing for ADK Runners
+Captures every event of an agent run into a fixed-size ring buffer
+
+run_traced() is a drop-in replacement for runner.run_debug(): it drives
+runner.run_async() directly, timestamps each event as it arrives and keeps a
+compact record of it (agent, event type, tool call/response sizes, token
+usage, start/end time), plus the token usage of every model call of the
+run, AgentTool sub-agents included (trace["model_calls"], see
+usage_accounting.py). Only the last TRACE_BUFFER_SIZE runs are kept, so
+memory is bounded and the per-event cost is a handful of dict writes - cheap
+enough to leave on.
+
+The buffer is exposed by GET /api/traces (web-chat/server.py) and the
+Traces tab of app_multiagent.py.
+
+The run itself executes on MODEL_LOOP (see model_client.py), so every run in
+the process shares one model client and its pooled connections. Runs can be
+captured with cProfile on demand (REQUEST_PROFILER, see profiling.py).
+"""
+
+import os
+import time
+import asyncio
+import itertools
+import threading
+from collections import deque
+
+from resilience import DeadlineExceeded, deadline_scope
+from model_client import MODEL_LOOP
+from profiling import REQUEST_PROFILER
+from degrade import current_profile
+from telemetry import start_run_span, end_run_span, trace as otel_trace
+from usage_accounting import collect_model_calls, track_model_usage
+
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+
+# Same defaults as runner.run_debug() so traced runs keep sharing its session
+DEFAULT_USER_ID = "debug_user_id"
+DEFAULT_SESSION_ID = "debug_session_id"
+
+
+class TraceBuffer:
+    """Thread-safe ring buffer holding the most recent traces"""
+
+    def __init__(self, capacity=TRACE_BUFFER_SIZE):
+        self.capacity = capacity
+        self._traces = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def add(self, trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def recent(self, limit=20):
+        """Return up to `limit` traces, newest first"""
+        with self._lock:
+            traces = list(self._traces)
+        return traces[::-1][:max(limit, 0)]
+
+    def __len__(self):
+        return len(self._traces)
+
+
+TRACES = TraceBuffer()
+_trace_ids = itertools.count(1)
+
+
+def _event_type(event):
+    if event.get_function_calls():
+        return "tool_call"
+    if event.get_function_responses():
+        return "tool_response"
+    if event.partial:
+        return "partial"
+    if event.content and event.content.parts:
+        return "final" if event.is_final_response() else "text"
+    return "state"
+
+
+def summarize_event(event, started, ended, run_started):
+    """Build the compact record stored for one event"""
+    record = {
+        "agent": event.author,
+        "type": _event_type(event),
+        "start_ms": round((started - run_started) * 1000, 1),
+        "end_ms": round((ended - run_started) * 1000, 1),
+    }
+
+    calls = event.get_function_calls()
+    if calls:
+        record["tool_calls"] = [
+            {"name": call.name, "args_chars": len(str(call.args or {}))} for call in calls
+        ]
+
+    responses = event.get_function_responses()
+    if responses:
+        record["tool_responses"] = [
+            {"name": response.name, "response_chars": len(str(response.response or {}))}
+            for response in responses
+        ]
+
+    usage = event.usage_metadata
+    # Streamed chunks repeat the usage of the final, aggregated event
+    if usage and not event.partial:
+        record["prompt_tokens"] = usage.prompt_token_count or 0
+        record["completion_tokens"] = usage.candidates_token_count or 0
+
+    if event.content and event.content.parts:
+        text_chars = sum(len(part.text) for part in event.content.parts if part.text)
+        if text_chars:
+            record["text_chars"] = text_chars
+
+    return record
+
+
+async def ensure_session(runner, user_id, session_id):
+    """Return the runner's session, creating it on first use"""
+    session = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id=user_id, session_id=session_id
+    )
+    if session is None:
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name, user_id=user_id, session_id=session_id
+        )
+    return session
+
+
+async def discard_session(runner, user_id, session_id):
+    """Delete a one-off session once its run is over, so sessions don't pile up"""
+    await runner.session_service.delete_session(
+        app_name=runner.app_name, user_id=user_id, session_id=session_id
+    )
+
+
+def partial_text(events):
+    """Best output of an unfinished run: the latest text of each agent, in order"""
+    latest = {}
+    for event in events:
+        if event.author == "user" or event.partial or not (event.content and event.content.parts):
+            continue
+        text = "".join(part.text for part in event.content.parts if part.text)
+        if text:
+            latest[event.author] = text
+
+    if len(latest) <= 1:
+        return next(iter(latest.values()), "")
+    return "\n\n".join(f"**{author}:**\n{text}" for author, text in latest.items())
+
+
+def final_text(events):
+    """Text of the last final response of a run - the pipeline's output"""
+    for event in reversed(events):
+        if event.is_final_response() and event.content and event.content.parts:
+            text = "".join(part.text for part in event.content.parts if part.text)
+            if text:
+                return text
+    return ""
+
+
+def timed_out_text(events):
+    """User-facing text for a run that hit its deadline"""
+    partial = partial_text(events)
+    if not partial:
+        return "⏱️ Sorry, this request ran out of time before producing any results. Please try again."
+    return f"{partial}\n\n---\n⏱️ *Time limit reached - showing partial results.*"
+
+
+async def run_traced(runner, message, pipeline, user_id=DEFAULT_USER_ID,
+                     session_id=DEFAULT_SESSION_ID, buffer=TRACES, timeout=None, on_event=None,
+                     run_config=None):
+    """Run `message` through `runner`, recording a trace of every event.
+
+    Returns (events, trace). With a `timeout` (seconds) the deadline is
+    propagated to every sub-agent and model call; when it passes, remaining
+    work is cancelled and the events gathered so far are returned with
+    trace["status"] == "deadline_exceeded" (see partial_text()).
+
+    `on_event`, if given, is called with each event as it arrives (on the
+    caller's event loop), so callers can show progress before the run has finished. Pass a streaming
+    `run_config` to also receive the partial (chunk) events of model responses.
+
+    The trace is added to `buffer` whether the run succeeds, fails or is cancelled.
+    """
+    await ensure_session(runner, user_id, session_id)
+
+    trace = {
+        "trace_id": next(_trace_ids),
+        "pipeline": pipeline,
+        "started_at": time.time(),
+        "input_chars": len(message),
+        "timeout_s": timeout,
+        "status": "running",
+        "events": [],
+        "model_calls": [],
+    }
+    events = []
+    run_started = time.perf_counter()
+
+    track_model_usage(runner.agent)
+    run_kwargs = {} if run_config is None else {"run_config": run_config}
+    if on_event is not None:
+        on_event = MODEL_LOOP.relay(on_event)
+    from google.genai import types  # deferred: slow to import, and only needed once a run starts
+
+    async def consume():
+        last = run_started
+        with REQUEST_PROFILER.capture(pipeline), collect_model_calls(trace["model_calls"]):
+            async for event in runner.run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=types.Content(role="user", parts=[types.Part(text=message)]),
+                **run_kwargs,
+            ):
+                now = time.perf_counter()
+                trace["events"].append(summarize_event(event, last, now, run_started))
+                events.append(event)
+                last = now
+                if on_event is not None:
+                    on_event(event)
+
+    span = start_run_span(pipeline, {"app.timeout_s": timeout or 0, "app.degrade_profile": current_profile()["name"]})
+    try:
+        # The span context is copied onto the model loop with the run, so ADK's
+        # agent, model and tool spans become its children
+        with deadline_scope(timeout), otel_trace.use_span(
+            span, end_on_exit=False, record_exception=False, set_status_on_exception=False
+        ):
+            if timeout is None:
+                await MODEL_LOOP.run_async(consume())
+            else:
+                await asyncio.wait_for(MODEL_LOOP.run_async(consume()), timeout)
+        trace["status"] = "ok"
+    except (asyncio.TimeoutError, DeadlineExceeded) as e:
+        if timeout is None:
+            trace["status"] = "error"
+            trace["error"] = f"{type(e).__name__}: {e}"
+            raise
+        trace["status"] = "deadline_exceeded"
+    except asyncio.CancelledError:
+        trace["status"] = "cancelled"
+        raise
+    except BaseException as e:
+        trace["status"] = "error"
+        trace["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        trace["duration_ms"] = round((time.perf_counter() - run_started) * 1000, 1)
+        buffer.add(trace)
+        end_run_span(span, trace)
+
+    return events, trace
@@ -12,26 +12,42 @@ Features:
   * Parallel Research (Parallel agents with aggregation)
 """
 
-import os
+import re
+import time
+import uuid
 import asyncio
+import tempfile
 import gradio as gr
-from google.adk.agents import Agent, SequentialAgent, ParallelAgent
-from google.adk.runners import InMemoryRunner
-from google.adk.tools import AgentTool, google_search
-
-# Get API key from environment (required for Hugging Face Spaces)
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-
-if not GOOGLE_API_KEY:
-    raise ValueError(
-        "GOOGLE_API_KEY environment variable is required.\n"
-        "For Hugging Face Spaces: Add it as a secret in Space settings.\n"
-        "For local development: Set it with 'export GOOGLE_API_KEY=your-key'"
-    )
 
-# Set up environment
-os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
-os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "FALSE"
+from agent_runtime import MODEL_NAME, build_chat_agent, get_model, require_api_key
+from agent_tracing import (
+    DEFAULT_USER_ID,
+    TRACES,
+    discard_session,
+    final_text,
+    run_traced,
+    timed_out_text,
+)
+from usage_accounting import USAGE, format_usage
+from resilience import PIPELINE_TIMEOUTS, CircuitOpenError
+from cancellation import CANCELLATIONS, run_cancellable
+from scheduler import SCHEDULER, run_in_lane
+from degrade import DEGRADE, degrade_model_callback, degrade_scope
+from archive import ARCHIVE, collect_state
+from chat_session import abandon_conversation, end_conversation, new_conversation, stream_chat_turn
+from runner_pool import RunnerPool, lease_runner
+from warmup import READINESS, start_warm_up, until_ready
+from model_client import CONNECTIONS
+from model_pool import model_pool
+from client_limits import CLIENT_LIMITS, gradio_client_id, limited_message
+from profiling import ADMIN_TOKEN, REQUEST_PROFILER, ProfilerBusy, admin_authorized, sample_profile
+from telemetry import end_span, in_span, record_cache_hit, start_request_span
+
+# Fail fast without an API key (required for Hugging Face Spaces)
+require_api_key(
+    "For Hugging Face Spaces: Add it as a secret in Space settings.\n"
+    "For local development: Set it with 'export GOOGLE_API_KEY=your-key'"
+)
 
 print("=" * 80)
 print("🚀 AI Multi-Agent Chat - Gradio Interface")
@@ -42,20 +58,14 @@ print("=" * 80)
 # SIMPLE AGENT (Day 1A)
 # ============================================================================
 
-simple_agent = Agent(
-    name="helpful_assistant",
-    model="gemini-2.5-flash-lite",
-    description="A helpful AI assistant that can answer questions and search the web.",
-    instruction="""You are a helpful and friendly AI assistant.
-    Use Google Search for current information, news, weather, or any time-sensitive queries.
-    Provide clear, concise, and accurate responses.
-    Be conversational and engaging.
-    Format your responses nicely with markdown when appropriate.""",
-    tools=[google_search],
-)
+def build_simple_agent():
+    return build_chat_agent(before_model_callback=degrade_model_callback)
 
-simple_runner = InMemoryRunner(agent=simple_agent)
-print("✅ Simple Agent initialized")
+
+# Pool of runners: concurrent chats are spread over them (see runner_pool.py)
+# Agents are built (and google.adk imported) when a runner is first needed
+simple_runner = RunnerPool(build_simple_agent, "chat")
+print(f"✅ Simple Agent ready (model: {MODEL_NAME})")
 
 
 # ============================================================================
@@ -64,21 +74,25 @@ print("✅ Simple Agent initialized")
 
 # 1. Research & Summarization System (Sequential workflow)
 def build_research_system():
+    from google.adk.agents import Agent, SequentialAgent
+    from google.adk.tools import google_search
+
     research_agent = Agent(
         name="ResearchAgent",
-        model="gemini-2.5-flash-lite",
+        model=get_model(),
         instruction="""You are a specialized research agent.
         Research the given topic thoroughly using google_search.
         Find 3-5 pieces of relevant, current information.
         Present your findings in a clear, structured format with sources.
         Include key facts, statistics, and developments.""",
         tools=[google_search],
+        before_model_callback=degrade_model_callback,
         output_key="research_findings",
     )
 
     summarizer_agent = Agent(
         name="SummarizerAgent",
-        model="gemini-2.5-flash-lite",
+        model=get_model(),
         instruction="""Read the research findings provided below and create a concise executive summary.
 
 Research Findings:
@@ -106,9 +120,11 @@ Format your output in proper markdown.""",
 
 # 2. Blog Pipeline (Sequential agents)
 def build_blog_pipeline():
+    from google.adk.agents import Agent, SequentialAgent
+
     outline_agent = Agent(
         name="OutlineAgent",
-        model="gemini-2.5-flash-lite",
+        model=get_model(),
         instruction="""Create a blog outline for the given topic with:
         1. A catchy headline
         2. An introduction hook
@@ -119,7 +135,7 @@ def build_blog_pipeline():
 
     writer_agent = Agent(
         name="WriterAgent",
-        model="gemini-2.5-flash-lite",
+        model=get_model(),
         instruction="""Following this outline strictly: {blog_outline}
         Write a brief, 200 to 300-word blog post with an engaging and informative tone.""",
         output_key="blog_draft",
@@ -127,7 +143,7 @@ def build_blog_pipeline():
 
     editor_agent = Agent(
         name="EditorAgent",
-        model="gemini-2.5-flash-lite",
+        model=get_model(),
         instruction="""Edit this draft: {blog_draft}
         Your task is to polish the text by fixing any grammatical errors,
         improving the flow and sentence structure, and enhancing overall clarity.
@@ -145,36 +161,42 @@ def build_blog_pipeline():
 
 # 3. Parallel Research System
 def build_parallel_research():
+    from google.adk.agents import Agent, ParallelAgent, SequentialAgent
+    from google.adk.tools import google_search
+
     tech_researcher = Agent(
         name="TechResearcher",
-        model="gemini-2.5-flash-lite",
+        model=get_model(),
         instruction="""Research the latest AI/ML trends. Include 3 key developments,
         the main companies involved, and the potential impact. Keep the report very concise (100 words).""",
         tools=[google_search],
+        before_model_callback=degrade_model_callback,
         output_key="tech_research",
     )
 
     health_researcher = Agent(
         name="HealthResearcher",
-        model="gemini-2.5-flash-lite",
+        model=get_model(),
         instruction="""Research recent medical breakthroughs. Include 3 significant advances,
         their practical applications, and estimated timelines. Keep the report concise (100 words).""",
         tools=[google_search],
+        before_model_callback=degrade_model_callback,
         output_key="health_research",
     )
 
     finance_researcher = Agent(
         name="FinanceResearcher",
-        model="gemini-2.5-flash-lite",
+        model=get_model(),
         instruction="""Research current fintech trends. Include 3 key trends,
         their market implications, and the future outlook. Keep the report concise (100 words).""",
         tools=[google_search],
+        before_model_callback=degrade_model_callback,
         output_key="finance_research",
     )
 
     aggregator_agent = Agent(
         name="AggregatorAgent",
-        model="gemini-2.5-flash-lite",
+        model=get_model(),
         instruction="""Combine these three research findings into a single executive summary:
 
         **Technology Trends:**
@@ -205,17 +227,18 @@ def build_parallel_research():
 
 
 # Initialize multi-agent systems
-research_system = build_research_system()
-blog_pipeline = build_blog_pipeline()
-parallel_research = build_parallel_research()
-
-research_runner = InMemoryRunner(agent=research_system)
-blog_runner = InMemoryRunner(agent=blog_pipeline)
-parallel_runner = InMemoryRunner(agent=parallel_research)
-
-print("✅ Research System initialized")
-print("✅ Blog Pipeline initialized")
-print("✅ Parallel Research System initialized")
+# (one pool per pipeline; every pooled runner gets its own agent tree)
+research_runner = RunnerPool(build_research_system, "research")
+blog_runner = RunnerPool(build_blog_pipeline, "blog")
+# Briefings get no pool: their agent tree depends on the user's topics (and the
+# degrade profile), so parallel_chat() builds a one-off runner per request -
+# pooled runners keyed by topics would pile up and hardly ever be reused.
+
+RUNNER_POOLS = [simple_runner, research_runner, blog_runner]
+
+print("✅ Research System ready")
+print("✅ Blog Pipeline ready")
+print("✅ Parallel Research System ready (built per request)")
 print("=" * 80)
 
 
@@ -223,124 +246,244 @@ print("=" * 80)
 # HELPER FUNCTIONS
 # ============================================================================
 
-def run_agent_query(runner, message):
-    """Run an agent query and return the response"""
+def degrade_notice(profile):
+    """Footnote for answers produced under a degraded profile"""
+    if profile["name"] == "normal":
+        return ""
+    search = "" if profile["search"] else " without web search"
+    return f"\n\n---\n🐢 *High load: this is a shorter answer{search}.*"
+
+
+async def run_agent_query(runner, message, pipeline, on_event=None, profile=None, archive_topic=None):
+    """Run an agent query and return (response text, usage summary or None).
+
+    The run is traced and its token usage accounted under `pipeline`, and it is
+    bounded by the pipeline's deadline: on timeout the best partial output is returned.
+    The run itself executes on the shared model loop (run_traced() hands it to
+    MODEL_LOOP.run_async()); only this coroutine waits on Gradio's event loop.
+    Cancelling the Gradio event (Clear Chat, closed tab) cancels that wait, and
+    through asyncio.wrap_future() the run's task on the model loop, with every
+    sub-agent task under it.
+    `on_event` is passed to run_traced() to observe events as they arrive.
+
+    The run is pinned to `profile`, by default the degrade profile picked for
+    the current queue depth and recent latency. With an `archive_topic` the
+    pipeline output and its output_key values are archived (see archived_result()),
+    unless the run was degraded.
+
+    `runner` may be a RunnerPool; each query gets its own session (deleted
+    afterwards), so concurrent runs never share output_key state.
+    """
+    timeout = PIPELINE_TIMEOUTS.get(pipeline)
+    profile = profile or DEGRADE.update(SCHEDULER.queue_depth())
+    session_id = f"{pipeline}-{uuid.uuid4().hex}"
     try:
-        # Try to get the current event loop, create new one if needed
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_closed():
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        # Run the query
-        if loop.is_running():
-            # If loop is already running (in async context), use run_in_executor
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                response = pool.submit(
-                    lambda: asyncio.run(runner.run_debug(message))
-                ).result()
+        with lease_runner(runner) as leased, degrade_scope(profile):
+            try:
+                response, trace = await run_cancellable(
+                    run_traced(
+                        leased, message, pipeline,
+                        session_id=session_id, timeout=timeout, on_event=on_event,
+                    ),
+                    pipeline=pipeline,
+                )
+            finally:
+                await discard_session(leased, DEFAULT_USER_ID, session_id)
+        usage = USAGE.record(trace)
+        DEGRADE.observe_latency(trace["duration_ms"] / 1000, pipeline)
+
+        if trace["status"] == "deadline_exceeded":
+            return timed_out_text(response), usage
+
+        text = final_text(response)
+        if text:
+            # Degraded (shorter, search-less) answers are not served to later requests
+            if archive_topic and profile["name"] == "normal":
+                ARCHIVE.add(
+                    pipeline, archive_topic, message, text,
+                    state=collect_state(response),
+                    profile=profile["name"],
+                    duration_ms=trace["duration_ms"],
+                )
+            return text + degrade_notice(profile), usage
         else:
-            response = loop.run_until_complete(runner.run_debug(message))
+            return "❌ Sorry, I couldn't generate a response. Please try again.", usage
 
-        if response and len(response) > 0:
-            return response[0].content.parts[0].text
-        else:
-            return "❌ Sorry, I couldn't generate a response. Please try again."
+    except CircuitOpenError as e:
+        print(f"⏳ {str(e)}")
+        return f"⏳ The AI service is temporarily unavailable. Please try again in {e.retry_after:.0f}s.", None
 
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         import traceback
         traceback.print_exc()
-        return f"❌ Error: {str(e)}"
+        return f"❌ Error: {str(e)}", None
 
 
-# ============================================================================
-# GRADIO INTERFACE FUNCTIONS
-# ============================================================================
+def archived_result(pipeline, topic, regenerate=False):
+    """(output, status) of a recent archived run for the same topic, or None.
 
-def simple_chat(message, history):
-    """Simple chat with single agent"""
-    if not message or not message.strip():
-        return ""
+    Lets the tabs answer a repeated topic instantly instead of rerunning the pipeline.
+    """
+    if regenerate:
+        return None
+    started_ns = time.time_ns()
+    record = ARCHIVE.find_recent(pipeline, topic)
+    if record is None:
+        return None
+    record_cache_hit(pipeline, "gradio", "archive", started_ns)
+    minutes = (time.time() - record["created_at"]) / 60
+    age = f"{minutes:.0f} min" if minutes < 90 else f"{minutes / 60:.1f} h"
+    return record["output"], f"📦 Served from the archive (generated {age} ago). Tick \"Regenerate\" for a fresh run."
 
-    bot_message = run_agent_query(simple_runner, message)
-    return bot_message
 
+async def run_in_traced_lane(lane, work):
+    """run_in_lane() under a root span for the request, recording how long it queued
 
-def research_chat(topic):
-    """Research & Summarization demo"""
-    if not topic or not topic.strip():
-        return "Please enter a research topic."
+    The span is only current while `work` runs (see telemetry.in_span()) -
+    an async generator can't keep it current across its own yields.
+    """
+    span = start_request_span(lane, "gradio")
+    queued_ns = time.time_ns()
 
-    return run_agent_query(research_runner, topic)
+    def traced_work():
+        span.set_attribute("app.queue_wait_ms", round((time.time_ns() - queued_ns) / 1e6, 1))
+        return in_span(span, work())
 
+    error = None
+    try:
+        async for item in run_in_lane(SCHEDULER, lane, traced_work):
+            yield item
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        end_span(span, error)
+
+
+async def run_with_queue_status(lane, work, done_message):
+    """Run `work` in its scheduler lane, streaming queue position and ETA to the status box.
+
+    Async generator of (output, status) updates for the Gradio *_with_status
+    handlers; `work` is a coroutine factory returning (text, usage summary or None).
+    While the app is still warming up, the work waits for it first.
+    """
+    async for status in until_ready():
+        yield gr.update(), status
+    async for result, status in run_in_traced_lane(lane, work):
+        if result is None:
+            yield gr.update(), status
+        else:
+            text, usage = result
+            yield text, f"{done_message}\n{format_usage(usage)}".strip()
+
+
+# ============================================================================
+# GRADIO INTERFACE FUNCTIONS
+# ============================================================================
 
-def blog_chat(topic):
-    """Blog Pipeline demo"""
+async def simple_chat(message, conversation):
+    """Simple chat with single agent - async generator of chat windows as the reply streams in.
+
+    The conversation is kept server-side (chat_session.py), so each turn only
+    sends the new message up and the new reply down.
+    """
+    # Chat has its own high-weight lane, so briefings can't starve it
+    async with SCHEDULER.slot("chat"):
+        profile = DEGRADE.update(SCHEDULER.queue_depth())
+        started = time.perf_counter()
+        with simple_runner.lease() as runner:
+            async for window in stream_chat_turn(
+                runner, conversation, message,
+                scope=degrade_scope(profile), suffix=degrade_notice(profile),
+            ):
+                yield window
+        DEGRADE.observe_latency(time.perf_counter() - started)
+
+
+async def research_chat(topic):
+    """Research & Summarization demo - returns (summary, usage summary or None)"""
     if not topic or not topic.strip():
-        return "Please enter a blog topic."
+        return "Please enter a research topic.", None
 
-    return run_agent_query(blog_runner, f"Write a blog post about {topic}")
+    return await run_agent_query(research_runner, topic, "research", archive_topic=topic)
 
 
-def parallel_chat(briefing_type):
-    """Parallel Research demo - dynamically build agents based on topics"""
-    if not briefing_type or not briefing_type.strip():
-        return "Please select briefing topics."
+async def blog_chat(topic):
+    """Blog Pipeline demo - returns (blog post, usage summary or None)"""
+    if not topic or not topic.strip():
+        return "Please enter a blog topic.", None
+
+    return await run_agent_query(blog_runner, f"Write a blog post about {topic}", "blog", archive_topic=topic)
+
 
+def parse_briefing_topics(briefing_type):
+    """Split the briefing input into topics - returns (topics, error message or None)"""
     # Parse the topics - handle both "," and " and " separators
     topics_str = briefing_type.replace(" and ", ", ")
     topics = [t.strip() for t in topics_str.split(",") if t.strip()]
 
     if len(topics) != 3:
-        return f"Please provide exactly 3 topics separated by commas. Got {len(topics)} topics."
-
-    # Clean topic names to create valid agent names (remove spaces, special chars)
-    def clean_agent_name(topic):
-        # Remove special characters and replace spaces with underscores
-        import re
-        clean = re.sub(r'[^a-zA-Z0-9_]', '_', topic)
-        # Ensure it starts with a letter
-        if clean and not clean[0].isalpha():
-            clean = 'Topic_' + clean
-        return clean
-
-    # Build dynamic parallel research system
+        return topics, f"Please provide exactly 3 topics separated by commas. Got {len(topics)} topics."
+    return topics, None
+
+
+def clean_agent_name(topic):
+    """Turn a topic into a valid agent name (remove spaces, special chars)"""
+    # Remove special characters and replace spaces with underscores
+    clean = re.sub(r'[^a-zA-Z0-9_]', '_', topic)
+    # Ensure it starts with a letter
+    if clean and not clean[0].isalpha():
+        clean = 'Topic_' + clean
+    return clean
+
+
+def researcher_name(topic):
+    return f"{clean_agent_name(topic)}_Researcher"
+
+
+def build_briefing_system(topics, profile):
+    """Build the dynamic parallel research system for three topics.
+
+    Word targets come from the degrade `profile`, so briefings get shorter under load.
+    """
+    from google.adk.agents import Agent, ParallelAgent, SequentialAgent
+    from google.adk.tools import google_search
+
+    research_words = profile["research_words"]
     agent1 = Agent(
-        name=f"{clean_agent_name(topics[0])}_Researcher",
-        model="gemini-2.5-flash-lite",
+        name=researcher_name(topics[0]),
+        model=get_model(),
         instruction=f"""Research the latest trends in {topics[0]}. Include 3 key developments,
-        the main companies/organizations involved, and the potential impact. Keep the report concise (100-150 words).""",
+        the main companies/organizations involved, and the potential impact. Keep the report concise ({research_words} words).""",
         tools=[google_search],
+        before_model_callback=degrade_model_callback,
         output_key=f"research_1",
     )
 
     agent2 = Agent(
-        name=f"{clean_agent_name(topics[1])}_Researcher",
-        model="gemini-2.5-flash-lite",
+        name=researcher_name(topics[1]),
+        model=get_model(),
         instruction=f"""Research recent developments in {topics[1]}. Include 3 significant advances,
-        their practical applications, and estimated timelines. Keep the report concise (100-150 words).""",
+        their practical applications, and estimated timelines. Keep the report concise ({research_words} words).""",
         tools=[google_search],
+        before_model_callback=degrade_model_callback,
         output_key=f"research_2",
     )
 
     agent3 = Agent(
-        name=f"{clean_agent_name(topics[2])}_Researcher",
-        model="gemini-2.5-flash-lite",
+        name=researcher_name(topics[2]),
+        model=get_model(),
         instruction=f"""Research current trends in {topics[2]}. Include 3 key trends,
-        their market implications, and the future outlook. Keep the report concise (100-150 words).""",
+        their market implications, and the future outlook. Keep the report concise ({research_words} words).""",
         tools=[google_search],
+        before_model_callback=degrade_model_callback,
         output_key=f"research_3",
     )
 
     aggregator = Agent(
         name="AggregatorAgent",
-        model="gemini-2.5-flash-lite",
+        model=get_model(),
         instruction=f"""Combine these three research findings into a single executive summary:
 
         **{topics[0]} Trends:**
@@ -354,7 +497,7 @@ def parallel_chat(briefing_type):
 
         Your summary should highlight common themes, surprising connections, and the most important
         key takeaways from all three reports. Format your output in clear markdown with headers and bullet points.
-        The final summary should be around 250-300 words.""",
+        The final summary should be around {profile["summary_words"]} words.""",
         output_key="executive_summary",
     )
 
@@ -363,15 +506,125 @@ def parallel_chat(briefing_type):
         sub_agents=[agent1, agent2, agent3],
     )
 
-    dynamic_system = SequentialAgent(
+    return SequentialAgent(
         name="DynamicResearchSystem",
         sub_agents=[parallel_team, aggregator],
     )
 
-    dynamic_runner = InMemoryRunner(agent=dynamic_system)
+
+async def parallel_chat(briefing_type, on_event=None):
+    """Parallel Research demo - dynamically build agents based on topics.
+
+    Returns (executive summary, usage summary or None).
+    """
+    from google.adk.runners import InMemoryRunner
+
+    if not briefing_type or not briefing_type.strip():
+        return "Please select briefing topics.", None
+
+    topics, error = parse_briefing_topics(briefing_type)
+    if error:
+        return error, None
+
+    # Build dynamic parallel research system, sized for the current load
+    profile = DEGRADE.update(SCHEDULER.queue_depth())
+    dynamic_runner = InMemoryRunner(agent=build_briefing_system(topics, profile))
 
     query = f"Generate an executive briefing on {briefing_type}"
-    return run_agent_query(dynamic_runner, query)
+    return await run_agent_query(
+        dynamic_runner, query, "briefing", on_event=on_event, profile=profile, archive_topic=briefing_type
+    )
+
+
+class BriefingProgress:
+    """Collects each researcher's section as its branch of the briefing finishes"""
+
+    def __init__(self, topics):
+        self.started = time.perf_counter()
+        self.topics = {researcher_name(topic): topic for topic in topics}
+        self.sections = {}
+        self.summary = None
+        self.summary_seconds = None
+
+    def observe(self, event):
+        """Record a finished branch or the final summary; returns True if the view changed"""
+        if event.partial or not event.is_final_response() or not (event.content and event.content.parts):
+            return False
+        text = "".join(part.text for part in event.content.parts if part.text)
+        if not text:
+            return False
+        elapsed = time.perf_counter() - self.started
+        if event.author in self.topics and event.author not in self.sections:
+            self.sections[event.author] = (text, elapsed)
+            return True
+        if event.author == "AggregatorAgent":
+            self.summary, self.summary_seconds = text, elapsed
+            return True
+        return False
+
+    def render(self):
+        """Markdown of the finished sections, with placeholders for the rest"""
+        blocks = []
+        for name, topic in self.topics.items():
+            text, _ = self.sections.get(name, ("⏳ *Still researching...*", None))
+            blocks.append(f"## {topic}\n{text}")
+        pending = len(self.topics) - len(self.sections)
+        footer = (
+            f"*Executive summary follows once the remaining {pending} researcher(s) finish.*"
+            if pending else "⏳ *All researchers done - writing the executive summary...*"
+        )
+        return "\n\n".join(blocks) + f"\n\n---\n{footer}"
+
+    def status(self):
+        """Per-branch completion times, in the order the branches finished"""
+        lines = [f"📡 {len(self.sections)}/{len(self.topics)} researchers done"]
+        for name, (_, seconds) in sorted(self.sections.items(), key=lambda item: item[1][1]):
+            lines.append(f"✅ {self.topics[name]}: {seconds:.1f}s")
+        for name, topic in self.topics.items():
+            if name not in self.sections:
+                lines.append(f"⏳ {topic}: running")
+        if self.summary_seconds is not None:
+            lines.append(f"✅ Executive summary: {self.summary_seconds:.1f}s")
+        return "\n".join(lines)
+
+
+async def progressive_briefing(briefing_type):
+    """Async generator of (briefing markdown, status) updates for one briefing run.
+
+    Each researcher's section is shown as soon as its branch completes, so the
+    first content arrives at the fastest branch's latency; the aggregated
+    executive summary replaces the sections at the end.
+    """
+    topics, error = parse_briefing_topics(briefing_type)
+    if error:
+        yield error, "❌ Invalid topics"
+        return
+
+    progress = BriefingProgress(topics)
+    updates = asyncio.Queue()
+
+    def on_event(event):
+        if progress.observe(event):
+            updates.put_nowait((progress.render(), progress.status()))
+
+    run = asyncio.ensure_future(parallel_chat(briefing_type, on_event=on_event))
+    try:
+        while not run.done():
+            update = asyncio.ensure_future(updates.get())
+            await asyncio.wait({run, update}, return_when=asyncio.FIRST_COMPLETED)
+            if update.done():
+                if not run.done():
+                    yield update.result()
+            else:
+                update.cancel()
+
+        briefing, usage = run.result()
+        status = f"✅ Executive briefing complete!\n{progress.status()}\n{format_usage(usage)}"
+        yield progress.summary or briefing, status.strip()
+    finally:
+        if not run.done():
+            run.cancel()
+            await asyncio.gather(run, return_exceptions=True)
 
 
 # ============================================================================
@@ -473,14 +726,32 @@ with gr.Blocks(
 
             simple_clear = gr.Button("🗑️ Clear Chat")
 
-            def respond(message, chat_history):
-                bot_message = simple_chat(message, chat_history)
-                chat_history.append((message, bot_message))
-                return "", chat_history
+            # Conversation history stays on the server, never in the request payload
+            simple_conversation = gr.State(None, delete_callback=abandon_conversation)
+
+            async def respond(message, conversation, request: gr.Request):
+                if not message or not message.strip():
+                    yield "", gr.update(), conversation
+                    return
+                conversation = conversation or new_conversation(gradio_client_id(request))
+                async for window in simple_chat(message, conversation):
+                    yield "", window, conversation
+
+            async def clear_chat(conversation):
+                await end_conversation(simple_runner, conversation)
+                return None, None
 
-            simple_msg.submit(respond, [simple_msg, simple_chatbot], [simple_msg, simple_chatbot])
-            simple_submit.click(respond, [simple_msg, simple_chatbot], [simple_msg, simple_chatbot])
-            simple_clear.click(lambda: None, None, simple_chatbot, queue=False)
+            simple_submit_event = simple_msg.submit(
+                respond, [simple_msg, simple_conversation], [simple_msg, simple_chatbot, simple_conversation]
+            )
+            simple_click_event = simple_submit.click(
+                respond, [simple_msg, simple_conversation], [simple_msg, simple_chatbot, simple_conversation]
+            )
+            # Clearing the chat also cancels a reply that is still being generated
+            simple_clear.click(
+                clear_chat, simple_conversation, [simple_chatbot, simple_conversation], queue=False,
+                cancels=[simple_submit_event, simple_click_event],
+            )
 
         # Tab 2: Research & Summarization (Day 1B)
         with gr.Tab("🔍 Research System"):
@@ -497,6 +768,11 @@ with gr.Blocks(
                 placeholder="e.g., What are the latest advancements in quantum computing?",
             )
 
+            research_regenerate = gr.Checkbox(
+                label="🔄 Regenerate (ignore archived results for this topic)",
+                value=False,
+            )
+
             research_btn = gr.Button("🔬 Research & Summarize", variant="primary")
 
             research_output = gr.Markdown(
@@ -510,10 +786,22 @@ with gr.Blocks(
                 visible=True,
             )
 
-            def research_with_status(topic):
+            async def research_with_status(topic, regenerate, request: gr.Request):
                 if not topic or not topic.strip():
-                    return "Please enter a research topic.", "❌ No topic provided"
-                return research_chat(topic), "✅ Research complete!"
+                    yield "Please enter a research topic.", "❌ No topic provided"
+                    return
+                archived = archived_result("research", topic, regenerate)
+                if archived:
+                    yield archived
+                    return
+                retry_after = CLIENT_LIMITS.check(gradio_client_id(request), "pipeline")
+                if retry_after:
+                    yield gr.update(), limited_message(retry_after)
+                    return
+                async for update in run_with_queue_status(
+                    "research", lambda: research_chat(topic), "✅ Research complete!"
+                ):
+                    yield update
 
             gr.Examples(
                 examples=[
@@ -526,7 +814,7 @@ with gr.Blocks(
 
             research_btn.click(
                 research_with_status,
-                inputs=research_topic,
+                inputs=[research_topic, research_regenerate],
                 outputs=[research_output, research_status]
             )
 
@@ -545,6 +833,11 @@ with gr.Blocks(
                 placeholder="e.g., Benefits of multi-agent systems",
             )
 
+            blog_regenerate = gr.Checkbox(
+                label="🔄 Regenerate (ignore archived posts for this topic)",
+                value=False,
+            )
+
             blog_btn = gr.Button("📝 Generate Blog Post", variant="primary")
 
             blog_output = gr.Markdown(
@@ -558,10 +851,22 @@ with gr.Blocks(
                 visible=True,
             )
 
-            def blog_with_status(topic):
+            async def blog_with_status(topic, regenerate, request: gr.Request):
                 if not topic or not topic.strip():
-                    return "Please enter a blog topic.", "❌ No topic provided"
-                return blog_chat(topic), "✅ Blog post complete!"
+                    yield "Please enter a blog topic.", "❌ No topic provided"
+                    return
+                archived = archived_result("blog", topic, regenerate)
+                if archived:
+                    yield archived
+                    return
+                retry_after = CLIENT_LIMITS.check(gradio_client_id(request), "pipeline")
+                if retry_after:
+                    yield gr.update(), limited_message(retry_after)
+                    return
+                async for update in run_with_queue_status(
+                    "blog", lambda: blog_chat(topic), "✅ Blog post complete!"
+                ):
+                    yield update
 
             gr.Examples(
                 examples=[
@@ -574,7 +879,7 @@ with gr.Blocks(
 
             blog_btn.click(
                 blog_with_status,
-                inputs=blog_topic,
+                inputs=[blog_topic, blog_regenerate],
                 outputs=[blog_output, blog_status]
             )
 
@@ -588,6 +893,8 @@ with gr.Blocks(
                 3. **Aggregator Agent** combines findings into executive summary
 
                 **Enter exactly three comma-separated topics** to build a custom briefing.
+                In progressive mode each researcher's section appears as soon as it is done,
+                and is replaced by the executive summary at the end.
             """)
 
             briefing_type = gr.Textbox(
@@ -606,6 +913,16 @@ with gr.Blocks(
                 label="Suggested combinations",
             )
 
+            progressive_mode = gr.Checkbox(
+                label="Progressive mode (show each section as its researcher finishes)",
+                value=True,
+            )
+
+            parallel_regenerate = gr.Checkbox(
+                label="🔄 Regenerate (ignore archived briefings for these topics)",
+                value=False,
+            )
+
             parallel_btn = gr.Button("📈 Generate Executive Briefing", variant="primary")
 
             parallel_output = gr.Markdown(
@@ -619,18 +936,221 @@ with gr.Blocks(
                 visible=True,
             )
 
-            def parallel_with_status(topics):
+            async def parallel_with_status(topics, progressive, regenerate, request: gr.Request):
                 if not topics or not topics.strip():
-                    return "Please enter briefing topics.", "❌ No topics provided"
-                return parallel_chat(topics), "✅ Executive briefing complete!"
+                    yield "Please enter briefing topics.", "❌ No topics provided"
+                    return
+                archived = archived_result("briefing", topics, regenerate)
+                if archived:
+                    yield archived
+                    return
+                retry_after = CLIENT_LIMITS.check(gradio_client_id(request), "briefing")
+                if retry_after:
+                    yield gr.update(), limited_message(retry_after)
+                    return
+                if not progressive:
+                    async for update in run_with_queue_status(
+                        "briefing", lambda: parallel_chat(topics), "✅ Executive briefing complete!"
+                    ):
+                        yield update
+                    return
+                async for status in until_ready():
+                    yield gr.update(), status
+                async for update, status in run_in_traced_lane(
+                    "briefing", lambda: progressive_briefing(topics)
+                ):
+                    yield update if update is not None else (gr.update(), status)
 
             parallel_btn.click(
                 parallel_with_status,
-                inputs=briefing_type,
+                inputs=[briefing_type, progressive_mode, parallel_regenerate],
                 outputs=[parallel_output, parallel_status]
             )
 
-        # Tab 5: About
+        # Tab 5: Traces
+        with gr.Tab("🧭 Traces"):
+            gr.Markdown("""
+                ### Agent Run Traces
+                Structured event traces of the most recent agent runs (newest first):
+                agent name, event type, tool call/response sizes and timings for each event,
+                plus cumulative token usage per pipeline and per agent, and the
+                current load of each scheduler lane, the adaptive degrade state,
+                the runner pools, the startup warm-up and the model client's connection reuse.
+                Per-key and per-client stats are in the Admin tab.
+            """)
+
+            with gr.Row():
+                trace_limit = gr.Number(
+                    label="Number of traces",
+                    value=10,
+                    precision=0,
+                    minimum=1,
+                    scale=3,
+                )
+                trace_btn = gr.Button("🔄 Load Traces", variant="primary", scale=1)
+
+            trace_output = gr.JSON(label="Traces")
+
+            usage_output = gr.JSON(label="Token Usage (per pipeline and per agent)")
+
+            cancelled_output = gr.JSON(label="Cancelled Runs (per pipeline and reason)")
+
+            lanes_output = gr.JSON(label="Scheduler Lanes (quota, weight, running, waiting)")
+
+            degrade_output = gr.JSON(label="Degrade Mode (profile, load and recent transitions)")
+
+            pools_output = gr.JSON(label="Runner Pools (in flight, served, health, recycling)")
+
+            warmup_output = gr.JSON(label="Warm-Up (readiness and startup steps)")
+
+            connections_output = gr.JSON(label="Model Client (connection reuse)")
+
+            def load_traces(limit):
+                return (
+                    TRACES.recent(int(limit or 10)),
+                    USAGE.snapshot(),
+                    CANCELLATIONS.snapshot(),
+                    SCHEDULER.snapshot(),
+                    DEGRADE.snapshot(),
+                    [pool.snapshot() for pool in RUNNER_POOLS],
+                    READINESS.snapshot(),
+                    CONNECTIONS.snapshot(),
+                )
+
+            trace_btn.click(
+                load_traces,
+                inputs=trace_limit,
+                outputs=[trace_output, usage_output, cancelled_output, lanes_output, degrade_output, pools_output,
+                         warmup_output, connections_output],
+                queue=False,
+            )
+
+        # Tab 6: Archive
+        with gr.Tab("🗄️ Archive"):
+            gr.Markdown("""
+                ### Output Archive
+                Every research summary, blog post and executive briefing is archived with its
+                topic, input, intermediate agent outputs and timestamps. Search it by keyword;
+                repeated topics are answered from here unless **Regenerate** is ticked.
+            """)
+
+            with gr.Row():
+                archive_query = gr.Textbox(
+                    label="Search",
+                    placeholder="e.g., quantum computing",
+                    scale=6,
+                )
+                archive_pipeline = gr.Dropdown(
+                    label="Pipeline",
+                    choices=["all", "research", "blog", "briefing"],
+                    value="all",
+                    scale=2,
+                )
+                archive_btn = gr.Button("🔎 Search", variant="primary", scale=1)
+
+            archive_output = gr.JSON(label="Matching Outputs (best matches first)")
+
+            def search_archive(query, pipeline):
+                pipeline = None if pipeline == "all" else pipeline
+                return [
+                    {
+                        **record,
+                        "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record["created_at"])),
+                    }
+                    for record in ARCHIVE.search(query or "", pipeline=pipeline)
+                ]
+
+            archive_btn.click(
+                search_archive,
+                inputs=[archive_query, archive_pipeline],
+                outputs=archive_output,
+                queue=False,
+            )
+            archive_query.submit(
+                search_archive,
+                inputs=[archive_query, archive_pipeline],
+                outputs=archive_output,
+                queue=False,
+            )
+
+        # Hidden admin tab: shown with ?admin in the URL once ADMIN_TOKEN is set
+        with gr.Tab("🛠️ Admin", visible=False) as admin_tab:
+            gr.Markdown("""
+                ### Profiling
+                Sample every thread of this process for a few seconds (CPU time per stack), or
+                capture cProfile for the next runs of one pipeline. Both summarize the time spent
+                in Gradio, ADK, the model client and our own code; download the collapsed stacks
+                for speedscope / flamegraph.pl, or the pstats file for snakeviz.
+            """)
+
+            admin_token_input = gr.Textbox(label="Admin token", type="password")
+
+            with gr.Row():
+                sample_seconds = gr.Slider(label="Sample for (seconds)", minimum=1, maximum=60, value=10, step=1)
+                sample_btn = gr.Button("🔥 Sample", variant="primary")
+
+            with gr.Row():
+                capture_pipeline = gr.Dropdown(
+                    label="Pipeline",
+                    choices=list(PIPELINE_TIMEOUTS),
+                    value="chat",
+                )
+                capture_count = gr.Number(label="Next runs", value=5, precision=0, minimum=1)
+                capture_btn = gr.Button("🎯 Capture", variant="primary")
+                capture_report_btn = gr.Button("📄 Capture Report")
+
+            profile_output = gr.JSON(label="Profile (time per category, hottest functions)")
+            profile_file = gr.File(label="Download (collapsed stacks / pstats)")
+
+            # Per-key state (and masked key suffixes) and per-client stats stay out of the public Traces tab
+            gr.Markdown("### API Keys & Client Limits")
+            quota_btn = gr.Button("🔑 Load Key Pool & Client Limits")
+            model_pool_output = gr.JSON(label="API Key / Model Pool (calls, errors, cool-downs, pacing)")
+            client_limits_output = gr.JSON(label="Client Rate Limits (budgets, tracked clients, limited requests)")
+
+            def profile_file_path(data, suffix):
+                with tempfile.NamedTemporaryFile("wb", suffix=suffix, delete=False) as f:
+                    f.write(data)
+                return f.name
+
+            def run_sample(token, seconds):
+                if not admin_authorized(token):
+                    return {"error": "Invalid admin token"}, None
+                try:
+                    result = sample_profile(seconds)
+                except ProfilerBusy as e:
+                    return {"error": str(e)}, None
+                folded = result.pop("folded")
+                return result, profile_file_path(folded.encode(), ".folded")
+
+            def start_capture(token, pipeline, count):
+                if not admin_authorized(token):
+                    return {"error": "Invalid admin token"}, None
+                return REQUEST_PROFILER.arm(pipeline, count or 1), None
+
+            def capture_report(token):
+                if not admin_authorized(token):
+                    return {"error": "Invalid admin token"}, None
+                dump = REQUEST_PROFILER.pstats_bytes()
+                return REQUEST_PROFILER.report(), dump and profile_file_path(dump, ".pstats")
+
+            sample_btn.click(run_sample, [admin_token_input, sample_seconds], [profile_output, profile_file])
+            capture_btn.click(
+                start_capture,
+                [admin_token_input, capture_pipeline, capture_count],
+                [profile_output, profile_file],
+                queue=False,
+            )
+            capture_report_btn.click(capture_report, admin_token_input, [profile_output, profile_file], queue=False)
+
+            def load_quota(token):
+                if not admin_authorized(token):
+                    return {"error": "Invalid admin token"}, None
+                return model_pool().snapshot(), CLIENT_LIMITS.snapshot()
+
+            quota_btn.click(load_quota, admin_token_input, [model_pool_output, client_limits_output], queue=False)
+
+        # Tab 7: About
         with gr.Tab("ℹ️ About"):
             gr.Markdown("""
                 # About This Application
@@ -717,6 +1237,15 @@ with gr.Blocks(
                 Made with ❤️ using Google ADK and Gradio
             """)
 
+    def show_admin_tab(request: gr.Request):
+        return gr.update(visible=bool(ADMIN_TOKEN) and "admin" in request.query_params)
+
+    demo.load(show_admin_tab, None, admin_tab, queue=False)
+
+# Let every event through Gradio's queue and leave admission to the scheduler
+# lanes - Gradio's default of one worker per event would serialize each tab.
+demo.queue(default_concurrency_limit=None)
+
 
 if __name__ == "__main__":
     print("\n🌐 Starting Multi-Agent Gradio interface...")
@@ -728,6 +1257,9 @@ if __name__ == "__main__":
     print("   - Executive Briefing (Day 1B)")
     print("\nPress CTRL+C to stop the server\n")
 
+    # Build every pipeline and prime the model before the first user arrives
+    start_warm_up(RUNNER_POOLS, prime_pool=simple_runner)
+
     # Launch the app
     demo.launch(
         server_name="0.0.0.0",
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Persistent Archive of Pipeline Outputs
+Keeps every generated blog post, research summary and briefing searchable
+
+Outputs are stored in a local SQLite database together with their topic, the
+input message, the intermediate output_key values of the run and timestamps.
+A FTS5 index over topic and output powers full-text search; recent outputs
+for the same pipeline and topic can be served instantly instead of being
+regenerated (find_recent).
+
+Writes never block a request: add() only puts the record on a queue, and a
+background thread commits queued records in batches of up to
+ARCHIVE_BATCH_SIZE, at least every ARCHIVE_FLUSH_INTERVAL seconds.
+
+Configuration (environment variables):
+    ARCHIVE_PATH=agent_archive.db  ARCHIVE_MAX_AGE_S=86400
+    ARCHIVE_BATCH_SIZE=50          ARCHIVE_FLUSH_INTERVAL=1.0
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+ARCHIVE_PATH = os.getenv("ARCHIVE_PATH", "agent_archive.db")
+ARCHIVE_MAX_AGE_S = float(os.getenv("ARCHIVE_MAX_AGE_S", "86400"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "50"))
+ARCHIVE_FLUSH_INTERVAL = float(os.getenv("ARCHIVE_FLUSH_INTERVAL", "1.0"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    id INTEGER PRIMARY KEY,
+    pipeline TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    topic_key TEXT NOT NULL,
+    input TEXT NOT NULL,
+    output TEXT NOT NULL,
+    state_json TEXT NOT NULL,
+    profile TEXT,
+    duration_ms REAL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outputs_lookup ON outputs (pipeline, topic_key, created_at);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS outputs_fts USING fts5(
+    topic, output, content='outputs', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS outputs_fts_insert AFTER INSERT ON outputs BEGIN
+    INSERT INTO outputs_fts (rowid, topic, output) VALUES (new.id, new.topic, new.output);
+END;
+"""
+
+COLUMNS = ("id", "pipeline", "topic", "input", "output", "state_json", "profile", "duration_ms", "created_at")
+
+
+def topic_key(topic):
+    """Normalized topic used to match repeat requests"""
+    return " ".join(topic.lower().split())
+
+
+def collect_state(events):
+    """Merge the state changes of a run's events - the output_key values it produced"""
+    state = {}
+    for event in events:
+        state_delta = event.actions.state_delta if event.actions else None
+        if state_delta:
+            state.update(state_delta)
+    return state
+
+
+def _row_to_record(row):
+    record = dict(zip(COLUMNS, row, strict=True))
+    record["state"] = json.loads(record.pop("state_json"))
+    return record
+
+
+class OutputArchive:
+    """SQLite archive with batched background writes and FTS5 search"""
+
+    def __init__(self, path=ARCHIVE_PATH, batch_size=ARCHIVE_BATCH_SIZE, flush_interval=ARCHIVE_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = queue.Queue()
+        self._writer = None
+        self._start_lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            try:
+                conn.executescript(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: search falls back to LIKE
+                self.fts = False
+
+    @contextmanager
+    def _connect(self):
+        """Connection committing on success, closed afterwards"""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------ writes
+
+    def add(self, pipeline, topic, message, output, state=None, profile=None, duration_ms=None):
+        """Queue one output for archiving; returns immediately"""
+        self._ensure_writer()
+        self._pending.put((
+            pipeline,
+            topic,
+            topic_key(topic),
+            message,
+            output,
+            json.dumps(state or {}, default=str),
+            profile,
+            duration_ms,
+            time.time(),
+        ))
+
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="archive-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def _write_loop(self):
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT INTO outputs (pipeline, topic, topic_key, input, output, state_json,"
+                    " profile, duration_ms, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    batch,
+                )
+        except sqlite3.Error as e:
+            print(f"❌ Archive write failed, dropped {len(batch)} record(s): {e}")
+        finally:
+            for _ in batch:
+                self._pending.task_done()
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        if self._writer is not None:
+            self._pending.join()
+
+    # ------------------------------------------------------------------- reads
+
+    def find_recent(self, pipeline, topic, max_age=ARCHIVE_MAX_AGE_S):
+        """Newest archived output for this pipeline and topic, if younger than max_age"""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM outputs"
+                " WHERE pipeline = ? AND topic_key = ? AND created_at >= ?"
+                " ORDER BY created_at DESC LIMIT 1",
+                (pipeline, topic_key(topic), time.time() - max_age),
+            ).fetchone()
+        return _row_to_record(row) if row else None
+
+    def search(self, text, pipeline=None, limit=20):
+        """Full-text search over topics and outputs, best matches first"""
+        words = text.split()
+        if not words:
+            return []
+        columns = ", ".join(f"o.{column}" for column in COLUMNS)
+        params = []
+        if self.fts:
+            # Quote every word so user input can't inject FTS5 query syntax
+            query = " ".join('"{}"'.format(word.replace('"', '""')) for word in words)
+            sql = (
+                f"SELECT {columns} FROM outputs_fts f JOIN outputs o ON o.id = f.rowid"
+                " WHERE outputs_fts MATCH ?"
+            )
+            params.append(query)
+        else:
+            sql = f"SELECT {columns} FROM outputs o WHERE (o.topic LIKE ? OR o.output LIKE ?)"
+            params.extend([f"%{text}%"] * 2)
+        if pipeline:
+            sql += " AND o.pipeline = ?"
+            params.append(pipeline)
+        sql += " ORDER BY bm25(outputs_fts)" if self.fts else " ORDER BY o.created_at DESC"
+        sql += " LIMIT ?"
+        params.append(limit)
+
+        with self._connect() as conn:
+            return [_row_to_record(row) for row in conn.execute(sql, params)]
+
+    def stats(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT pipeline, COUNT(*) FROM outputs GROUP BY pipeline").fetchall()
+        return {"path": self.path, "fts5": self.fts, "pending": self._pending.qsize(), "outputs": dict(rows)}
+
+
+ARCHIVE = OutputArchive()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Batch Runner for Multi-Agent Pipelines
+Runs a JSONL file of jobs through the Day 1B pipelines with bounded concurrency
+
+Each input line is one job:
+    {"id": "job-1", "pipeline": "research", "input": "Latest advances in quantum computing"}
+
+Supported pipelines:
+- chat:     single helpful assistant with Google Search (Day 1A)
+- research: build_research_system() (LLM-based orchestration)
+- blog:     build_blog_pipeline() (Sequential agents)
+- briefing: build_parallel_research() (Parallel agents with aggregation)
+
+Usage:
+    python batch_runner.py jobs.jsonl --output results.jsonl --concurrency 8
+
+Results are appended to the output file as soon as each job finishes.
+Re-running the same command resumes after a crash: ids already recorded
+with status "ok" are skipped, failed jobs are retried.
+
+While the model's circuit breaker is open (see resilience.py) every worker
+pauses until it is due to close and the job is retried, so a short upstream
+outage doesn't turn the rest of the queue into error records.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime, timezone
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from agent_runtime import build_chat_agent
+from resilience import CircuitOpenError
+from day1b_multi_agent import (
+    build_research_system,
+    build_blog_pipeline,
+    build_parallel_research,
+    final_text,
+)
+
+BATCH_USER_ID = "batch_runner"
+
+
+PIPELINE_BUILDERS = {
+    "chat": build_chat_agent,
+    "research": build_research_system,
+    "blog": build_blog_pipeline,
+    "briefing": build_parallel_research,
+}
+
+
+# ============================================================================
+# JOB FILE HANDLING
+# ============================================================================
+
+def load_completed_ids(output_path):
+    """Return the ids already recorded as successful in the output file"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a truncated last line behind - ignore it
+                continue
+            if record.get("status") == "ok" and "id" in record:
+                completed.add(str(record["id"]))
+    return completed
+
+
+def iter_jobs(input_path):
+    """Yield (line_number, job_dict or None, error) for each non-empty input line"""
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, None, f"invalid JSON: {e}"
+                continue
+            if not isinstance(job, dict):
+                yield line_number, None, "job must be a JSON object"
+                continue
+            yield line_number, job, None
+
+
+def open_output(output_path):
+    """Open the output file for appending, repairing a truncated last line"""
+    needs_newline = False
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+
+    out = open(output_path, "a", encoding="utf-8")
+    if needs_newline:
+        out.write("\n")
+    return out
+
+
+# ============================================================================
+# BATCH EXECUTION
+# ============================================================================
+
+class BatchRunner:
+    """Runs jobs through one shared runner per pipeline with bounded concurrency"""
+
+    def __init__(self, output_file, concurrency=8, progress_every=100):
+        self.output_file = output_file
+        self.concurrency = concurrency
+        self.progress_every = progress_every
+        self.runners = {}
+        self.counts = {"ok": 0, "error": 0, "skipped": 0}
+        self.started = time.perf_counter()
+        # Monotonic time until which all workers hold off (circuit breaker open)
+        self.paused_until = 0.0
+
+    def get_runner(self, pipeline):
+        """Build each pipeline once, on first use"""
+        if pipeline not in self.runners:
+            self.runners[pipeline] = InMemoryRunner(agent=PIPELINE_BUILDERS[pipeline]())
+        return self.runners[pipeline]
+
+    async def run_job(self, job_id, pipeline, message):
+        """Run one job in its own session and return the final response text"""
+        runner = self.get_runner(pipeline)
+        session_id = f"batch-{job_id}"
+        await runner.session_service.create_session(
+            app_name=runner.app_name, user_id=BATCH_USER_ID, session_id=session_id
+        )
+        try:
+            events = []
+            async for event in runner.run_async(
+                user_id=BATCH_USER_ID,
+                session_id=session_id,
+                new_message=types.Content(role="user", parts=[types.Part(text=message)]),
+            ):
+                events.append(event)
+            return final_text(events)
+        finally:
+            # Drop the session so memory stays flat over tens of thousands of jobs
+            await runner.session_service.delete_session(
+                app_name=runner.app_name, user_id=BATCH_USER_ID, session_id=session_id
+            )
+
+    def write_result(self, record):
+        self.output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.output_file.flush()
+
+        self.counts[record["status"]] += 1
+        done = self.counts["ok"] + self.counts["error"]
+        if self.progress_every and done % self.progress_every == 0:
+            elapsed = time.perf_counter() - self.started
+            print(
+                f"📊 {done} jobs done ({self.counts['ok']} ok, {self.counts['error']} failed) "
+                f"- {done / elapsed:.2f} jobs/s"
+            )
+
+    async def worker(self, queue):
+        while True:
+            job = await queue.get()
+            if job is None:
+                queue.task_done()
+                return
+
+            job_id, pipeline, message = job
+            started = time.perf_counter()
+            record = {"id": job_id, "pipeline": pipeline}
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                try:
+                    record["output"] = await self.run_job(job_id, pipeline, message)
+                    record["status"] = "ok"
+                except CircuitOpenError as e:
+                    # The backend is down: pause every worker and retry, rather than fail the job
+                    now, wait = time.monotonic(), max(e.retry_after, 1.0)
+                    if self.paused_until <= now:
+                        print(f"⏳ Model backend unavailable, pausing all workers for {wait:.0f}s")
+                    self.paused_until = max(self.paused_until, now + wait)
+                    continue
+                except Exception as e:
+                    record["status"] = "error"
+                    record["error"] = f"{type(e).__name__}: {e}"
+                break
+            record["elapsed_s"] = round(time.perf_counter() - started, 3)
+            record["finished_at"] = datetime.now(timezone.utc).isoformat()
+            self.write_result(record)
+            queue.task_done()
+
+    async def run(self, input_path, completed_ids):
+        # A small bounded queue keeps memory flat no matter how large the input is
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self.worker(queue)) for _ in range(self.concurrency)]
+        seen = set()
+
+        try:
+            for line_number, job, error in iter_jobs(input_path):
+                if error:
+                    self.write_result({
+                        "id": f"line-{line_number}",
+                        "status": "error",
+                        "error": error,
+                    })
+                    continue
+
+                job_id = str(job.get("id", f"line-{line_number}"))
+                pipeline = job.get("pipeline")
+                message = job.get("input", "")
+
+                if job_id in completed_ids or job_id in seen:
+                    self.counts["skipped"] += 1
+                    continue
+                seen.add(job_id)
+
+                error = None
+                if pipeline not in PIPELINE_BUILDERS:
+                    error = f"unknown pipeline {pipeline!r}"
+                elif not str(message).strip():
+                    error = "empty input"
+                if error:
+                    self.write_result({
+                        "id": job_id,
+                        "pipeline": pipeline,
+                        "status": "error",
+                        "error": error,
+                    })
+                    continue
+
+                await queue.put((job_id, pipeline, str(message)))
+
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            raise
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run a JSONL file of jobs through the Day 1B multi-agent pipelines."
+    )
+    parser.add_argument("input", help="JSONL file of jobs ({id, pipeline, input})")
+    parser.add_argument(
+        "-o", "--output",
+        help="JSONL file results are appended to (default: <input>.results.jsonl)",
+    )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=8,
+        help="Maximum number of jobs running at once (default: 8)",
+    )
+    parser.add_argument(
+        "--progress-every", type=int, default=100,
+        help="Print a progress line every N finished jobs (default: 100, 0 disables)",
+    )
+    parser.add_argument(
+        "--no-resume", action="store_true",
+        help="Run every job even if the output file already records it as done",
+    )
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if not args.output:
+        base, _ = os.path.splitext(args.input)
+        args.output = f"{base}.results.jsonl"
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if not os.path.exists(args.input):
+        print(f"❌ Input file not found: {args.input}")
+        return 1
+
+    completed_ids = set() if args.no_resume else load_completed_ids(args.output)
+
+    print("=" * 80)
+    print("🚀 Batch Runner - Multi-Agent Pipelines")
+    print("=" * 80)
+    print(f"📥 Input: {args.input}")
+    print(f"📤 Output: {args.output}")
+    print(f"⚙️  Concurrency: {args.concurrency}")
+    if completed_ids:
+        print(f"⏩ Resuming: {len(completed_ids)} completed jobs will be skipped")
+    print("=" * 80)
+
+    with open_output(args.output) as output_file:
+        batch = BatchRunner(output_file, args.concurrency, args.progress_every)
+        try:
+            asyncio.run(batch.run(args.input, completed_ids))
+        except KeyboardInterrupt:
+            print("\n⚠️ Interrupted - re-run the same command to resume")
+            return 130
+
+    elapsed = time.perf_counter() - batch.started
+    print("=" * 80)
+    print(
+        f"✅ Done in {elapsed:.1f}s: {batch.counts['ok']} ok, "
+        f"{batch.counts['error']} failed, {batch.counts['skipped']} skipped"
+    )
+    print("=" * 80)
+    return 0 if batch.counts["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark for the Entry Points
+Tracks import time and time to first use of every app and script
+
+Each entry point is imported in a fresh interpreter (like a Space restart or
+a CLI invocation), then its first unit of work is prepared - e.g. leasing a
+chat runner, which builds the agent and imports google.adk on demand:
+
+    import_s     module import (what delays the UI / health check)
+    first_use_s  the deferred work done for the first request
+    process_s    whole interpreter run, startup and shutdown included
+
+One extra run under `python -X importtime` attributes the import time to
+top-level packages. No API calls are made (a placeholder key is used).
+
+Usage:
+    python benchmark_startup.py --repeat 5 --history startup_history.jsonl
+
+With --history every report is appended as one JSON line and compared with
+the previous one, so regressions show up over time.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from collections import Counter
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+ENTRY_POINTS = {
+    "app": ("app.py", "with module.runner.lease(): pass"),
+    "gradio_app": ("gradio_app.py", "with module.runner.lease(): pass"),
+    "app_multiagent": ("app_multiagent.py", "with module.simple_runner.lease(): pass"),
+    "server": ("web-chat/server.py", "with module.runner.lease(): pass"),
+    "day1a": ("day1a_first_agent.py", "pass"),
+    "day1b": ("day1b_multi_agent.py", "module.build_research_system()"),
+}
+
+RESULT_MARKER = "STARTUP_RESULT "
+
+CHILD = """
+import sys, json, time, importlib.util
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location({name!r}, {path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+adk_at_import = "google.adk.runners" in sys.modules
+{first_use}
+used = time.perf_counter()
+print({marker!r} + json.dumps({{
+    "import_s": imported - started,
+    "first_use_s": used - imported,
+    "adk_at_import": adk_at_import,
+}}))
+"""
+
+
+def child_env(tmp):
+    return dict(
+        os.environ,
+        GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY", "benchmark-startup"),
+        ARCHIVE_PATH=os.path.join(tmp, "archive.db"),
+        SHARED_STORE_PATH=os.path.join(tmp, "shared.db"),
+    )
+
+
+def run_child(name, importtime=False):
+    """Import one entry point in a fresh interpreter; returns (measurements, stderr)"""
+    path, first_use = ENTRY_POINTS[name]
+    code = CHILD.format(
+        root=ROOT, name=name, path=os.path.join(ROOT, path), first_use=first_use, marker=RESULT_MARKER
+    )
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        completed = subprocess.run(command, cwd=tmp, env=child_env(tmp), capture_output=True, text=True)
+        process_s = time.perf_counter() - started
+
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            result = json.loads(line[len(RESULT_MARKER):])
+            result["process_s"] = process_s
+            return result, completed.stderr
+    raise RuntimeError(f"{name} failed to start:\n{completed.stderr[-2000:]}")
+
+
+def import_breakdown(stderr, top=8):
+    """Self import time per top-level package from -X importtime output, in seconds"""
+    per_package = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, module = [part.strip() for part in line[len("import time:"):].split("|")]
+        if self_us.isdigit():
+            per_package[module.split(".")[0]] += int(self_us)
+    return {package: round(us / 1e6, 3) for package, us in per_package.most_common(top)}
+
+
+def benchmark(names, repeat):
+    results = {}
+    for name in names:
+        runs = [run_child(name)[0] for _ in range(repeat)]
+        _, stderr = run_child(name, importtime=True)
+        results[name] = {
+            "import_s": round(statistics.median(run["import_s"] for run in runs), 3),
+            "first_use_s": round(statistics.median(run["first_use_s"] for run in runs), 3),
+            "process_s": round(statistics.median(run["process_s"] for run in runs), 3),
+            "adk_at_import": runs[0]["adk_at_import"],
+            "import_breakdown_s": import_breakdown(stderr),
+        }
+        print(
+            f"⏱️  {name}: import {results[name]['import_s']:.2f}s, "
+            f"first use {results[name]['first_use_s']:.2f}s",
+            file=sys.stderr,
+        )
+    return {
+        "benchmark": "entry_point_startup",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "entry_points": results,
+    }
+
+
+def compare(previous, report):
+    """Print import time changes against the previous report"""
+    for name, result in report["entry_points"].items():
+        before = previous.get("entry_points", {}).get(name)
+        if before:
+            delta = result["import_s"] - before["import_s"]
+            print(f"📈 {name}: import {before['import_s']:.2f}s → {result['import_s']:.2f}s ({delta:+.2f}s)",
+                  file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark import time and first use of the entry points.")
+    parser.add_argument(
+        "entry_points", nargs="*",
+        help=f"Entry points to measure (default: all of {', '.join(ENTRY_POINTS)})",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per entry point; medians are reported (default: 3)")
+    parser.add_argument("--history", help="Append the report to this JSONL file and compare with the previous one")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.entry_points if name not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry point(s): {', '.join(unknown)}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = benchmark(args.entry_points or list(ENTRY_POINTS), max(args.repeat, 1))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.history:
+        if os.path.exists(args.history):
+            with open(args.history, encoding="utf-8") as f:
+                lines = [line for line in f if line.strip()]
+            if lines:
+                compare(json.loads(lines[-1]), report)
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
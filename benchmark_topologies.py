@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Topology Benchmark for Sequential and Parallel Agent Pipelines
+Verifies that ParallelAgent branches really run concurrently
+
+Runs the Day 1B research, blog and parallel research pipelines against a
+local model that answers after a fixed, injected latency - no API calls, no
+Google Search - and measures each pipeline's wall time against the sum of
+its stage (model call) times. For every ParallelAgent the wall time of the
+parallel step is compared with the sum of its branch times:
+
+    parallel efficiency = sum(branch times) / (branches * parallel wall time)
+
+A regression to serialized execution drops the efficiency of a 3-branch
+ParallelAgent to ~0.33 and the benchmark exits with status 1.
+
+Usage:
+    python benchmark_topologies.py --latency 0.2 --repeat 3 --min-efficiency 0.8 -o bench.json
+
+Results are written as JSON (to stdout without --output) for trend tracking.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timezone
+
+# day1b_multi_agent checks for an API key at import time. The benchmark never
+# calls the API, so any placeholder satisfies the check.
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-local-model")
+
+from google.adk.agents import Agent, ParallelAgent
+from google.adk.runners import InMemoryRunner
+from google.adk.tools import AgentTool
+from google.adk.tools.google_search_tool import GoogleSearchTool
+
+from stub_model import LatencyModel
+
+from day1b_multi_agent import (
+    build_research_system,
+    build_blog_pipeline,
+    build_parallel_research,
+    attach_agent_timers,
+)
+
+BENCHMARK_PIPELINES = {
+    "research": build_research_system,
+    "blog": build_blog_pipeline,
+    "parallel_research": build_parallel_research,
+}
+
+
+def use_local_model(agent, model):
+    """Point every agent in the tree at `model` and drop Google Search.
+
+    Search latency is folded into the model latency instead.
+    """
+    if isinstance(agent, Agent):
+        agent.model = model
+        agent.tools = [tool for tool in agent.tools if not isinstance(tool, GoogleSearchTool)]
+        for tool in agent.tools:
+            if isinstance(tool, AgentTool):
+                use_local_model(tool.agent, model)
+    for sub_agent in agent.sub_agents:
+        use_local_model(sub_agent, model)
+    return agent
+
+
+def parallel_agents(agent):
+    """Every ParallelAgent in the tree"""
+    found = [agent] if isinstance(agent, ParallelAgent) else []
+    for sub_agent in agent.sub_agents:
+        found.extend(parallel_agents(sub_agent))
+    return found
+
+
+async def run_once(builder, latency):
+    """Run one pipeline against the local model and return its measurements"""
+    model = LatencyModel(latency=latency, call_durations=[])
+    agent_times = {}
+    root_agent = attach_agent_timers(use_local_model(builder(), model), agent_times)
+    runner = InMemoryRunner(agent=root_agent)
+
+    started = time.perf_counter()
+    await runner.run_debug("Benchmark run", quiet=True)
+    wall = time.perf_counter() - started
+
+    stage_sum = sum(model.call_durations)
+    branches = {}
+    for parallel in parallel_agents(root_agent):
+        parallel_wall = agent_times.get(parallel.name, 0.0)
+        branch_sum = sum(agent_times.get(sub.name, 0.0) for sub in parallel.sub_agents)
+        count = len(parallel.sub_agents)
+        branches[parallel.name] = {
+            "branches": count,
+            "wall_s": parallel_wall,
+            "branch_sum_s": branch_sum,
+            "efficiency": branch_sum / (count * parallel_wall) if parallel_wall else 0.0,
+        }
+
+    return {
+        "wall_s": wall,
+        "stage_sum_s": stage_sum,
+        "model_calls": len(model.call_durations),
+        "speedup": stage_sum / wall if wall else 0.0,
+        "parallel": branches,
+    }
+
+
+def median_of(runs, key):
+    return round(statistics.median(run[key] for run in runs), 4)
+
+
+async def run_benchmark(latency, repeat, min_efficiency):
+    """Benchmark every pipeline `repeat` times and check parallel efficiency"""
+    results = {}
+    passed = True
+
+    for name, builder in BENCHMARK_PIPELINES.items():
+        runs = [await run_once(builder, latency) for _ in range(repeat)]
+        result = {
+            "wall_s": median_of(runs, "wall_s"),
+            "stage_sum_s": median_of(runs, "stage_sum_s"),
+            "speedup": median_of(runs, "speedup"),
+            "model_calls": runs[0]["model_calls"],
+            "parallel": {},
+        }
+        for parallel_name in runs[0]["parallel"]:
+            samples = [run["parallel"][parallel_name] for run in runs]
+            efficiency = round(statistics.median(sample["efficiency"] for sample in samples), 4)
+            ok = efficiency >= min_efficiency
+            passed = passed and ok
+            result["parallel"][parallel_name] = {
+                "branches": samples[0]["branches"],
+                "wall_s": median_of(samples, "wall_s"),
+                "branch_sum_s": median_of(samples, "branch_sum_s"),
+                "efficiency": efficiency,
+                "passed": ok,
+            }
+        results[name] = result
+
+    return {
+        "benchmark": "agent_topologies",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "model_latency_s": latency,
+        "repeat": repeat,
+        "min_parallel_efficiency": min_efficiency,
+        "pipelines": results,
+        "passed": passed,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark Sequential vs Parallel agent topologies against a local latency model."
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.2,
+        help="Simulated seconds per model call (default: 0.2)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Runs per pipeline; medians are reported (default: 3)",
+    )
+    parser.add_argument(
+        "--min-efficiency", type=float, default=0.8,
+        help="Minimum parallel efficiency for every ParallelAgent (default: 0.8)",
+    )
+    parser.add_argument("-o", "--output", help="Write the JSON results to this file instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run_benchmark(args.latency, max(args.repeat, 1), args.min_efficiency))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for name, result in report["pipelines"].items():
+        for parallel_name, parallel in result["parallel"].items():
+            if not parallel["passed"]:
+                print(
+                    f"❌ {name}: {parallel_name} efficiency {parallel['efficiency']:.2f} "
+                    f"is below {args.min_efficiency:.2f} - branches are not running concurrently",
+                    file=sys.stderr,
+                )
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Cancellation of In-Flight Agent Runs
+Stops abandoned requests from burning a worker and model quota
+
+run_cancellable() runs an agent coroutine as its own task and cancels it when:
+- the caller itself is cancelled (Gradio `cancels=[...]` on Clear Chat, or
+  Gradio dropping the events of a closed tab),
+- the client disconnects (polled via `is_disconnected`, e.g. the raw socket of
+  a Flask request - see socket_disconnect_checker()),
+- or the request id is cancelled explicitly (POST /api/cancel).
+
+Cancelling the task cancels the ADK run_async() generator and with it every
+sub-agent task, including ParallelAgent branches. CANCELLATIONS counts the
+cancelled runs and the seconds of work they had been running for.
+"""
+
+import time
+import socket
+import asyncio
+import inspect
+import threading
+
+
+class RunCancelled(Exception):
+    """Raised by run_cancellable() when the client went away or cancelled"""
+
+    def __init__(self, reason):
+        self.reason = reason
+        super().__init__(f"Agent run cancelled ({reason})")
+
+
+class CancellationStats:
+    """Thread-safe counters of cancelled runs per pipeline and reason"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = {}
+        self._seconds = {}
+
+    def record(self, pipeline, reason, elapsed):
+        key = (pipeline, reason)
+        with self._lock:
+            self._runs[key] = self._runs.get(key, 0) + 1
+            self._seconds[key] = self._seconds.get(key, 0.0) + elapsed
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {
+                    "pipeline": pipeline,
+                    "reason": reason,
+                    "runs": runs,
+                    "seconds": round(self._seconds[(pipeline, reason)], 3),
+                }
+                for (pipeline, reason), runs in sorted(self._runs.items())
+            ]
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        lines = []
+        for name, field in (("agent_runs_cancelled_total", "runs"),
+                            ("agent_cancelled_work_seconds_total", "seconds")):
+            lines.append(f"# TYPE {name} counter")
+            for row in snapshot:
+                labels = f'pipeline="{row["pipeline"]}",reason="{row["reason"]}"'
+                lines.append(f"{name}{{{labels}}} {row[field]}")
+        return "\n".join(lines) + "\n"
+
+
+CANCELLATIONS = CancellationStats()
+
+
+class ActiveRuns:
+    """Registry of in-flight runs by request id, so other threads can cancel them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = {}
+
+    def register(self, request_id, loop, task):
+        with self._lock:
+            self._runs[request_id] = {"loop": loop, "task": task, "reason": None}
+
+    def unregister(self, request_id):
+        with self._lock:
+            return self._runs.pop(request_id, None)
+
+    def reason(self, request_id):
+        with self._lock:
+            entry = self._runs.get(request_id)
+            return entry["reason"] if entry else None
+
+    def cancel(self, request_id, reason="user_cancel"):
+        """Cancel a run from any thread; returns False if it is not running"""
+        with self._lock:
+            entry = self._runs.get(request_id)
+            if entry is None:
+                return False
+            entry["reason"] = reason
+        entry["loop"].call_soon_threadsafe(entry["task"].cancel)
+        return True
+
+    def __len__(self):
+        return len(self._runs)
+
+
+ACTIVE_RUNS = ActiveRuns()
+
+
+def socket_disconnect_checker(environ):
+    """Return a callable telling whether the WSGI client hung up, or None if unknown.
+
+    Peeks at the raw socket exposed by Werkzeug's dev server or Gunicorn: a
+    readable socket that returns no data has been closed by the client.
+    """
+    sock = environ.get("werkzeug.socket") or environ.get("gunicorn.socket")
+    if sock is None or not hasattr(socket, "MSG_DONTWAIT"):
+        return None
+    flags = socket.MSG_PEEK | socket.MSG_DONTWAIT
+
+    def is_disconnected():
+        try:
+            return sock.recv(1, flags) == b""
+        except BlockingIOError:
+            return False
+        except OSError:
+            return True
+
+    return is_disconnected
+
+
+async def run_cancellable(coro, pipeline, is_disconnected=None, request_id=None, poll_interval=0.5):
+    """Await `coro` as a task that is cancelled when the client goes away.
+
+    Raises RunCancelled for disconnects and explicit cancels, and re-raises
+    CancelledError when the caller itself was cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(coro)
+    started = time.perf_counter()
+    if request_id:
+        ACTIVE_RUNS.register(request_id, loop, task)
+
+    def cancel(reason):
+        task.cancel()
+        CANCELLATIONS.record(pipeline, reason, time.perf_counter() - started)
+
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval if is_disconnected else None)
+            if done:
+                if task.cancelled() and request_id and ACTIVE_RUNS.reason(request_id):
+                    reason = ACTIVE_RUNS.reason(request_id)
+                    CANCELLATIONS.record(pipeline, reason, time.perf_counter() - started)
+                    raise RunCancelled(reason)
+                return task.result()
+
+            disconnected = is_disconnected()
+            if inspect.isawaitable(disconnected):
+                disconnected = await disconnected
+            if disconnected:
+                cancel("client_disconnect")
+                await asyncio.gather(task, return_exceptions=True)
+                raise RunCancelled("client_disconnect")
+    except asyncio.CancelledError:
+        if not task.done():
+            cancel("caller_cancelled")
+            await asyncio.gather(task, return_exceptions=True)
+        raise
+    finally:
+        if request_id:
+            ACTIVE_RUNS.unregister(request_id)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Server-Side Chat Sessions for the Gradio UIs
+Keeps the per-turn payload constant however long the conversation gets
+
+The conversation lives on the server: the model context in its own ADK
+session per browser session, and the rendered turns in a gr.State (which is
+never sent to the browser). Each turn therefore uploads only the new
+message, and the reply is streamed down chunk by chunk (SSE streaming from
+the model, Gradio sends the diffs between yields). The Chatbot only renders
+the latest CHAT_WINDOW_TURNS turns, so what is sent down is bounded too.
+
+Sessions of conversations left idle for CHAT_SESSION_TTL_S (default 30 min),
+or whose browser session Gradio has dropped (abandon_conversation as the
+gr.State delete_callback), are deleted on the next turn of any chat, so
+closed tabs don't keep their context in memory.
+
+Usage in a Blocks app:
+    conversation = gr.State(None, delete_callback=abandon_conversation)
+    msg.submit(respond, [msg, conversation], [msg, chatbot, conversation])
+
+    async def respond(message, conversation):
+        conversation = conversation or new_conversation()
+        async for window in stream_chat_turn(runner, conversation, message):
+            yield "", window, conversation
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import functools
+import threading
+from contextlib import nullcontext
+
+from agent_tracing import DEFAULT_USER_ID, final_text, run_traced, timed_out_text
+from usage_accounting import USAGE
+from resilience import PIPELINE_TIMEOUTS, CircuitOpenError
+from cancellation import run_cancellable
+from warmup import until_ready
+from client_limits import CLIENT_LIMITS, limited_message
+from telemetry import end_span, span_scope, start_request_span
+
+CHAT_WINDOW_TURNS = int(os.getenv("CHAT_WINDOW_TURNS", "20"))
+CHAT_SESSION_TTL_S = float(os.getenv("CHAT_SESSION_TTL_S", "1800"))
+
+# session id -> [session service, app name, last active (monotonic, 0 once abandoned)]
+_live_sessions = {}
+_live_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def streaming_config():
+    """RunConfig for SSE streaming (google.adk is imported on first use)"""
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+
+    return RunConfig(streaming_mode=StreamingMode.SSE)
+
+
+def new_conversation(client=None):
+    """Server-side state of one browser session's chat; `client` is rate limited (see client_limits.py)"""
+    return {"session_id": f"chat-{uuid.uuid4().hex}", "turns": [], "client": client}
+
+
+def abandon_conversation(conversation):
+    """gr.State delete_callback: expire the conversation's session on the next sweep"""
+    if conversation:
+        with _live_lock:
+            entry = _live_sessions.get(conversation["session_id"])
+            if entry:
+                entry[2] = 0.0
+
+
+def _touch(runner, conversation):
+    with _live_lock:
+        _live_sessions[conversation["session_id"]] = [runner.session_service, runner.app_name, time.monotonic()]
+
+
+async def expire_idle_conversations(ttl_s=CHAT_SESSION_TTL_S):
+    """Delete the ADK sessions of abandoned conversations and of those idle for `ttl_s`"""
+    cutoff = time.monotonic() - ttl_s
+    with _live_lock:
+        expired = [session_id for session_id, (_, _, active) in _live_sessions.items() if active < cutoff]
+        entries = [(session_id, _live_sessions.pop(session_id)) for session_id in expired]
+    for session_id, (session_service, app_name, _) in entries:
+        await session_service.delete_session(app_name=app_name, user_id=DEFAULT_USER_ID, session_id=session_id)
+    return len(entries)
+
+
+def chat_window(conversation):
+    """The turns to render: only the latest CHAT_WINDOW_TURNS, so the payload stays bounded"""
+    turns = conversation["turns"]
+    window = [tuple(turn) for turn in turns[-CHAT_WINDOW_TURNS:]]
+    hidden = len(turns) - len(window)
+    if hidden:
+        window.insert(0, (None, f"*{hidden} earlier turn(s) are hidden here but still part of the conversation.*"))
+    return window
+
+
+async def stream_reply(runner, message, session_id, pipeline="chat", timeout=None, scope=None,
+                       request_id=None, on_event=None):
+    """Async generator of (reply text so far, None) while the reply streams in,
+    then ("", (events, trace)) once the run has finished.
+
+    `scope` is a context manager entered while the run is started - the run's
+    task inherits the context variables it sets (e.g. degrade_scope()).
+    `request_id` makes the run cancellable via ACTIVE_RUNS, and `on_event` is
+    called with every event as well (e.g. to report tool calls).
+    """
+    chunks = asyncio.Queue()
+
+    def collect(event):
+        if on_event is not None:
+            on_event(event)
+        if event.partial and event.content and event.content.parts:
+            text = "".join(part.text for part in event.content.parts if part.text)
+            if text:
+                chunks.put_nowait(text)
+
+    with scope or nullcontext():
+        run = asyncio.ensure_future(run_cancellable(
+            run_traced(
+                runner, message, pipeline,
+                session_id=session_id, timeout=timeout, on_event=collect, run_config=streaming_config(),
+            ),
+            pipeline=pipeline,
+            request_id=request_id,
+        ))
+
+    text = ""
+    try:
+        while not run.done():
+            chunk = asyncio.ensure_future(chunks.get())
+            await asyncio.wait({run, chunk}, return_when=asyncio.FIRST_COMPLETED)
+            if chunk.done():
+                text += chunk.result()
+                yield text, None
+            else:
+                chunk.cancel()
+        yield "", run.result()
+    finally:
+        if not run.done():
+            run.cancel()
+            await asyncio.gather(run, return_exceptions=True)
+
+
+async def stream_chat_turn(runner, conversation, message, pipeline="chat", scope=None, suffix=""):
+    """Async generator of chat windows while the reply to `message` streams in.
+
+    Appends the turn to `conversation`; `suffix` is added to the finished reply.
+    Waits for the warm-up (see warmup.py) if the app is still warming up.
+    """
+    turn = [message, ""]
+    conversation["turns"].append(turn)
+
+    retry_after = CLIENT_LIMITS.check(conversation.get("client"), "chat")
+    if retry_after:
+        turn[1] = limited_message(retry_after)
+        yield chat_window(conversation)
+        return
+    yield chat_window(conversation)
+
+    async for status in until_ready():
+        turn[1] = status
+        yield chat_window(conversation)
+
+    await expire_idle_conversations()
+    _touch(runner, conversation)
+
+    # The run's task starts inside the span; this generator can't keep it current across yields
+    span = start_request_span(pipeline, "gradio", {"app.session_id": conversation["session_id"]})
+    error = None
+    try:
+        async for text, result in stream_reply(
+            runner, message, conversation["session_id"], pipeline,
+            timeout=PIPELINE_TIMEOUTS.get(pipeline), scope=span_scope(span, scope),
+        ):
+            if result is None:
+                turn[1] = text
+            else:
+                events, trace = result
+                USAGE.record(trace)
+                if trace["status"] == "deadline_exceeded":
+                    turn[1] = timed_out_text(events)
+                else:
+                    reply = final_text(events)
+                    turn[1] = reply + suffix if reply else "❌ Sorry, I couldn't generate a response. Please try again."
+            yield chat_window(conversation)
+
+    except CircuitOpenError as e:
+        print(f"⏳ {str(e)}")
+        error = e
+        turn[1] = f"⏳ The AI service is temporarily unavailable. Please try again in {e.retry_after:.0f}s."
+        yield chat_window(conversation)
+
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        error = e
+        turn[1] = f"❌ Error: {str(e)}"
+        yield chat_window(conversation)
+
+    finally:
+        end_span(span, error)
+
+
+async def end_conversation(runner, conversation):
+    """Drop the ADK session of a cleared conversation"""
+    if conversation:
+        with _live_lock:
+            _live_sessions.pop(conversation["session_id"], None)
+        await runner.session_service.delete_session(
+            app_name=runner.app_name, user_id=DEFAULT_USER_ID, session_id=conversation["session_id"]
+        )
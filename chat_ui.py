@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Gradio Chat Interface for the Single-Agent Apps
+The chat UI shared by app.py (Hugging Face Space) and gradio_app.py (local)
+
+build_chat_demo() lays out the chat, examples and about section and wires
+the handlers to a runner (usually a RunnerPool): replies stream in and the
+history stays on the server (see chat_session.py). The apps only differ in
+their theme colors and CSS.
+"""
+
+import gradio as gr
+
+from chat_session import abandon_conversation, end_conversation, new_conversation, stream_chat_turn
+from client_limits import gradio_client_id
+
+ABOUT_MARKDOWN = """
+### Features:
+- 🔍 **Google Search**: Can search the web for current information
+- 🧠 **Smart Tool Usage**: Decides when to use search based on your query
+- ⚡ **Fast Responses**: Using Gemini 2.5 Flash Lite
+- 📊 **Rich Formatting**: Supports markdown for beautiful responses
+
+### How it works:
+1. You ask a question
+2. The agent analyzes if it needs current information
+3. If needed, it searches Google
+4. It synthesizes the information into a clear answer
+
+### Technical Details:
+- **Framework**: Google Agent Development Kit (ADK)
+- **Model**: Gemini 2.5 Flash Lite
+- **Tools**: Google Search
+- **Interface**: Gradio
+"""
+
+
+def build_chat_demo(runner, css, primary_hue, secondary_hue, about_extra=""):
+    """Gradio Blocks chat app answering with agents leased from `runner`"""
+    with gr.Blocks(
+        theme=gr.themes.Soft(
+            primary_hue=primary_hue,
+            secondary_hue=secondary_hue,
+        ),
+        css=css,
+        title="AI Agent Chat",
+    ) as demo:
+
+        # Header
+        gr.Markdown(
+            """
+            # 🤖 AI Agent Chat
+            ### Powered by Google ADK & Gemini
+
+            Ask me anything! I can search the web for current information, answer questions, and help with various tasks.
+            """
+        )
+
+        # Chat interface
+        chatbot = gr.Chatbot(
+            height=500,
+            show_label=False,
+            avatar_images=(
+                None,  # User avatar (default)
+                "https://em-content.zobj.net/source/apple/391/robot_1f916.png"  # Agent avatar
+            ),
+            bubble_full_width=False,
+        )
+
+        # Input area
+        with gr.Row():
+            msg = gr.Textbox(
+                placeholder="Type your message here...",
+                show_label=False,
+                scale=9,
+                autofocus=True,
+            )
+            submit = gr.Button("Send 📤", variant="primary", scale=1)
+
+        # Examples
+        gr.Examples(
+            examples=[
+                "What's the weather in Tokyo?",
+                "Explain how AI agents work in simple terms",
+                "Write a Python function to calculate factorial",
+                "What are the latest tech news?",
+                "Compare cats vs dogs in a table",
+            ],
+            inputs=msg,
+            label="💡 Try these examples:",
+        )
+
+        # Clear button
+        clear = gr.Button("🗑️ Clear Chat", variant="secondary")
+
+        # Info section
+        with gr.Accordion("ℹ️ About this AI Agent", open=False):
+            gr.Markdown(ABOUT_MARKDOWN + about_extra)
+
+        # Conversation history stays on the server (see chat_session.py): only the
+        # new message goes up and only the new reply is streamed down
+        conversation = gr.State(None, delete_callback=abandon_conversation)
+
+        # Event handlers
+        async def respond(message, conversation, request: gr.Request):
+            """
+            Stream the agent's reply to the user's message
+
+            The agent run executes on the shared model loop (see model_client.py) while
+            this handler waits for it on Gradio's event loop. Cancelling the event (Clear
+            Chat, or a closed tab) cancels the wait, and MODEL_LOOP.run_async() passes the
+            cancellation on - via asyncio.wrap_future() - to the run and its sub-agent tasks.
+            """
+            if not message or not message.strip():
+                yield "", gr.update(), conversation
+                return
+            conversation = conversation or new_conversation(gradio_client_id(request))
+            with runner.lease() as leased:
+                async for window in stream_chat_turn(leased, conversation, message):
+                    yield "", window, conversation
+
+        async def clear_chat(conversation):
+            await end_conversation(runner, conversation)
+            return None, None
+
+        submit_event = msg.submit(respond, [msg, conversation], [msg, chatbot, conversation])
+        click_event = submit.click(respond, [msg, conversation], [msg, chatbot, conversation])
+        # Clearing the chat also cancels a reply that is still being generated
+        clear.click(
+            clear_chat, conversation, [chatbot, conversation], queue=False,
+            cancels=[submit_event, click_event],
+        )
+
+    return demo
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Per-Client Rate Limits for the Public Endpoints
+Keeps one noisy client from monopolizing the runners
+
+Every client gets a token bucket per kind of request, so a burst of chat
+messages or briefings from one client is turned away (with a retry time)
+before it reaches the scheduler lanes and the model quota:
+
+    kind       default budget                   used by
+    chat       CLIENT_CHAT_RPM=20, burst 5      /api/chat, chat tabs
+    pipeline   CLIENT_PIPELINE_RPM=6, burst 2   research, blog
+    briefing   CLIENT_BRIEFING_RPM=2, burst 1   executive briefing
+
+A client is identified by its API token (Authorization: Bearer ... or
+X-Client-Token) if the token is one of CLIENT_TOKENS (comma-separated),
+otherwise by IP address - a made-up token never gets a client out of its
+IP's buckets. Behind reverse
+proxies (Hugging Face Spaces) set CLIENT_PROXY_HOPS to the number of
+proxies, so the address they appended to X-Forwarded-For is used - entries
+further left are set by the client and can't be trusted.
+
+Buckets live in memory, per process. A client idle for CLIENT_IDLE_TTL_S
+(long enough for every bucket to refill) is evicted, and at most
+CLIENT_MAX_TRACKED clients are kept. CLIENT_LIMITS=0 turns limiting off.
+"""
+
+import os
+import time
+import hmac
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+
+from pacing import TokenBucket
+
+CLIENT_LIMITS_ENABLED = os.getenv("CLIENT_LIMITS", "1") != "0"
+CLIENT_IDLE_TTL_S = float(os.getenv("CLIENT_IDLE_TTL_S", "600"))
+CLIENT_MAX_TRACKED = int(os.getenv("CLIENT_MAX_TRACKED", "10000"))
+CLIENT_PROXY_HOPS = int(os.getenv("CLIENT_PROXY_HOPS", "0"))
+# API tokens issued to known clients; each gets buckets of its own, wherever it connects from
+CLIENT_TOKENS = [token.strip() for token in os.getenv("CLIENT_TOKENS", "").split(",") if token.strip()]
+
+# kind -> (requests per minute, burst)
+CLIENT_BUDGETS = {
+    "chat": (float(os.getenv("CLIENT_CHAT_RPM", "20")), float(os.getenv("CLIENT_CHAT_BURST", "5"))),
+    "pipeline": (float(os.getenv("CLIENT_PIPELINE_RPM", "6")), float(os.getenv("CLIENT_PIPELINE_BURST", "2"))),
+    "briefing": (float(os.getenv("CLIENT_BRIEFING_RPM", "2")), float(os.getenv("CLIENT_BRIEFING_BURST", "1"))),
+}
+
+
+def known_token(token):
+    """Whether `token` is one of CLIENT_TOKENS (constant-time comparison)"""
+    return bool(token) and any(hmac.compare_digest(token.encode(), known.encode()) for known in CLIENT_TOKENS)
+
+
+def client_id(headers, remote_addr):
+    """Identify a client by its known token, or else by its IP address"""
+    auth = headers.get("Authorization", "")
+    token = auth[len("Bearer "):] if auth.startswith("Bearer ") else headers.get("X-Client-Token")
+    if known_token(token):
+        return "token:" + hashlib.sha256(token.encode()).hexdigest()[:16]
+
+    address = remote_addr
+    if CLIENT_PROXY_HOPS:
+        forwarded = [hop.strip() for hop in headers.get("X-Forwarded-For", "").split(",") if hop.strip()]
+        if len(forwarded) >= CLIENT_PROXY_HOPS:
+            address = forwarded[-CLIENT_PROXY_HOPS]
+    return f"ip:{address or 'unknown'}"
+
+
+def gradio_client_id(request):
+    """client_id() for a gr.Request (None outside of a Gradio event)"""
+    if request is None:
+        return None
+    host = request.client.host if request.client else None
+    return client_id(request.headers, host)
+
+
+def limited_message(retry_after):
+    return f"🚦 You're sending requests too quickly. Please try again in {max(retry_after, 1):.0f}s."
+
+
+class ClientLimiter:
+    """Thread-safe per-client, per-kind token buckets with idle eviction"""
+
+    def __init__(self, budgets=CLIENT_BUDGETS, idle_ttl_s=CLIENT_IDLE_TTL_S, max_tracked=CLIENT_MAX_TRACKED):
+        self.budgets = budgets
+        self.idle_ttl_s = idle_ttl_s
+        self.max_tracked = max_tracked
+        self._clients = OrderedDict()  # client -> (last seen, {kind: TokenBucket}), least recently seen first
+        self._lock = threading.Lock()
+        self.allowed = Counter()
+        self.limited = Counter()
+        self.evicted = 0
+
+    def _evict(self, now):
+        while self._clients:
+            client, (last_seen, _) = next(iter(self._clients.items()))
+            if now - last_seen < self.idle_ttl_s and len(self._clients) <= self.max_tracked:
+                break
+            del self._clients[client]
+            self.evicted += 1
+
+    def check(self, client, kind):
+        """Count one request of `kind` from `client`; returns 0 if allowed, else seconds to wait"""
+        if not CLIENT_LIMITS_ENABLED or client is None or kind not in self.budgets:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            _, buckets = self._clients.pop(client, (now, {}))
+            self._clients[client] = (now, buckets)
+            self._evict(now)
+            bucket = buckets.get(kind)
+            if bucket is None:
+                per_minute, burst = self.budgets[kind]
+                bucket = buckets[kind] = TokenBucket(per_minute, burst_s=burst * 60 / per_minute)
+        retry_after = bucket.try_take(1)
+        with self._lock:
+            (self.limited if retry_after else self.allowed)[kind] += 1
+        return retry_after
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "enabled": CLIENT_LIMITS_ENABLED,
+                "budgets": {kind: {"per_minute": rpm, "burst": burst} for kind, (rpm, burst) in self.budgets.items()},
+                "tracked_clients": len(self._clients),
+                "evicted_clients": self.evicted,
+                "allowed": dict(self.allowed),
+                "limited": dict(self.limited),
+            }
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        lines = ["# TYPE client_requests_total counter"]
+        for kind in self.budgets:
+            lines.append(f'client_requests_total{{kind="{kind}",result="allowed"}} {snapshot["allowed"].get(kind, 0)}')
+            lines.append(f'client_requests_total{{kind="{kind}",result="limited"}} {snapshot["limited"].get(kind, 0)}')
+        lines.append("# TYPE client_tracked gauge")
+        lines.append(f"client_tracked {snapshot['tracked_clients']}")
+        return "\n".join(lines) + "\n"
+
+
+CLIENT_LIMITS = ClientLimiter()
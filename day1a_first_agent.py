@@ -4,23 +4,12 @@ Day 1A: From Prompt to Action
 Your First AI Agent with Google ADK
 """
 
-import os
 import asyncio
-from google.adk.agents import Agent
 from google.adk.runners import InMemoryRunner
-from google.adk.tools import google_search
 
-# Set up API key
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+from agent_runtime import build_chat_agent, require_api_key
 
-if not GOOGLE_API_KEY:
-    raise ValueError(
-        "GOOGLE_API_KEY environment variable is required.\n"
-        "Set it with: export GOOGLE_API_KEY=your-key"
-    )
-
-os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
-os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "FALSE"
+require_api_key()
 
 print("=" * 80)
 print("🚀 Day 1A: Your First AI Agent - From Prompt to Action")
@@ -29,12 +18,10 @@ print()
 
 # Section 2.2: Define your agent
 print("📝 Step 1: Defining the agent...")
-root_agent = Agent(
-    name="helpful_assistant",
-    model="gemini-2.5-flash-lite",
+# (the retrying, circuit-broken Gemini client and Google Search are the defaults)
+root_agent = build_chat_agent(
     description="A simple agent that can answer general questions.",
     instruction="You are a helpful assistant. Use Google Search for current info or if unsure.",
-    tools=[google_search],
 )
 print("✅ Root Agent defined.")
 print()
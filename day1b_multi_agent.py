@@ -4,28 +4,24 @@ Day 1B: Multi-Agent Systems & Workflow Patterns
 Demonstrates Sequential, Parallel, and Loop agent architectures
 """
 
-import os
+import time
 import asyncio
-from google.adk.agents import Agent, SequentialAgent, ParallelAgent, LoopAgent
+import argparse
+import difflib
+from typing import AsyncGenerator
+from google.adk.agents import Agent, BaseAgent, SequentialAgent, ParallelAgent, LoopAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
 from google.adk.runners import InMemoryRunner
 from google.adk.tools import AgentTool, FunctionTool, google_search
+from google.genai import types
 
-# Set up API key
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+from agent_runtime import get_model, require_api_key
 
-if not GOOGLE_API_KEY:
-    raise ValueError(
-        "GOOGLE_API_KEY environment variable is required.\n"
-        "Set it with: export GOOGLE_API_KEY=your-key"
-    )
-
-os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
-os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "FALSE"
+require_api_key()
 
-print("=" * 80)
-print("🚀 Day 1B: Multi-Agent Systems & Workflow Patterns")
-print("=" * 80)
-print()
+# Every agent shares one retrying, circuit-broken model client
+MODEL = get_model()
 
 
 # ============================================================================
@@ -37,7 +33,7 @@ def build_research_system():
 
     research_agent = Agent(
         name="ResearchAgent",
-        model="gemini-2.5-flash-lite",
+        model=MODEL,
         instruction="""You are a specialized research agent. Your only job is to use the
         google_search tool to find 2-3 pieces of relevant information on the given topic
         and present the findings with citations.""",
@@ -47,7 +43,7 @@ def build_research_system():
 
     summarizer_agent = Agent(
         name="SummarizerAgent",
-        model="gemini-2.5-flash-lite",
+        model=MODEL,
         instruction="""Read the provided research findings: {research_findings}
         Create a concise summary as a bulleted list with 3-5 key points.""",
         output_key="final_summary",
@@ -55,7 +51,7 @@ def build_research_system():
 
     root_agent = Agent(
         name="ResearchCoordinator",
-        model="gemini-2.5-flash-lite",
+        model=MODEL,
         instruction="""You are a research coordinator. Your goal is to answer the user's query by orchestrating a workflow.
         1. First, you MUST call the `ResearchAgent` tool to find relevant information.
         2. Next, after receiving the research findings, you MUST call the `SummarizerAgent` tool to create a concise summary.
@@ -78,7 +74,7 @@ def build_blog_pipeline():
 
     outline_agent = Agent(
         name="OutlineAgent",
-        model="gemini-2.5-flash-lite",
+        model=MODEL,
         instruction="""Create a blog outline for the given topic with:
         1. A catchy headline
         2. An introduction hook
@@ -89,7 +85,7 @@ def build_blog_pipeline():
 
     writer_agent = Agent(
         name="WriterAgent",
-        model="gemini-2.5-flash-lite",
+        model=MODEL,
         instruction="""Following this outline strictly: {blog_outline}
         Write a brief, 200 to 300-word blog post with an engaging and informative tone.""",
         output_key="blog_draft",
@@ -97,7 +93,7 @@ def build_blog_pipeline():
 
     editor_agent = Agent(
         name="EditorAgent",
-        model="gemini-2.5-flash-lite",
+        model=MODEL,
         instruction="""Edit this draft: {blog_draft}
         Your task is to polish the text by fixing any grammatical errors,
         improving the flow and sentence structure, and enhancing overall clarity.""",
@@ -121,7 +117,7 @@ def build_parallel_research():
 
     tech_researcher = Agent(
         name="TechResearcher",
-        model="gemini-2.5-flash-lite",
+        model=MODEL,
         instruction="""Research the latest AI/ML trends. Include 3 key developments,
         the main companies involved, and the potential impact. Keep the report very concise (100 words).""",
         tools=[google_search],
@@ -130,7 +126,7 @@ def build_parallel_research():
 
     health_researcher = Agent(
         name="HealthResearcher",
-        model="gemini-2.5-flash-lite",
+        model=MODEL,
         instruction="""Research recent medical breakthroughs. Include 3 significant advances,
         their practical applications, and estimated timelines. Keep the report concise (100 words).""",
         tools=[google_search],
@@ -139,7 +135,7 @@ def build_parallel_research():
 
     finance_researcher = Agent(
         name="FinanceResearcher",
-        model="gemini-2.5-flash-lite",
+        model=MODEL,
         instruction="""Research current fintech trends. Include 3 key trends,
         their market implications, and the future outlook. Keep the report concise (100 words).""",
         tools=[google_search],
@@ -148,7 +144,7 @@ def build_parallel_research():
 
     aggregator_agent = Agent(
         name="AggregatorAgent",
-        model="gemini-2.5-flash-lite",
+        model=MODEL,
         instruction="""Combine these three research findings into a single executive summary:
 
         **Technology Trends:**
@@ -178,53 +174,357 @@ def build_parallel_research():
     return root_agent
 
 
-async def demo_all_patterns():
-    """Run demonstrations of all agent patterns"""
+# ============================================================================
+# EXAMPLE 4: Loop Agent (Convergence-Aware Blog Refinement)
+# ============================================================================
 
-    print("=" * 80)
-    print("📋 EXAMPLE 1: LLM-Based Orchestration (Research & Summarization)")
-    print("=" * 80)
-    print()
+class RefinementGate(BaseAgent):
+    """Local (no model call) exit check for a writer/critic refinement loop.
+
+    check="approval" runs after the critic: it counts the iteration and exits
+    when the critique is APPROVED. check="convergence" runs after the refiner:
+    it exits when the draft changed less than `min_change` (1 - difflib ratio).
+    Both exit when the loop exceeds its latency or token budget. The iterations
+    used and the exit reason are recorded in session state. An approval gate
+    that exits repeats the current draft as its content, so the pipeline's
+    final response is the post rather than the critique.
+    """
+
+    check: str = "convergence"
+    draft_key: str = "blog_draft"
+    critique_key: str = "critique"
+    min_change: float = 0.05
+    max_seconds: float = 90.0
+    max_tokens: int = 20000
+
+    def _tokens_used(self, ctx: InvocationContext, started_at: float) -> int:
+        tokens = 0
+        for event in ctx.session.events:
+            if event.invocation_id == ctx.invocation_id and event.timestamp >= started_at:
+                usage = event.usage_metadata
+                if usage:
+                    tokens += usage.total_token_count or 0
+        return tokens
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        started_at = state.get("refinement_started_at", time.time())
+        draft = state.get(self.draft_key, "")
+        state_delta = {}
+        exit_reason = None
+
+        if self.check == "approval":
+            state_delta["refinement_iterations"] = state.get("refinement_iterations", 0) + 1
+            if state.get(self.critique_key, "").strip().upper().startswith("APPROVED"):
+                exit_reason = "approved"
+        else:
+            previous = state.get("refinement_previous_draft", "")
+            change = 1 - difflib.SequenceMatcher(None, previous, draft).ratio()
+            state_delta["refinement_last_change"] = round(change, 4)
+            state_delta["refinement_previous_draft"] = draft
+            if change < self.min_change:
+                exit_reason = "converged"
+
+        if exit_reason is None:
+            if time.time() - started_at > self.max_seconds:
+                exit_reason = "latency_budget"
+            elif self._tokens_used(ctx, started_at) > self.max_tokens:
+                exit_reason = "token_budget"
+
+        if exit_reason:
+            state_delta["refinement_exit_reason"] = exit_reason
+
+        content = None
+        if exit_reason and self.check == "approval" and draft:
+            content = types.Content(role="model", parts=[types.Part(text=draft)])
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=content,
+            actions=EventActions(state_delta=state_delta, escalate=bool(exit_reason)),
+        )
+
+
+def start_refinement_clock(callback_context):
+    """Reset the loop bookkeeping at the start of every refinement run"""
+    state = callback_context.state
+    state["refinement_started_at"] = time.time()
+    state["refinement_iterations"] = 0
+    state["refinement_previous_draft"] = state.get("blog_draft", "")
+    state["refinement_exit_reason"] = "max_iterations"
+    return None
+
+
+def build_refined_blog_pipeline(max_iterations=3, min_change=0.05, max_seconds=90.0, max_tokens=20000):
+    """Build a blog pipeline with a writer/critic refinement loop that exits early"""
 
-    research_system = build_research_system()
-    runner = InMemoryRunner(agent=research_system)
+    outline_agent = Agent(
+        name="OutlineAgent",
+        model=MODEL,
+        instruction="""Create a blog outline for the given topic with:
+        1. A catchy headline
+        2. An introduction hook
+        3. 3-5 main sections with 2-3 bullet points for each
+        4. A concluding thought""",
+        output_key="blog_outline",
+    )
 
-    print("Query: What are the latest advancements in quantum computing?")
-    print()
-    response = await runner.run_debug("What are the latest advancements in quantum computing?")
-    print()
+    writer_agent = Agent(
+        name="WriterAgent",
+        model=MODEL,
+        instruction="""Following this outline strictly: {blog_outline}
+        Write a brief, 200 to 300-word blog post with an engaging and informative tone.""",
+        output_key="blog_draft",
+    )
 
-    print("=" * 80)
-    print("✏️ EXAMPLE 2: Sequential Agent (Blog Post Pipeline)")
-    print("=" * 80)
-    print()
+    critic_agent = Agent(
+        name="CriticAgent",
+        model=MODEL,
+        instruction="""You are a demanding blog editor. Review this draft: {blog_draft}
 
-    blog_pipeline = build_blog_pipeline()
-    runner = InMemoryRunner(agent=blog_pipeline)
+        - If the draft is clear, well structured and engaging, respond with EXACTLY "APPROVED".
+        - Otherwise, give 2-3 specific, actionable improvements.""",
+        output_key="critique",
+    )
 
-    print("Topic: Benefits of multi-agent systems")
-    print()
-    response = await runner.run_debug("Write a blog post about the benefits of multi-agent systems")
-    print()
+    refiner_agent = Agent(
+        name="RefinerAgent",
+        model=MODEL,
+        instruction="""Rewrite this blog draft to fully address the critique.
+
+        Draft: {blog_draft}
+        Critique: {critique}
+
+        Output only the improved blog post (200 to 300 words).""",
+        output_key="blog_draft",
+    )
+
+    gate_budget = dict(min_change=min_change, max_seconds=max_seconds, max_tokens=max_tokens)
+
+    refinement_loop = LoopAgent(
+        name="BlogRefinementLoop",
+        sub_agents=[
+            critic_agent,
+            RefinementGate(name="ApprovalGate", check="approval", **gate_budget),
+            refiner_agent,
+            RefinementGate(name="ConvergenceGate", check="convergence", **gate_budget),
+        ],
+        max_iterations=max_iterations,
+        before_agent_callback=start_refinement_clock,
+    )
+
+    root_agent = SequentialAgent(
+        name="RefinedBlogPipeline",
+        sub_agents=[outline_agent, writer_agent, refinement_loop],
+    )
+
+    return root_agent
+
+
+def refinement_summary(events):
+    """Return (iterations used, exit reason) from the state changes in a run's events"""
+    iterations, exit_reason = 0, None
+    for event in events:
+        state_delta = event.actions.state_delta if event.actions else None
+        if state_delta:
+            iterations = state_delta.get("refinement_iterations", iterations)
+            exit_reason = state_delta.get("refinement_exit_reason", exit_reason)
+    return iterations, exit_reason
+
+
+# ============================================================================
+# TIMING HELPERS
+# ============================================================================
+
+def final_text(events):
+    """Return the text of the last final response in a list of events"""
+    for event in reversed(events):
+        if event.is_final_response() and event.content and event.content.parts:
+            text = "".join(part.text for part in event.content.parts if part.text)
+            if text:
+                return text
+    return ""
+
+
+def attach_agent_timers(agent, agent_times):
+    """Accumulate wall time per agent name into agent_times via agent callbacks.
+
+    Walks the whole tree: workflow sub_agents as well as agents wrapped in AgentTool.
+    """
+    starts = {}
+
+    def before_agent(callback_context):
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        starts[key] = time.perf_counter()
+        return None
+
+    def after_agent(callback_context):
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        started = starts.pop(key, None)
+        if started is not None:
+            name = callback_context.agent_name
+            agent_times[name] = agent_times.get(name, 0.0) + time.perf_counter() - started
+        return None
+
+    def chain(existing, callback):
+        if existing is None:
+            return callback
+        if isinstance(existing, list):
+            return [*existing, callback]
+        return [existing, callback]
+
+    def walk(node):
+        node.before_agent_callback = chain(node.before_agent_callback, before_agent)
+        node.after_agent_callback = chain(node.after_agent_callback, after_agent)
+        for sub_agent in node.sub_agents:
+            walk(sub_agent)
+        for tool in getattr(node, "tools", None) or []:
+            if isinstance(tool, AgentTool):
+                walk(tool.agent)
+
+    walk(agent)
+    return agent
+
+
+DEMO_PIPELINES = [
+    {
+        "name": "Research System",
+        "header": "📋 EXAMPLE 1: LLM-Based Orchestration (Research & Summarization)",
+        "label": "Query: What are the latest advancements in quantum computing?",
+        "builder": build_research_system,
+        "query": "What are the latest advancements in quantum computing?",
+    },
+    {
+        "name": "Blog Pipeline",
+        "header": "✏️ EXAMPLE 2: Sequential Agent (Blog Post Pipeline)",
+        "label": "Topic: Benefits of multi-agent systems",
+        "builder": build_blog_pipeline,
+        "query": "Write a blog post about the benefits of multi-agent systems",
+    },
+    {
+        "name": "Parallel Research",
+        "header": "🔄 EXAMPLE 3: Parallel Agent (Multi-Topic Research)",
+        "label": "Briefing: Daily executive summary on Tech, Health, and Finance",
+        "builder": build_parallel_research,
+        "query": "Run the daily executive briefing on Tech, Health, and Finance",
+    },
+    {
+        "name": "Refined Blog Pipeline",
+        "header": "🔁 EXAMPLE 4: Loop Agent (Convergence-Aware Blog Refinement)",
+        "label": "Topic: Why iterative refinement improves writing",
+        "builder": build_refined_blog_pipeline,
+        "query": "Write a blog post about why iterative refinement improves writing",
+    },
+]
+
+
+async def run_timed_pipeline(pipeline, agent_times, quiet=False):
+    """Build and run one demo pipeline, returning (elapsed seconds, events)"""
+    root_agent = attach_agent_timers(pipeline["builder"](), agent_times)
+    runner = InMemoryRunner(agent=root_agent)
+
+    started = time.perf_counter()
+    events = await runner.run_debug(pipeline["query"], quiet=quiet)
+    return time.perf_counter() - started, events
+
+
+def print_refinement(events):
+    """Print how many refinement iterations a run actually used, if it had a loop"""
+    iterations, exit_reason = refinement_summary(events)
+    if iterations:
+        print(f"🔁 Refinement loop used {iterations} iteration(s) - exit reason: {exit_reason}")
+        print()
+
+
+def print_timing_report(wall_time, pipeline_times, agent_times):
+    """Print wall time, per-pipeline and per-agent time and the speedup vs sequential"""
+    sequential_time = sum(pipeline_times.values())
 
     print("=" * 80)
-    print("🔄 EXAMPLE 3: Parallel Agent (Multi-Topic Research)")
+    print("⏱️  Timing Report")
     print("=" * 80)
+    print(f"Wall time:                 {wall_time:7.2f}s")
+    print(f"Sum of pipeline times:     {sequential_time:7.2f}s")
+    if wall_time > 0:
+        print(f"Speedup vs sequential:     {sequential_time / wall_time:7.2f}x")
     print()
-
-    parallel_research = build_parallel_research()
-    runner = InMemoryRunner(agent=parallel_research)
-
-    print("Briefing: Daily executive summary on Tech, Health, and Finance")
+    print("Per pipeline:")
+    for name, elapsed in pipeline_times.items():
+        print(f"  {name:<30} {elapsed:7.2f}s")
     print()
-    response = await runner.run_debug("Run the daily executive briefing on Tech, Health, and Finance")
+    print("Per agent:")
+    for name, elapsed in sorted(agent_times.items(), key=lambda item: -item[1]):
+        print(f"  {name:<30} {elapsed:7.2f}s")
     print()
 
+
+async def demo_all_patterns(concurrent=False):
+    """Run demonstrations of all agent patterns.
+
+    With concurrent=True the independent pipelines run together via asyncio,
+    so the demo finishes in roughly the time of the slowest pipeline.
+    """
+    pipeline_times = {}
+    agent_times = {}
+    started = time.perf_counter()
+
+    if concurrent:
+        print("=" * 80)
+        print("⚡ Running all examples concurrently")
+        print("=" * 80)
+        print()
+
+        async def run_one(pipeline):
+            elapsed, events = await run_timed_pipeline(pipeline, agent_times, quiet=True)
+            pipeline_times[pipeline["name"]] = elapsed
+            return events
+
+        results = await asyncio.gather(*(run_one(pipeline) for pipeline in DEMO_PIPELINES))
+
+        for pipeline, events in zip(DEMO_PIPELINES, results, strict=True):
+            print("=" * 80)
+            print(pipeline["header"])
+            print("=" * 80)
+            print()
+            print(pipeline["label"])
+            print()
+            print(final_text(events))
+            print()
+            print_refinement(events)
+    else:
+        for pipeline in DEMO_PIPELINES:
+            print("=" * 80)
+            print(pipeline["header"])
+            print("=" * 80)
+            print()
+            print(pipeline["label"])
+            print()
+            elapsed, events = await run_timed_pipeline(pipeline, agent_times)
+            pipeline_times[pipeline["name"]] = elapsed
+            print()
+            print_refinement(events)
+
+    wall_time = time.perf_counter() - started
+
     print("=" * 80)
     print("✅ All Multi-Agent Patterns Demonstrated!")
     print("=" * 80)
+    print()
+    print_timing_report(wall_time, pipeline_times, agent_times)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Day 1B multi-agent pattern demos")
+    parser.add_argument(
+        "--concurrent", action="store_true",
+        help="Run the independent demo pipelines concurrently instead of one after another",
+    )
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("🚀 Day 1B: Multi-Agent Systems & Workflow Patterns")
+    print("=" * 80)
     print("\n🤖 Day 1B: Multi-Agent Systems Demonstrations\n")
-    asyncio.run(demo_all_patterns())
+    asyncio.run(demo_all_patterns(concurrent=args.concurrent))
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Adaptive Degrade Mode Under Load
+Trades a little answer quality for latency when the queue gets deep
+
+DegradeController watches the queue depth and the p95 latency of recent
+requests. Pipelines differ a lot in how long a healthy run takes, so each
+latency is scaled by its pipeline's deadline to chat-equivalent seconds (a
+45s briefing under a 90s deadline counts like a 15s chat under a 30s one)
+before it is compared with DEGRADE_LATENCY_S. Load pressure is the larger of the two ratios against their
+thresholds; beyond 1.0 the agents switch to the "short" profile (shorter
+answers and briefing word targets), beyond 2.0 to "no_search" (short and
+without Google Search). Stepping up is immediate; stepping down happens one
+level at a time once pressure falls below 70% of the level's threshold and
+DEGRADE_COOLDOWN_S have passed since the last transition.
+
+Each request is pinned to the profile that was active when it started
+(degrade_scope), and degrade_model_callback applies it to every model call -
+attach it as before_model_callback of the agents that should degrade.
+Transitions are logged and exported by DEGRADE.prometheus_text().
+
+Configuration (environment variables):
+    DEGRADE_QUEUE_DEPTH=4  DEGRADE_LATENCY_S=15
+    DEGRADE_WINDOW_S=120   DEGRADE_COOLDOWN_S=30
+"""
+
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+from resilience import PIPELINE_TIMEOUTS
+
+DEGRADE_QUEUE_DEPTH = int(os.getenv("DEGRADE_QUEUE_DEPTH", "4"))
+DEGRADE_LATENCY_S = float(os.getenv("DEGRADE_LATENCY_S", "15"))
+DEGRADE_WINDOW_S = float(os.getenv("DEGRADE_WINDOW_S", "120"))
+DEGRADE_COOLDOWN_S = float(os.getenv("DEGRADE_COOLDOWN_S", "30"))
+
+# Recovery hysteresis: leave level N once pressure drops below N * this factor
+RECOVERY_FACTOR = 0.7
+# Latency only counts once the window holds this many requests
+MIN_LATENCY_SAMPLES = 5
+
+DEGRADE_PROFILES = [
+    {
+        "name": "normal",
+        "search": True,
+        "answer_words": None,
+        "research_words": "100-150",
+        "summary_words": "250-300",
+    },
+    {
+        "name": "short",
+        "search": True,
+        "answer_words": 120,
+        "research_words": "50-80",
+        "summary_words": "120-150",
+    },
+    {
+        "name": "no_search",
+        "search": False,
+        "answer_words": 120,
+        "research_words": "50-80",
+        "summary_words": "120-150",
+    },
+]
+
+
+def _p95(values):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] if ordered else 0.0
+
+
+class DegradeController:
+    """Thread-safe load-driven switch between the DEGRADE_PROFILES"""
+
+    def __init__(self, queue_threshold=DEGRADE_QUEUE_DEPTH, latency_threshold=DEGRADE_LATENCY_S,
+                 window=DEGRADE_WINDOW_S, cooldown=DEGRADE_COOLDOWN_S):
+        self.queue_threshold = queue_threshold
+        self.latency_threshold = latency_threshold
+        self.window = window
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._latencies = deque()
+        self._level = 0
+        self._changed_at = 0.0
+        self._queue_depth = 0
+        self._transitions = {}
+        self._history = deque(maxlen=20)
+
+    def observe_latency(self, seconds, pipeline="chat"):
+        """Record the duration of a finished request of `pipeline` (in chat-equivalent seconds)"""
+        budget = PIPELINE_TIMEOUTS.get(pipeline)
+        if budget:
+            seconds *= PIPELINE_TIMEOUTS["chat"] / budget
+        with self._lock:
+            self._latencies.append((time.monotonic(), seconds))
+
+    def _recent_p95(self, now):
+        while self._latencies and self._latencies[0][0] < now - self.window:
+            self._latencies.popleft()
+        if len(self._latencies) < MIN_LATENCY_SAMPLES:
+            # A couple of slow requests are not a trend
+            return 0.0
+        return _p95([seconds for _, seconds in self._latencies])
+
+    def update(self, queue_depth):
+        """Re-evaluate the degrade level for the current queue depth; returns the active profile"""
+        now = time.monotonic()
+        with self._lock:
+            self._queue_depth = queue_depth
+            p95 = self._recent_p95(now)
+            pressure = max(queue_depth / self.queue_threshold, p95 / self.latency_threshold)
+            target = min(int(pressure), len(DEGRADE_PROFILES) - 1)
+
+            level = self._level
+            if target > level:
+                level = target
+            elif level > 0 and pressure < level * RECOVERY_FACTOR and now - self._changed_at >= self.cooldown:
+                level -= 1
+
+            if level != self._level:
+                transition = {
+                    "from": DEGRADE_PROFILES[self._level]["name"],
+                    "to": DEGRADE_PROFILES[level]["name"],
+                    "at": time.time(),
+                    "queue_depth": queue_depth,
+                    "latency_p95_s": round(p95, 3),
+                }
+                key = (transition["from"], transition["to"])
+                self._transitions[key] = self._transitions.get(key, 0) + 1
+                self._history.append(transition)
+                self._level, self._changed_at = level, now
+                print(
+                    f"🐢 Degrade mode: {transition['from']} → {transition['to']} "
+                    f"(queue depth {queue_depth}, p95 latency {p95:.1f}s)"
+                )
+            return DEGRADE_PROFILES[self._level]
+
+    def profile(self):
+        with self._lock:
+            return DEGRADE_PROFILES[self._level]
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "level": self._level,
+                "profile": DEGRADE_PROFILES[self._level]["name"],
+                "queue_depth": self._queue_depth,
+                "latency_p95_s": round(self._recent_p95(now), 3),
+                "queue_threshold": self.queue_threshold,
+                "latency_threshold_s": self.latency_threshold,
+                "recent_transitions": list(self._history),
+            }
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        with self._lock:
+            transitions = sorted(self._transitions.items())
+        lines = [
+            "# TYPE agent_degrade_level gauge",
+            f"agent_degrade_level {snapshot['level']}",
+            "# TYPE agent_degrade_queue_depth gauge",
+            f"agent_degrade_queue_depth {snapshot['queue_depth']}",
+            "# TYPE agent_degrade_latency_p95_seconds gauge",
+            f"agent_degrade_latency_p95_seconds {snapshot['latency_p95_s']}",
+            "# TYPE agent_degrade_transitions_total counter",
+        ]
+        for (source, target), count in transitions:
+            lines.append(f'agent_degrade_transitions_total{{from="{source}",to="{target}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+DEGRADE = DegradeController()
+
+_profile = contextvars.ContextVar("degrade_profile", default=None)
+
+
+@contextmanager
+def degrade_scope(profile):
+    """Pin the enclosed request (and every task it spawns) to `profile`"""
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+
+
+def current_profile():
+    """The profile pinned to the current request, or the controller's active one"""
+    return _profile.get() or DEGRADE.profile()
+
+
+def degrade_model_callback(callback_context, llm_request):
+    """before_model_callback applying the current profile to one model call"""
+    profile = current_profile()
+    if profile["search"] and not profile["answer_words"]:
+        return None
+
+    instructions = []
+    if not profile["search"]:
+        if llm_request.config and llm_request.config.tools:
+            llm_request.config.tools = [
+                tool for tool in llm_request.config.tools if getattr(tool, "google_search", None) is None
+            ]
+        llm_request.tools_dict.pop("google_search", None)
+        instructions.append("Web search is unavailable right now: answer from your own knowledge.")
+    if profile["answer_words"]:
+        instructions.append(
+            f"The service is under heavy load: keep your answer under {profile['answer_words']} words."
+        )
+    llm_request.append_instructions(instructions)
+    return None
@@ -93,6 +93,13 @@ echo -e "${BLUE}  → Uploading requirements.txt...${NC}"
 huggingface-cli upload "spaces/${FULL_REPO}" requirements.txt requirements.txt
 echo -e "${GREEN}  ✅ requirements.txt uploaded${NC}"
 
+# Helper modules imported by app.py
+for module in agent_runtime.py chat_ui.py agent_tracing.py usage_accounting.py resilience.py cancellation.py scheduler.py degrade.py archive.py chat_session.py runner_pool.py warmup.py model_client.py model_pool.py pacing.py client_limits.py profiling.py telemetry.py; do
+    echo -e "${BLUE}  → Uploading ${module}...${NC}"
+    huggingface-cli upload "spaces/${FULL_REPO}" "${module}" "${module}"
+    echo -e "${GREEN}  ✅ ${module} uploaded${NC}"
+done
+
 echo ""
 echo -e "${GREEN}"
 echo "========================================="
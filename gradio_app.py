@@ -4,82 +4,26 @@ Gradio Interface for AI Agent Chat
 Deploy this to Hugging Face Spaces or run locally
 """
 
-import os
-import asyncio
-import gradio as gr
-from google.adk.agents import Agent
-from google.adk.runners import InMemoryRunner
-from google.adk.tools import google_search
+from agent_runtime import MODEL_NAME, build_chat_agent, require_api_key
+from chat_ui import build_chat_demo
+from runner_pool import RunnerPool
+from warmup import start_warm_up
 
-# Set up API key
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# Fail fast without an API key
+require_api_key()
 
-if not GOOGLE_API_KEY:
-    raise ValueError(
-        "GOOGLE_API_KEY environment variable is required.\n"
-        "Set it with: export GOOGLE_API_KEY=your-key"
-    )
-
-os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
-os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "FALSE"
-
-# Create the AI agent
-root_agent = Agent(
-    name="helpful_assistant",
-    model="gemini-2.5-flash-lite",
-    description="A helpful AI assistant that can answer questions and search the web.",
-    instruction="""You are a helpful and friendly AI assistant.
-    Use Google Search for current information, news, weather, or any time-sensitive queries.
-    Provide clear, concise, and accurate responses.
-    Be conversational and engaging.
-    Format your responses nicely with markdown when appropriate.""",
-    tools=[google_search],
-)
-
-# Create the runner
-runner = InMemoryRunner(agent=root_agent)
+# Runners (and the agent and model behind them) are created on the first
+# message, so the UI is up without waiting for google.adk to load
+runner = RunnerPool(build_chat_agent, "chat")
 
 print("=" * 80)
 print("🚀 AI Agent Chat - Gradio Interface")
 print("=" * 80)
-print("✅ Agent initialized with Google Search tool")
-print("✅ Model: gemini-2.5-flash-lite")
+print("✅ Agent: helpful_assistant with Google Search tool")
+print(f"✅ Model: {MODEL_NAME}")
 print("=" * 80)
 
 
-def chat_with_agent(message, history):
-    """
-    Process user message and return agent response
-
-    Args:
-        message: User's current message
-        history: Chat history in Gradio format [[user_msg, bot_msg], ...]
-
-    Returns:
-        str: Agent's response
-    """
-    if not message or not message.strip():
-        return ""
-
-    try:
-        # Run the agent query
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        response = loop.run_until_complete(runner.run_debug(message))
-        loop.close()
-
-        # Extract the text response
-        if response and len(response) > 0:
-            response_text = response[0].content.parts[0].text
-            return response_text
-        else:
-            return "❌ Sorry, I couldn't generate a response. Please try again."
-
-    except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        return f"❌ Error: {str(e)}"
-
-
 # Custom CSS for a beautiful interface
 custom_css = """
 .gradio-container {
@@ -105,95 +49,12 @@ footer {
 """
 
 # Create Gradio interface
-with gr.Blocks(
-    theme=gr.themes.Soft(
-        primary_hue="purple",
-        secondary_hue="violet",
-    ),
+demo = build_chat_demo(
+    runner,
     css=custom_css,
-    title="AI Agent Chat",
-) as demo:
-
-    # Header
-    gr.Markdown(
-        """
-        # 🤖 AI Agent Chat
-        ### Powered by Google ADK & Gemini
-
-        Ask me anything! I can search the web for current information, answer questions, and help with various tasks.
-        """
-    )
-
-    # Chat interface
-    chatbot = gr.Chatbot(
-        height=500,
-        show_label=False,
-        avatar_images=(
-            None,  # User avatar (default)
-            "https://em-content.zobj.net/source/apple/391/robot_1f916.png"  # Agent avatar
-        ),
-        bubble_full_width=False,
-    )
-
-    # Input area
-    with gr.Row():
-        msg = gr.Textbox(
-            placeholder="Type your message here...",
-            show_label=False,
-            scale=9,
-            autofocus=True,
-        )
-        submit = gr.Button("Send 📤", variant="primary", scale=1)
-
-    # Examples
-    gr.Examples(
-        examples=[
-            "What's the weather in Tokyo?",
-            "Explain how AI agents work in simple terms",
-            "Write a Python function to calculate factorial",
-            "What are the latest tech news?",
-            "Compare cats vs dogs in a table",
-        ],
-        inputs=msg,
-        label="💡 Try these examples:",
-    )
-
-    # Clear button
-    clear = gr.Button("🗑️ Clear Chat", variant="secondary")
-
-    # Info section
-    with gr.Accordion("ℹ️ About this AI Agent", open=False):
-        gr.Markdown(
-            """
-            ### Features:
-            - 🔍 **Google Search**: Can search the web for current information
-            - 🧠 **Smart Tool Usage**: Decides when to use search based on your query
-            - ⚡ **Fast Responses**: Using Gemini 2.5 Flash Lite
-            - 📊 **Rich Formatting**: Supports markdown for beautiful responses
-
-            ### How it works:
-            1. You ask a question
-            2. The agent analyzes if it needs current information
-            3. If needed, it searches Google
-            4. It synthesizes the information into a clear answer
-
-            ### Technical Details:
-            - **Framework**: Google Agent Development Kit (ADK)
-            - **Model**: Gemini 2.5 Flash Lite
-            - **Tools**: Google Search
-            - **Interface**: Gradio
-            """
-        )
-
-    # Event handlers
-    def respond(message, chat_history):
-        bot_message = chat_with_agent(message, chat_history)
-        chat_history.append((message, bot_message))
-        return "", chat_history
-
-    msg.submit(respond, [msg, chatbot], [msg, chatbot])
-    submit.click(respond, [msg, chatbot], [msg, chatbot])
-    clear.click(lambda: None, None, chatbot, queue=False)
+    primary_hue="purple",
+    secondary_hue="violet",
+)
 
 
 if __name__ == "__main__":
@@ -201,6 +62,9 @@ if __name__ == "__main__":
     print("📱 The interface will open in your browser automatically")
     print("\nPress CTRL+C to stop the server\n")
 
+    # Build the agent and prime the model before the first user arrives
+    start_warm_up([runner], prime_pool=runner)
+
     # Launch the app
     demo.launch(
         server_name="0.0.0.0",
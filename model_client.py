@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Shared Model Client and Connection Pool
+One event loop and one pooled HTTP client for every model call in the process
+
+ADK keeps one google-genai client per model object and event loop, and the
+client's keep-alive connections belong to that loop. The model pool keeps
+one model object per API key (see model_pool.py), and run_traced() runs
+every agent run on MODEL_LOOP, a background event loop thread. Runners,
+pipelines, the dynamic briefing runners, Flask request threads (each with
+its own loop), Gradio handlers and the warm-up therefore share one client
+(per key) and its connection pool, and TCP + TLS setup is paid once per
+pooled connection instead of once per request.
+
+The pool is sized with httpx limits. Every request is traced (httpcore's
+trace extension) to count new vs reused connections:
+
+    model_http_requests_total                  requests sent
+    model_http_connections_opened_total        of which needed a new connection
+    model_http_connect_seconds_total           time spent setting those up
+
+Configuration (environment variables):
+    MODEL_HTTP_POOL_SIZE=32  MODEL_HTTP_KEEPALIVE_S=120  MODEL_SHARED_LOOP=1
+"""
+
+import os
+import time
+import asyncio
+import threading
+
+MODEL_HTTP_POOL_SIZE = int(os.getenv("MODEL_HTTP_POOL_SIZE", "32"))
+MODEL_HTTP_KEEPALIVE_S = float(os.getenv("MODEL_HTTP_KEEPALIVE_S", "120"))
+MODEL_SHARED_LOOP = os.getenv("MODEL_SHARED_LOOP", "1") != "0"
+
+
+class ConnectionStats:
+    """Thread-safe counters of model HTTP requests and the connections they opened"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.opened = 0
+        self.connect_s = 0.0
+
+    def record(self, opened, connect_s=0.0):
+        with self._lock:
+            self.requests += 1
+            if opened:
+                self.opened += 1
+                self.connect_s += connect_s
+
+    def snapshot(self):
+        with self._lock:
+            reused = self.requests - self.opened
+            return {
+                "pool_size": MODEL_HTTP_POOL_SIZE,
+                "keepalive_s": MODEL_HTTP_KEEPALIVE_S,
+                "requests": self.requests,
+                "new_connections": self.opened,
+                "reused_connections": reused,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else None,
+                "avg_connect_ms": round(self.connect_s / self.opened * 1000, 1) if self.opened else None,
+            }
+
+    def prometheus_text(self):
+        with self._lock:
+            lines = [
+                "# TYPE model_http_requests_total counter",
+                f"model_http_requests_total {self.requests}",
+                "# TYPE model_http_connections_opened_total counter",
+                f"model_http_connections_opened_total {self.opened}",
+                "# TYPE model_http_connect_seconds_total counter",
+                f"model_http_connect_seconds_total {self.connect_s:.6f}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+CONNECTIONS = ConnectionStats()
+
+
+async def _trace_request(request):
+    """httpx request hook: follow the request through httpcore to see if it opened a connection"""
+    state = {"connect_started": None, "connect_s": 0.0, "opened": False}
+
+    async def trace(name, info):
+        if name == "connection.connect_tcp.started":
+            state["connect_started"] = time.perf_counter()
+        elif name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            state["opened"] = True
+            state["connect_s"] = time.perf_counter() - state["connect_started"]
+        elif name.endswith("send_request_headers.started"):
+            CONNECTIONS.record(state["opened"], state["connect_s"])
+
+    request.extensions["trace"] = trace
+
+
+def pooled_client_kwargs():
+    """Client options for Gemini(client_kwargs=...): a sized, keep-alive, instrumented pool.
+
+    They replace ADK's client-level http_options; its tracking headers are
+    still added to every request.
+    """
+    import httpx
+    from google.genai import types
+
+    limits = httpx.Limits(
+        max_connections=MODEL_HTTP_POOL_SIZE,
+        max_keepalive_connections=MODEL_HTTP_POOL_SIZE,
+        keepalive_expiry=MODEL_HTTP_KEEPALIVE_S,
+    )
+    return {
+        "http_options": types.HttpOptions(
+            client_args={"limits": limits},
+            async_client_args={"limits": limits, "event_hooks": {"request": [_trace_request]}},
+        )
+    }
+
+
+class ModelLoop:
+    """Background event loop thread on which every agent run of the process executes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+
+    @property
+    def loop(self):
+        with self._lock:
+            # Started on first use - and again in forked workers, whose copy has no thread
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+                threading.Thread(target=self._loop.run_forever, name="model-loop", daemon=True).start()
+            return self._loop
+
+    def _on_loop(self):
+        return not MODEL_SHARED_LOOP or asyncio.get_running_loop() is self.loop
+
+    async def run_async(self, coro):
+        """Await `coro` on the model loop from any event loop.
+
+        Context variables (deadline, degrade profile) travel with it, and
+        cancelling the caller cancels the run.
+        """
+        if self._on_loop():
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def run(self, coro):
+        """Run `coro` on the model loop from synchronous code and return its result"""
+        if not MODEL_SHARED_LOOP:
+            return asyncio.run(coro)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def relay(self, callback):
+        """Wrap `callback` so it runs on the calling event loop when invoked from the model loop"""
+        if self._on_loop():
+            return callback
+        caller = asyncio.get_running_loop()
+        return lambda *args: caller.call_soon_threadsafe(callback, *args)
+
+
+MODEL_LOOP = ModelLoop()
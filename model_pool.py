@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+API Key and Model Pool
+Spreads model calls over several API keys and models to raise the quota ceiling
+
+Every (key, model) pair is a backend with weight key weight x model weight:
+
+    GOOGLE_API_KEYS="key-a,key-b:2"                    (default: GOOGLE_API_KEY)
+    MODEL_POOL="gemini-2.5-flash-lite:3,gemini-2.0-flash:1"   (default: MODEL_NAME)
+
+ResilientGemini (see resilience.py) acquires a backend for every model call
+attempt: the one with the fewest calls in flight per unit of weight, ties
+going to the one that has served the fewest calls per unit of weight - so
+sequential traffic is split by weight and concurrent traffic goes to idle
+backends first. Each key gets its own pooled client (see model_client.py).
+
+With MODEL_RPM / MODEL_TPM set, every backend also paces its calls (see
+pacing.py): backends that can send right away are preferred, and when all of
+them are at their budget the call waits for the one that frees up first.
+
+A 429 takes the backend out of rotation until its quota window resets (the
+API's retry hint, otherwise RATE_LIMIT_COOLDOWN_S) and the call moves to
+another backend right away. When every backend is rate limited, the usual
+retry/backoff applies to the one that resets first.
+
+Usage is tracked per backend (calls, errors, 429s, tokens, time spent
+waiting for budget); keys are only ever shown by their last four characters.
+
+Configuration (environment variables):
+    GOOGLE_API_KEYS  MODEL_POOL  RATE_LIMIT_COOLDOWN_S=60  MODEL_RPM  MODEL_TPM
+"""
+
+import os
+import time
+import functools
+import threading
+
+from agent_runtime import MODEL_NAME
+from resilience import DeadlineExceeded
+from pacing import MODEL_RPM, MODEL_TPM, TokenBucket
+
+RATE_LIMIT_COOLDOWN_S = float(os.getenv("RATE_LIMIT_COOLDOWN_S", "60"))
+
+
+def parse_weighted(value):
+    """"a,b:2" -> [("a", 1.0), ("b", 2.0)]"""
+    entries = []
+    for item in value.split(","):
+        name, _, weight = item.strip().partition(":")
+        if name:
+            entries.append((name, float(weight) if weight else 1.0))
+    return entries
+
+
+def mask_key(key):
+    return f"…{key[-4:]}" if len(key) > 8 else "…"
+
+
+class Backend:
+    """One API key + model combination and its usage"""
+
+    def __init__(self, key_index, key, model, weight):
+        self.key_index = key_index
+        self.key = key
+        self.model = model
+        self.weight = max(weight, 0.01)
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cooldown_until = 0.0
+        self.rpm = TokenBucket(MODEL_RPM) if MODEL_RPM > 0 else None
+        self.tpm = TokenBucket(MODEL_TPM) if MODEL_TPM > 0 else None
+        self.paced = 0
+        self.wait_s = 0.0
+        self.max_wait_s = 0.0
+
+    @property
+    def label(self):
+        return f"key{self.key_index}/{self.model}"
+
+    def available(self, now):
+        return now >= self.cooldown_until
+
+    def pacing_wait(self, prompt_tokens, now):
+        """Seconds until this backend's RPM / TPM budget allows one more call"""
+        return max(
+            self.rpm.wait_time(1, now) if self.rpm else 0.0,
+            self.tpm.wait_time(prompt_tokens, now) if self.tpm else 0.0,
+        )
+
+    def reserve(self, prompt_tokens, now):
+        return max(
+            self.rpm.reserve(1, now) if self.rpm else 0.0,
+            self.tpm.reserve(prompt_tokens, now) if self.tpm else 0.0,
+        )
+
+
+class ModelPool:
+    """Thread-safe weighted, least-loaded dispatch over API keys and models"""
+
+    def __init__(self, keys, models, cooldown_s=RATE_LIMIT_COOLDOWN_S):
+        if not keys:
+            raise ValueError("The model pool needs at least one API key (GOOGLE_API_KEYS or GOOGLE_API_KEY).")
+        self.cooldown_s = cooldown_s
+        self.backends = [
+            Backend(index, key, model, key_weight * model_weight)
+            for index, (key, key_weight) in enumerate(keys, start=1)
+            for model, model_weight in models
+        ]
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def client(self, backend):
+        """The Gemini model object (and with it the pooled client) for the backend's key"""
+        with self._lock:
+            llm = self._clients.get(backend.key)
+            if llm is None:
+                from google.adk.models.google_llm import Gemini
+                from model_client import pooled_client_kwargs
+
+                llm = Gemini(model=backend.model, client_kwargs={"api_key": backend.key, **pooled_client_kwargs()})
+                self._clients[backend.key] = llm
+            return llm
+
+    def acquire(self, prompt_tokens=1, max_wait=None):
+        """Pick a backend for one model call and reserve its pacing budget.
+
+        Returns (backend, seconds to wait before sending); release() the
+        backend when the call is over. Raises DeadlineExceeded instead of
+        reserving if the wait would outlast `max_wait`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            available = [backend for backend in self.backends if backend.available(now)]
+            if not available:
+                available = [min(self.backends, key=lambda backend: backend.cooldown_until)]
+            backend = min(
+                available,
+                key=lambda candidate: (
+                    candidate.pacing_wait(prompt_tokens, now),
+                    candidate.in_flight / candidate.weight,
+                    candidate.calls / candidate.weight,
+                ),
+            )
+            if max_wait is not None and backend.pacing_wait(prompt_tokens, now) >= max_wait:
+                raise DeadlineExceeded(f"{backend.label} has no RPM/TPM budget left before the deadline")
+            wait = backend.reserve(prompt_tokens, now)
+            backend.in_flight += 1
+            backend.calls += 1
+            if wait > 0:
+                backend.paced += 1
+                backend.wait_s += wait
+                backend.max_wait_s = max(backend.max_wait_s, wait)
+        if wait >= 1:
+            print(f"⏳ Pacing {backend.label}: waiting {wait:.1f}s for RPM/TPM budget")
+        return backend, wait
+
+    def refund(self, backend, prompt_tokens=1):
+        """Return the reservation of a call that was never sent"""
+        if backend.rpm:
+            backend.rpm.refund(1)
+        if backend.tpm:
+            backend.tpm.refund(prompt_tokens)
+
+    def release(self, backend):
+        with self._lock:
+            backend.in_flight -= 1
+
+    def record_usage(self, backend, usage, estimated_prompt_tokens=0):
+        """Count the call's tokens and correct its TPM reservation with the real prompt size"""
+        prompt_tokens = usage.prompt_token_count or 0
+        with self._lock:
+            backend.prompt_tokens += prompt_tokens
+            backend.completion_tokens += usage.candidates_token_count or 0
+        if backend.tpm and prompt_tokens:
+            backend.tpm.refund(estimated_prompt_tokens - prompt_tokens)
+
+    def record_error(self, backend):
+        with self._lock:
+            backend.errors += 1
+
+    def cool_down(self, backend, hint=None):
+        """Take a rate-limited backend out of rotation; True if another one is still available"""
+        now = time.monotonic()
+        with self._lock:
+            backend.rate_limited += 1
+            backend.cooldown_until = now + (hint or self.cooldown_s)
+            others = any(other.available(now) for other in self.backends if other is not backend)
+        print(f"🚦 {backend.label} rate limited, out of rotation for {hint or self.cooldown_s:.0f}s")
+        return others
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "backend": backend.label,
+                    "key": f"key{backend.key_index}",
+                    "key_suffix": mask_key(backend.key),
+                    "model": backend.model,
+                    "weight": backend.weight,
+                    "available": backend.available(now),
+                    "cooldown_remaining_s": round(max(backend.cooldown_until - now, 0.0), 1),
+                    "in_flight": backend.in_flight,
+                    "calls": backend.calls,
+                    "errors": backend.errors,
+                    "rate_limited": backend.rate_limited,
+                    "prompt_tokens": backend.prompt_tokens,
+                    "completion_tokens": backend.completion_tokens,
+                    "rpm": backend.rpm.snapshot() if backend.rpm else None,
+                    "tpm": backend.tpm.snapshot() if backend.tpm else None,
+                    "paced_calls": backend.paced,
+                    "pacing_wait_s": round(backend.wait_s, 3),
+                    "max_pacing_wait_s": round(backend.max_wait_s, 3),
+                }
+                for backend in self.backends
+            ]
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        lines = []
+        for metric, kind, field in (
+            ("model_pool_calls_total", "counter", "calls"),
+            ("model_pool_errors_total", "counter", "errors"),
+            ("model_pool_rate_limited_total", "counter", "rate_limited"),
+            ("model_pool_paced_total", "counter", "paced_calls"),
+            ("model_pool_in_flight", "gauge", "in_flight"),
+            ("model_pool_available", "gauge", "available"),
+        ):
+            lines.append(f"# TYPE {metric} {kind}")
+            for backend in snapshot:
+                labels = f'key="{backend["key"]}",model="{backend["model"]}"'
+                lines.append(f"{metric}{{{labels}}} {int(backend[field])}")
+        lines.append("# TYPE model_pool_pacing_wait_seconds_total counter")
+        for backend in snapshot:
+            labels = f'key="{backend["key"]}",model="{backend["model"]}"'
+            lines.append(f"model_pool_pacing_wait_seconds_total{{{labels}}} {backend['pacing_wait_s']}")
+        lines.append("# TYPE model_pool_tokens_total counter")
+        for backend in snapshot:
+            labels = f'key="{backend["key"]}",model="{backend["model"]}"'
+            lines.append(f'model_pool_tokens_total{{{labels},type="prompt"}} {backend["prompt_tokens"]}')
+            lines.append(f'model_pool_tokens_total{{{labels},type="completion"}} {backend["completion_tokens"]}')
+        return "\n".join(lines) + "\n"
+
+
+@functools.lru_cache(maxsize=None)
+def model_pool():
+    """The process-wide pool, configured from the environment on first use"""
+    keys = parse_weighted(os.getenv("GOOGLE_API_KEYS", "")) or parse_weighted(os.getenv("GOOGLE_API_KEY", ""))
+    models = parse_weighted(os.getenv("MODEL_POOL", "")) or [(MODEL_NAME, 1.0)]
+    return ModelPool(keys, models)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Outbound Pacing Against RPM / TPM Budgets
+Queues model calls instead of bursting into 429s
+
+Parallel fan-out (ParallelAgent) and concurrent users can send far more
+calls per minute than a key's quota allows; the 429s that follow are retried
+with backoff, which wastes more time than waiting would have. Each backend of
+the model pool (see model_pool.py) therefore gets two token buckets - calls
+per minute and prompt tokens per minute - that every model call reserves
+from before it is sent. Google Search runs inside the Gemini call, so it is
+paced with it.
+
+Reservations are made up front (the bucket may go into debt) and the caller
+sleeps until its share of the budget has accrued, so waiting calls are served
+in arrival order and nothing fails because of pacing alone. A call whose wait
+would outlast its request deadline fails fast instead. Prompt tokens are
+estimated from the request text and corrected with the real count once the
+response arrives.
+
+Configuration (environment variables, 0 = unlimited):
+    MODEL_RPM=0  MODEL_TPM=0  MODEL_PACING_BURST_S=10
+"""
+
+import os
+import time
+import threading
+
+MODEL_RPM = float(os.getenv("MODEL_RPM", "0"))
+MODEL_TPM = float(os.getenv("MODEL_TPM", "0"))
+# Seconds' worth of budget that may be spent at once
+MODEL_PACING_BURST_S = float(os.getenv("MODEL_PACING_BURST_S", "10"))
+
+CHARS_PER_TOKEN = 4
+
+
+class TokenBucket:
+    """Thread-safe token bucket with reservations: callers are told how long to wait"""
+
+    def __init__(self, per_minute, burst_s=MODEL_PACING_BURST_S):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = max(self.rate * burst_s, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        # `now` may have been read before another thread refilled
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, amount, now=None):
+        """Seconds until `amount` would be available, without reserving it"""
+        with self._lock:
+            self._refill(now or time.monotonic())
+            return max(amount - self.tokens, 0.0) / self.rate
+
+    def reserve(self, amount, now=None):
+        """Take `amount` (going into debt if needed); returns the seconds to wait before using it"""
+        with self._lock:
+            self._refill(now or time.monotonic())
+            self.tokens -= amount
+            return max(-self.tokens, 0.0) / self.rate
+
+    def try_take(self, amount=1, now=None):
+        """Take `amount` if it is available (returns 0), else the seconds until it will be"""
+        with self._lock:
+            self._refill(now or time.monotonic())
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    def refund(self, amount):
+        """Give back (or, with a negative amount, take) tokens after the fact"""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def snapshot(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return {"per_minute": self.per_minute, "available": round(self.tokens, 1)}
+
+
+def estimate_prompt_tokens(llm_request):
+    """Rough prompt size of an ADK LlmRequest: ~4 characters per token"""
+    chars = 0
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_response is not None:
+                chars += len(str(part.function_response.response or {}))
+            elif part.function_call is not None:
+                chars += len(str(part.function_call.args or {}))
+    config = llm_request.config
+    if config is not None and isinstance(config.system_instruction, str):
+        chars += len(config.system_instruction)
+    return chars // CHARS_PER_TOKEN + 1
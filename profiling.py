@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+On-Demand Profiling of a Running Server
+Shows where the Python side spends its time, without a redeploy
+
+Two tools, both behind the admin token (ADMIN_TOKEN; unset = disabled):
+
+- sample_profile(seconds): samples the stack of every thread every
+  PROFILE_INTERVAL_MS (default 10ms) for a few seconds. Each sample is
+  weighted by the CPU time its thread used since the previous one, so idle
+  threads (blocked in select, waiting for the model) cost nothing in the
+  profile. Sampling stays cheap - one pass over sys._current_frames() per
+  interval - and sees everything: Flask/Gradio, ADK, the model client and
+  our own code.
+- REQUEST_PROFILER: cProfile (CPU time) of the next K agent runs of one
+  pipeline. Each run is profiled on the thread it runs on (the model loop,
+  see model_client.py), so it covers ADK event handling, the model client and
+  our callbacks; anything else that runs on that thread meanwhile is
+  included too.
+
+Samples are returned in collapsed-stack format ("thread;outer;...;inner
+weight", one stack per line) - open it in speedscope or feed it to
+flamegraph.pl / inferno. Captured runs can be downloaded as a pstats file
+(snakeviz, flameprof, gprof2dot). Both also summarize the time per category:
+
+    web       Flask / Werkzeug / Gradio / Starlette / Uvicorn
+    adk       google.adk (agents, runners, event handling)
+    model     google.genai, httpx / httpcore, pydantic
+    asyncio   event loop and thread plumbing
+    app       this repository's own modules
+    other     everything else (standard library, ...)
+
+Each process profiles itself: with several web-chat workers, a request
+reaches one of them (the answer says which, as worker_pid).
+"""
+
+import os
+import re
+import sys
+import hmac
+import time
+import pstats
+import marshal
+import cProfile
+import threading
+import functools
+from collections import Counter
+from contextlib import contextmanager
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_MAX_REQUESTS = int(os.getenv("PROFILE_MAX_REQUESTS", "50"))
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# First match wins; paths are matched with "/" separators
+CATEGORY_PATTERNS = (
+    ("web", ("/flask/", "/werkzeug/", "/flask_sock/", "/simple_websocket/", "/gradio/", "/starlette/",
+             "/fastapi/", "/uvicorn/", "/anyio/", "/websockets/")),
+    ("adk", ("/google/adk/",)),
+    ("model", ("/google/genai/", "/httpx/", "/httpcore/", "/h11/", "/pydantic/", "/pydantic_core/")),
+    ("asyncio", ("/asyncio/", "/threading.py", "/selectors.py", "/concurrent/")),
+)
+CATEGORIES = ("web", "adk", "model", "asyncio", "app", "other")
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a sampling profile is already running in this process"""
+
+
+def admin_authorized(token):
+    """True if `token` is the admin token (always False while ADMIN_TOKEN is unset)"""
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(str(token or "").encode(), ADMIN_TOKEN.encode())
+
+
+def admin_token(headers):
+    """The admin token sent as Authorization: Bearer ... or X-Admin-Token"""
+    auth = headers.get("Authorization", "")
+    return auth[len("Bearer "):] if auth.startswith("Bearer ") else headers.get("X-Admin-Token")
+
+
+@functools.lru_cache(maxsize=None)
+def categorize(filename):
+    """Category of the code in `filename` (see CATEGORY_PATTERNS)"""
+    path = filename.replace(os.sep, "/")
+    for category, patterns in CATEGORY_PATTERNS:
+        if any(pattern in path for pattern in patterns):
+            return category
+    if filename.startswith(REPO_ROOT) and "-packages" not in path:
+        return "app"
+    return "other"
+
+
+@functools.lru_cache(maxsize=None)
+def _short_path(filename):
+    path = filename.replace(os.sep, "/")
+    if "-packages/" in path:
+        return path.split("-packages/", 1)[1]
+    if filename.startswith(REPO_ROOT):
+        return os.path.relpath(filename, REPO_ROOT)
+    return "/".join(path.split("/")[-2:])  # e.g. asyncio/base_events.py
+
+
+@functools.lru_cache(maxsize=65536)
+def frame_label(code):
+    """Flame graph label of a code object: qualified name (path:first line)"""
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def category_summary(self_times, inclusive_times=None):
+    """{category: {"self_ms", "self_pct"[, "inclusive_pct"]}} from seconds per category"""
+    total = sum(self_times.values()) or 1.0
+    summary = {}
+    for category in CATEGORIES:
+        row = {
+            "self_ms": round(self_times.get(category, 0.0) * 1000, 1),
+            "self_pct": round(self_times.get(category, 0.0) / total * 100, 1),
+        }
+        if inclusive_times is not None:
+            row["inclusive_pct"] = round(inclusive_times.get(category, 0.0) / total * 100, 1)
+        summary[category] = row
+    return summary
+
+
+class SamplingProfiler:
+    """Periodic stack samples of all threads, weighted by the CPU (or wall) time between samples"""
+
+    def __init__(self, interval_s=PROFILE_INTERVAL_MS / 1000, mode="cpu"):
+        if mode == "cpu" and not hasattr(time, "pthread_getcpuclockid"):
+            mode = "wall"  # per-thread CPU clocks are Unix-only
+        self.interval_s = interval_s
+        self.mode = mode
+        self.stacks = Counter()     # (thread, outermost frame, ..., innermost frame) -> seconds
+        self.self_times = Counter()       # category of the innermost frame -> seconds
+        self.inclusive_times = Counter()  # category anywhere on the stack -> seconds
+        self.functions = Counter()  # innermost frame -> seconds
+        self.samples = 0
+        self._cpu_clocks = {}  # thread ident -> (clock id, CPU seconds at the last sample)
+
+    def _weight(self, ident, wall_s):
+        if self.mode == "wall":
+            return wall_s
+        try:
+            clock, last = self._cpu_clocks.get(ident) or (time.pthread_getcpuclockid(ident), None)
+            used = time.clock_gettime(clock)
+        except (OSError, OverflowError):
+            return 0.0  # the thread just exited
+        self._cpu_clocks[ident] = (clock, used)
+        return 0.0 if last is None else used - last
+
+    def sample(self, wall_s):
+        own = threading.get_ident()
+        names = {thread.ident: re.sub(r"\d+", "N", thread.name) for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            weight = self._weight(ident, wall_s)
+            if weight <= 0:
+                continue
+            stack = []
+            categories = set()
+            innermost = frame
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                categories.add(categorize(frame.f_code.co_filename))
+                frame = frame.f_back
+            stack.append(names.get(ident, "thread"))
+            self.stacks[tuple(reversed(stack))] += weight
+            self.self_times[categorize(innermost.f_code.co_filename)] += weight
+            self.functions[stack[0]] += weight
+            for category in categories:
+                self.inclusive_times[category] += weight
+        self.samples += 1
+
+    def run(self, seconds):
+        deadline = time.monotonic() + seconds
+        last = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            time.sleep(min(self.interval_s, deadline - now))
+            now = time.monotonic()
+            self.sample(now - last)
+            last = now
+
+    def folded(self):
+        """Collapsed stacks, weights in microseconds, heaviest first"""
+        return "\n".join(
+            f"{';'.join(stack)} {round(seconds * 1_000_000)}"
+            for stack, seconds in self.stacks.most_common()
+            if seconds >= 0.0000005
+        ) + "\n"
+
+    def result(self, seconds, top=25):
+        return {
+            "mode": self.mode,
+            "seconds": seconds,
+            "interval_ms": round(self.interval_s * 1000, 3),
+            "samples": self.samples,
+            "worker_pid": os.getpid(),
+            "profiled_ms": round(sum(self.self_times.values()) * 1000, 1),
+            "by_category": category_summary(self.self_times, self.inclusive_times),
+            "top_functions": [
+                {"function": function, "self_ms": round(seconds * 1000, 1)}
+                for function, seconds in self.functions.most_common(top)
+            ],
+            "folded": self.folded(),
+        }
+
+
+_sampling = threading.Lock()
+
+
+def sample_profile(seconds, interval_ms=PROFILE_INTERVAL_MS, mode="cpu"):
+    """Sample every thread of this process for `seconds` (blocks the caller); see SamplingProfiler"""
+    seconds = max(0.1, min(float(seconds), PROFILE_MAX_SECONDS))
+    if not _sampling.acquire(blocking=False):
+        raise ProfilerBusy("A sampling profile is already running")
+    try:
+        profiler = SamplingProfiler(max(float(interval_ms), 1.0) / 1000, mode)
+        profiler.run(seconds)
+        return profiler.result(seconds)
+    finally:
+        _sampling.release()
+
+
+class RequestProfiler:
+    """cProfile (thread CPU time) of the next agent runs of one pipeline, one run at a time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pipeline = None
+        self.requested = 0
+        self.remaining = 0
+        self.captured = 0
+        self.skipped = 0  # runs that overlapped a capture in progress
+        self._active = False
+        self._stats = None
+
+    def arm(self, pipeline, count):
+        """Profile the next `count` runs of `pipeline`, discarding the previous capture"""
+        count = max(1, min(int(count), PROFILE_MAX_REQUESTS))
+        with self._lock:
+            self.pipeline = pipeline
+            self.requested = self.remaining = count
+            self.captured = self.skipped = 0
+            self._stats = None
+        return self.snapshot()
+
+    @contextmanager
+    def capture(self, pipeline):
+        """Profile the enclosed run if one of `pipeline` is wanted; a no-op otherwise"""
+        with self._lock:
+            wanted = self.remaining > 0 and pipeline == self.pipeline
+            if wanted and self._active:
+                self.skipped += 1
+            claimed = wanted and not self._active
+            if claimed:
+                self.remaining -= 1
+                self._active = True
+        if not claimed:
+            yield
+            return
+
+        profiler = cProfile.Profile(time.thread_time)
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler owns this thread
+            with self._lock:
+                self.remaining += 1
+                self._active = False
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._stats = pstats.Stats(profiler) if self._stats is None else self._stats.add(profiler)
+                self.captured += 1
+                self._active = False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "pipeline": self.pipeline,
+                "requested": self.requested,
+                "captured": self.captured,
+                "remaining": self.remaining,
+                "skipped": self.skipped,
+                "capturing": self._active,
+                "worker_pid": os.getpid(),
+            }
+
+    def report(self, top=30):
+        """Snapshot plus the hottest functions and the CPU time per category of the captured runs"""
+        report = self.snapshot()
+        with self._lock:
+            stats = self._stats
+            if stats is None:
+                return report
+            rows = [
+                (func, tottime, cumtime, calls, callers)
+                for func, (_, calls, tottime, cumtime, callers) in stats.stats.items()
+            ]
+        self_times = Counter()
+        for func, tottime, _, _, callers in rows:
+            if func[0] == "~" and callers:
+                # Built-ins (C code, e.g. pydantic-core) count for whoever calls them most
+                func = max(callers, key=lambda caller: callers[caller][3])
+            self_times[categorize(func[0])] += tottime
+
+        def describe(func):
+            filename, line, name = func
+            return f"{name} ({_short_path(filename)}:{line})" if line else name
+
+        report["profiled_ms"] = round(sum(self_times.values()) * 1000, 1)
+        report["by_category"] = category_summary(self_times)
+        report["top_self"] = [
+            {"function": describe(func), "self_ms": round(tottime * 1000, 2), "calls": calls}
+            for func, tottime, _, calls, _ in sorted(rows, key=lambda row: -row[1])[:top]
+        ]
+        report["top_cumulative"] = [
+            {"function": describe(func), "cumulative_ms": round(cumtime * 1000, 2), "calls": calls}
+            for func, _, cumtime, calls, _ in sorted(rows, key=lambda row: -row[2])[:top]
+        ]
+        return report
+
+    def pstats_bytes(self):
+        """The captured runs as a pstats file (what Stats.dump_stats() writes), or None"""
+        with self._lock:
+            return None if self._stats is None else marshal.dumps(self._stats.stats)
+
+
+REQUEST_PROFILER = RequestProfiler()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Retries and Circuit Breaking for Model Calls
+Keeps tail latency bounded when Gemini (and its built-in Google Search) fails
+
+ResilientGemini is a drop-in Gemini model for Agent(model=...). Every model
+call goes through a process-wide CircuitBreaker and is retried on 429/5xx and
+transport errors with jittered exponential backoff. Each attempt is sent
+with an API key and model picked by the model pool (see model_pool.py),
+paced against its RPM / TPM budget (see pacing.py); a 429 on one key moves
+the call to another key without waiting. Retry hints sent by the
+API (RetryInfo.retryDelay / Retry-After) are honored; if the hint is longer
+than the maximum backoff we fail fast instead of holding the request.
+
+After BREAKER_FAILURE_THRESHOLD consecutive failures the breaker opens and
+calls fail immediately with CircuitOpenError. Once BREAKER_RESET_TIMEOUT
+seconds have passed a single half-open probe is let through; its success
+closes the breaker again.
+
+Each request can also carry a deadline (deadline_scope / run_traced(timeout=)).
+It lives in a context variable, so it follows the request into every
+sub-agent, ParallelAgent branch and AgentTool call: model calls and backoff
+sleeps that cannot finish in time raise DeadlineExceeded instead of starting.
+
+google.adk and google.genai are only imported once a model is created, so
+the deadline and breaker helpers are cheap to import.
+
+Configuration (environment variables):
+    MODEL_RETRY_ATTEMPTS=3  MODEL_RETRY_BASE_DELAY=0.5  MODEL_RETRY_MAX_DELAY=8
+    BREAKER_FAILURE_THRESHOLD=5  BREAKER_RESET_TIMEOUT=30
+    REQUEST_TIMEOUT_CHAT=30  REQUEST_TIMEOUT_RESEARCH=60
+    REQUEST_TIMEOUT_BLOG=60  REQUEST_TIMEOUT_BRIEFING=90
+"""
+
+import os
+import time
+import random
+import asyncio
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+RETRY_ATTEMPTS = int(os.getenv("MODEL_RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("MODEL_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("MODEL_RETRY_MAX_DELAY", "8"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+# Default per-request deadlines (seconds) for each pipeline / UI tab
+PIPELINE_TIMEOUTS = {
+    "chat": float(os.getenv("REQUEST_TIMEOUT_CHAT", "30")),
+    "research": float(os.getenv("REQUEST_TIMEOUT_RESEARCH", "60")),
+    "blog": float(os.getenv("REQUEST_TIMEOUT_BLOG", "60")),
+    "briefing": float(os.getenv("REQUEST_TIMEOUT_BRIEFING", "90")),
+}
+
+
+# ============================================================================
+# DEADLINES
+# ============================================================================
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request's deadline leaves no time for more work"""
+
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(timeout):
+    """Give the enclosed work (and every task it spawns) `timeout` seconds"""
+    if timeout is None:
+        yield
+        return
+    token = _deadline.set(time.monotonic() + timeout)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_remaining():
+    """Seconds left before the current request's deadline, or None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline():
+    remaining = time_remaining()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+def parse_timeout(value, default=None):
+    """Parse a timeout in seconds from a header or parameter, falling back to default"""
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        return default
+    return timeout if timeout > 0 else default
+
+
+# ============================================================================
+# CIRCUIT BREAKER
+# ============================================================================
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the model while the circuit breaker is open"""
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(
+            f"Model backend is unavailable, failing fast (retry in {retry_after:.0f}s)"
+        )
+
+
+class CircuitBreaker:
+    """Thread-safe closed / open / half-open circuit breaker"""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.counters = {"successes": 0, "failures": 0, "retries": 0, "short_circuited": 0, "opened": 0}
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call is allowed right now"""
+        with self._lock:
+            if self._state == "closed":
+                return
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self._state == "open" and remaining <= 0:
+                self._state = "half_open"
+            if self._state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.counters["short_circuited"] += 1
+            raise CircuitOpenError(max(remaining, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            self.counters["successes"] += 1
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            self._state = "closed"
+
+    def record_failure(self):
+        with self._lock:
+            self.counters["failures"] += 1
+            self._consecutive_failures += 1
+            probe_failed = self._state == "half_open"
+            self._probe_in_flight = False
+            if probe_failed or self._consecutive_failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.counters["opened"] += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Give back a half-open probe slot whose call ended without a verdict"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_retry(self):
+        with self._lock:
+            self.counters["retries"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_s": self.reset_timeout,
+                **self.counters,
+            }
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        lines = ["# TYPE model_circuit_breaker_open gauge"]
+        lines.append(f"model_circuit_breaker_open {int(snapshot['state'] != 'closed')}")
+        for name in self.counters:
+            lines.append(f"# TYPE model_calls_{name}_total counter")
+            lines.append(f"model_calls_{name}_total {snapshot[name]}")
+        return "\n".join(lines) + "\n"
+
+
+BREAKER = CircuitBreaker()
+
+
+# ============================================================================
+# RETRYING MODEL
+# ============================================================================
+
+def is_retryable(error):
+    """429s, 5xx responses and transport-level failures are worth retrying"""
+    import httpx
+    from google.genai import errors as genai_errors
+
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, genai_errors.APIError):
+        return error.code == 429 or (error.code or 0) >= 500
+    return isinstance(error, (httpx.TransportError, ConnectionError, asyncio.TimeoutError))
+
+
+def is_rate_limited(error):
+    """A 429: this key's quota is used up, the backend itself is fine"""
+    return getattr(error, "code", None) == 429
+
+
+def retry_hint(error):
+    """Seconds the API asked us to wait, from RetryInfo or Retry-After, if any"""
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        body = details.get("error", details)
+        for item in body.get("details", None) or []:
+            if isinstance(item, dict) and str(item.get("@type", "")).endswith("RetryInfo"):
+                try:
+                    return float(str(item.get("retryDelay", "")).rstrip("s"))
+                except ValueError:
+                    pass
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def backoff_delay(attempt, hint=None):
+    """Full-jitter exponential backoff, never shorter than the server's hint"""
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+    return max(delay, hint or 0.0)
+
+
+@functools.lru_cache(maxsize=None)
+def _resilient_gemini_class():
+    """Defined on first use: importing google.adk's Gemini model is slow"""
+    from google.adk.models.google_llm import Gemini
+    from model_pool import model_pool
+    from pacing import estimate_prompt_tokens
+    from telemetry import annotate_model_response, trace
+
+    class ResilientGemini(Gemini):
+        """Gemini model whose calls are retried, guarded by the circuit breaker
+        and spread over the API keys and models of the model pool"""
+
+        async def generate_content_async(self, llm_request, stream=False):
+            pool = model_pool()
+            prompt_tokens = estimate_prompt_tokens(llm_request)
+            span = trace.get_current_span()  # ADK's generate_content span of this call
+            attempt = 0
+            tried = []
+            paced_s = 0.0
+            while True:
+                check_deadline()
+                BREAKER.before_call()
+                try:
+                    backend, wait = pool.acquire(prompt_tokens, max_wait=time_remaining())
+                except DeadlineExceeded:
+                    BREAKER.release_probe()
+                    raise
+                llm_request.model = backend.model
+                tried.append(backend.label)
+                paced_s += wait or 0
+                if span.is_recording():
+                    span.set_attributes({
+                        "app.model.backend": backend.label,
+                        "app.model.backends_tried": tried,
+                        "app.model.attempts": len(tried),
+                        "app.pacing_wait_ms": round(paced_s * 1000, 1),
+                    })
+                yielded = False
+                try:
+                    if wait:
+                        # Queue for the key's RPM / TPM budget rather than provoke a 429
+                        try:
+                            await asyncio.sleep(wait)
+                        except asyncio.CancelledError:
+                            pool.refund(backend, prompt_tokens)
+                            raise
+                    async for response in pool.client(backend).generate_content_async(llm_request, stream):
+                        yielded = True
+                        if response.usage_metadata and not response.partial:
+                            pool.record_usage(backend, response.usage_metadata, prompt_tokens)
+                        annotate_model_response(span, response)
+                        yield response
+                except Exception as e:
+                    pool.record_error(backend)
+                    if not is_retryable(e):
+                        # Bad requests say nothing about backend health
+                        BREAKER.release_probe()
+                        raise
+
+                    hint = retry_hint(e)
+                    if is_rate_limited(e) and pool.cool_down(backend, hint) and not yielded:
+                        # Another key / model still has quota: switch right away
+                        BREAKER.release_probe()
+                        continue
+                    BREAKER.record_failure()
+
+                    # Never retry after output was streamed, and don't sit on a
+                    # request longer than our own max backoff because of a hint.
+                    if yielded or attempt + 1 >= RETRY_ATTEMPTS or (hint or 0) > RETRY_MAX_DELAY:
+                        raise
+                    delay = backoff_delay(attempt, hint)
+                    remaining = time_remaining()
+                    if remaining is not None and delay >= remaining:
+                        raise
+                    BREAKER.record_retry()
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                except BaseException:
+                    BREAKER.release_probe()
+                    raise
+                finally:
+                    pool.release(backend)
+
+                BREAKER.record_success()
+                return
+
+    return ResilientGemini
+
+
+def __getattr__(name):
+    if name == "ResilientGemini":
+        return _resilient_gemini_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def resilient_model(model_name, **fields):
+    """Model object to pass as Agent(model=...) in place of a model name string"""
+    return _resilient_gemini_class()(model=model_name, **fields)
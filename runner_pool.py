@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Runner Pools for Agent Pipelines
+Spreads concurrent requests over several runners and recycles them over time
+
+A RunnerPool keeps up to RUNNER_POOL_SIZE runners for one pipeline. lease()
+hands out the healthy runner with the fewest requests in flight; runners are
+created on demand, when every existing one is busy, so a pool costs nothing
+(not even the google.adk imports) until its first request. A runner is
+retired - drained, then replaced by a fresh one from the factory - when:
+- it has served RUNNER_MAX_REQUESTS requests,
+- it has served a tenth of that while process RSS is above RUNNER_MAX_RSS_MB,
+- or RUNNER_MAX_FAILURES requests in a row failed on it.
+
+All runners of a pool share one session service, so a conversation can be
+served by any runner and survives recycling. Everything else a runner holds
+(agent tree, artifact and memory services) is dropped with it; sessions are
+freed by their owners (one-off runs discard theirs, chat_session.py expires
+abandoned and idle chats), which is what lets the memory trigger bring RSS back down.
+
+Pools can stand in for a runner where code only needs run_debug(),
+app_name or session_service.
+"""
+
+import os
+import time
+import itertools
+import threading
+from contextlib import contextmanager, nullcontext
+
+from resilience import CircuitOpenError
+from cancellation import RunCancelled
+
+RUNNER_POOL_SIZE = int(os.getenv("RUNNER_POOL_SIZE", "4"))
+RUNNER_MAX_REQUESTS = int(os.getenv("RUNNER_MAX_REQUESTS", "500"))
+RUNNER_MAX_RSS_MB = float(os.getenv("RUNNER_MAX_RSS_MB", "1024"))
+RUNNER_MAX_FAILURES = int(os.getenv("RUNNER_MAX_FAILURES", "3"))
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class PooledRunner:
+    def __init__(self, runner_id, runner):
+        self.runner_id = runner_id
+        self.runner = runner
+        self.created_at = time.monotonic()
+        self.in_flight = 0
+        self.served = 0
+        self.consecutive_failures = 0
+        self.retiring = False
+
+    @property
+    def healthy(self):
+        return self.consecutive_failures < RUNNER_MAX_FAILURES
+
+
+class RunnerPool:
+    """Thread-safe pool of runners for one pipeline with least-loaded dispatch"""
+
+    def __init__(self, factory, app_name, size=RUNNER_POOL_SIZE, max_requests=RUNNER_MAX_REQUESTS,
+                 max_rss_mb=RUNNER_MAX_RSS_MB):
+        self.factory = factory
+        self.app_name = app_name
+        self.size = max(size, 1)
+        self.max_requests = max_requests
+        self.max_rss_mb = max_rss_mb
+        self.recycled = {"max_requests": 0, "memory": 0, "unhealthy": 0}
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._session_service = None
+        self._runners = []
+
+    @property
+    def session_service(self):
+        """Session service shared by all runners of the pool"""
+        with self._lock:
+            if self._session_service is None:
+                from google.adk.sessions import InMemorySessionService
+
+                self._session_service = InMemorySessionService()
+            return self._session_service
+
+    def _new_runner(self):
+        from google.adk.artifacts import InMemoryArtifactService
+        from google.adk.memory import InMemoryMemoryService
+        from google.adk.runners import Runner
+
+        runner = Runner(
+            app_name=self.app_name,
+            agent=self.factory(),
+            session_service=self.session_service,
+            artifact_service=InMemoryArtifactService(),
+            memory_service=InMemoryMemoryService(),
+        )
+        return PooledRunner(next(self._ids), runner)
+
+    def warm(self, count=1):
+        """Create up to `count` runners ahead of the first requests (see warmup.py)"""
+        with self._lock:
+            while len(self._runners) < min(count, self.size):
+                self._runners.append(self._new_runner())
+
+    @contextmanager
+    def lease(self):
+        """Borrow the least-loaded healthy runner for the duration of the block"""
+        with self._lock:
+            candidates = [slot for slot in self._runners if not slot.retiring] or self._runners
+            healthy = [slot for slot in candidates if slot.healthy] or candidates
+            if len(self._runners) < self.size and not any(slot.in_flight == 0 for slot in healthy):
+                slot = self._new_runner()
+                self._runners.append(slot)
+            else:
+                slot = min(healthy, key=lambda candidate: (candidate.in_flight, candidate.served))
+            slot.in_flight += 1
+
+        failed = False
+        try:
+            yield slot.runner
+        except (CircuitOpenError, RunCancelled):
+            # A backend outage or a client that went away says nothing about this runner's health
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(slot, failed)
+
+    def _release(self, slot, failed):
+        rss = current_rss_mb() if self.max_rss_mb else None
+        with self._lock:
+            slot.in_flight -= 1
+            slot.served += 1
+            slot.consecutive_failures = slot.consecutive_failures + 1 if failed else 0
+
+            if not slot.retiring:
+                reason = None
+                if slot.served >= self.max_requests:
+                    reason = "max_requests"
+                elif rss is not None and rss > self.max_rss_mb and slot.served >= max(self.max_requests // 10, 1):
+                    reason = "memory"
+                elif not slot.healthy:
+                    reason = "unhealthy"
+                if reason:
+                    slot.retiring = True
+                    self.recycled[reason] += 1
+                    print(f"♻️ Recycling {self.app_name} runner #{slot.runner_id} ({reason}, {slot.served} requests)")
+
+            if slot.retiring and slot.in_flight == 0:
+                # Drained: drop it, the next busy moment creates a fresh runner
+                self._runners.remove(slot)
+
+    async def run_debug(self, *args, **kwargs):
+        """runner.run_debug() on a leased runner"""
+        with self.lease() as runner:
+            return await runner.run_debug(*args, **kwargs)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "app_name": self.app_name,
+                "size": self.size,
+                "recycled": dict(self.recycled),
+                "runners": [
+                    {
+                        "id": slot.runner_id,
+                        "in_flight": slot.in_flight,
+                        "served": slot.served,
+                        "consecutive_failures": slot.consecutive_failures,
+                        "healthy": slot.healthy,
+                        "retiring": slot.retiring,
+                        "age_s": round(now - slot.created_at, 1),
+                    }
+                    for slot in self._runners
+                ],
+            }
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        pool = f'pool="{self.app_name}"'
+        lines = ["# TYPE runner_pool_in_flight gauge"]
+        for runner in snapshot["runners"]:
+            lines.append(f'runner_pool_in_flight{{{pool},runner="{runner["id"]}"}} {runner["in_flight"]}')
+        lines.append("# TYPE runner_pool_unhealthy gauge")
+        unhealthy = sum(not runner["healthy"] for runner in snapshot["runners"])
+        lines.append(f"runner_pool_unhealthy{{{pool}}} {unhealthy}")
+        lines.append("# TYPE runner_pool_recycled_total counter")
+        for reason, count in snapshot["recycled"].items():
+            lines.append(f'runner_pool_recycled_total{{{pool},reason="{reason}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def lease_runner(runner):
+    """Lease from a RunnerPool (or a lazy one), or use a plain runner as it is"""
+    lease = getattr(runner, "lease", None)
+    return lease() if lease else nullcontext(runner)
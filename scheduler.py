@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Priority Lanes for Agent Requests
+Keeps quick chat replies fast while long multi-agent pipelines are running
+
+Every request is admitted through a lane. Each lane has its own concurrency
+quota (a burst of briefings can never take more than the briefing quota) and a
+weight. When a slot frees up, waiting lanes are served by weighted fair
+queuing: the lane with the smallest virtual time goes next, and each admission
+advances that lane's virtual time by 1 / weight. Chat (weight 4) is therefore
+admitted four times as often as a briefing when both are backlogged, and a
+lane that was idle does not build up credit.
+
+Lanes are configured as LANE_<NAME>="quota:weight" and the shared capacity as
+SCHEDULER_SLOTS, e.g. LANE_BRIEFING="1:1" SCHEDULER_SLOTS=10. The default
+pipeline quotas add up to 6 of the 10 slots, so at least 4 are always left
+for chat no matter how many briefings are queued.
+
+The scheduler is asyncio-based and must be used from a single event loop
+(Gradio's, for the async handlers in app_multiagent.py).
+"""
+
+import os
+import math
+import time
+import asyncio
+import inspect
+from collections import deque
+from contextlib import asynccontextmanager
+
+DEFAULT_LANES = {
+    # name: (concurrency quota, weight)
+    "chat": (6, 4),
+    "research": (2, 1),
+    "blog": (2, 1),
+    "briefing": (2, 1),
+}
+SCHEDULER_SLOTS = int(os.getenv("SCHEDULER_SLOTS", "10"))
+
+
+def _lane_config(name, default):
+    value = os.getenv(f"LANE_{name.upper()}")
+    if not value:
+        return default
+    quota, _, weight = value.partition(":")
+    return int(quota), float(weight or default[1])
+
+
+class Lane:
+    def __init__(self, name, quota, weight):
+        self.name = name
+        self.quota = quota
+        self.weight = weight
+        self.waiting = deque()
+        self.running = 0
+        self.admitted = 0
+        self.vtime = 0.0
+        # Exponentially weighted average time a request holds its slot
+        self.avg_service_s = None
+
+    def observe(self, seconds):
+        if self.avg_service_s is None:
+            self.avg_service_s = seconds
+        else:
+            self.avg_service_s = 0.8 * self.avg_service_s + 0.2 * seconds
+
+
+class Ticket:
+    """A request's place in a lane; `ready` is set once it holds a slot"""
+
+    def __init__(self, lane):
+        self.lane = lane
+        self.enqueued_at = time.perf_counter()
+        self.admitted_at = None
+        self.ready = asyncio.Event()
+        self.released = False
+
+    @property
+    def wait_s(self):
+        end = self.admitted_at or time.perf_counter()
+        return end - self.enqueued_at
+
+    async def wait(self, timeout=None):
+        """Wait for admission; returns False if `timeout` passed first"""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class LaneScheduler:
+    """Per-lane concurrency quotas with weighted fair queuing between lanes"""
+
+    def __init__(self, lanes=None, slots=SCHEDULER_SLOTS):
+        lanes = lanes or {name: _lane_config(name, config) for name, config in DEFAULT_LANES.items()}
+        self.lanes = {name: Lane(name, quota, weight) for name, (quota, weight) in lanes.items()}
+        self.slots = slots
+        self.running = 0
+        self.vclock = 0.0
+
+    def enqueue(self, lane_name):
+        lane = self.lanes[lane_name]
+        if not lane.waiting:
+            # A lane coming back from idle starts at the current virtual time
+            lane.vtime = max(lane.vtime, self.vclock)
+        ticket = Ticket(lane)
+        lane.waiting.append(ticket)
+        self._dispatch()
+        return ticket
+
+    def release(self, ticket):
+        """Give back the ticket's slot, or drop it from its queue if never admitted"""
+        if ticket.released:
+            return
+        ticket.released = True
+        lane = ticket.lane
+        if ticket.admitted_at is None:
+            lane.waiting.remove(ticket)
+            return
+        lane.running -= 1
+        self.running -= 1
+        lane.observe(time.perf_counter() - ticket.admitted_at)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.running < self.slots:
+            eligible = [
+                lane for lane in self.lanes.values()
+                if lane.waiting and lane.running < lane.quota
+            ]
+            if not eligible:
+                return
+            lane = min(eligible, key=lambda candidate: candidate.vtime)
+            ticket = lane.waiting.popleft()
+            self.vclock = lane.vtime
+            lane.vtime += 1.0 / lane.weight
+            lane.running += 1
+            lane.admitted += 1
+            self.running += 1
+            ticket.admitted_at = time.perf_counter()
+            ticket.ready.set()
+
+    def queue_depth(self):
+        """Number of requests waiting for a slot, across all lanes"""
+        return sum(len(lane.waiting) for lane in self.lanes.values())
+
+    def position(self, ticket):
+        """1-based position of a waiting ticket within its lane (0 once admitted)"""
+        if ticket.admitted_at is not None:
+            return 0
+        return ticket.lane.waiting.index(ticket) + 1
+
+    def eta(self, ticket):
+        """Rough seconds until admission, or None before the lane has history"""
+        lane = ticket.lane
+        position = self.position(ticket)
+        if position == 0:
+            return 0.0
+        if lane.avg_service_s is None:
+            return None
+        return math.ceil(position / lane.quota) * lane.avg_service_s
+
+    def describe(self, ticket):
+        """Human readable queue status for the status textboxes"""
+        position = self.position(ticket)
+        if position == 0:
+            return f"⚙️ Running... (waited {ticket.wait_s:.0f}s in the {ticket.lane.name} lane)"
+        eta = self.eta(ticket)
+        eta_text = f", ETA ~{eta:.0f}s" if eta is not None else ""
+        return (
+            f"⏳ Queued in the {ticket.lane.name} lane: position {position}"
+            f"{eta_text} (waited {ticket.wait_s:.0f}s)"
+        )
+
+    @asynccontextmanager
+    async def slot(self, lane_name):
+        """Hold a slot in `lane_name` for the duration of the block"""
+        ticket = self.enqueue(lane_name)
+        try:
+            await ticket.wait()
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def snapshot(self):
+        return {
+            "slots": self.slots,
+            "running": self.running,
+            "lanes": {
+                name: {
+                    "quota": lane.quota,
+                    "weight": lane.weight,
+                    "running": lane.running,
+                    "waiting": len(lane.waiting),
+                    "admitted": lane.admitted,
+                    "avg_service_s": round(lane.avg_service_s, 3) if lane.avg_service_s else None,
+                }
+                for name, lane in self.lanes.items()
+            },
+        }
+
+
+async def run_in_lane(scheduler, lane_name, work, poll_interval=1.0):
+    """Async generator for handlers that report queue status while they wait.
+
+    Yields (None, status_text) while queued, then (result, None) once
+    `work()` - a coroutine factory - has run inside a slot. If `work()` returns
+    an async generator instead, each item it yields is passed on as (item, None).
+    """
+    ticket = scheduler.enqueue(lane_name)
+    try:
+        queued = False
+        while not await ticket.wait(poll_interval):
+            queued = True
+            yield None, scheduler.describe(ticket)
+        if queued:
+            yield None, scheduler.describe(ticket)
+        result = work()
+        if inspect.isasyncgen(result):
+            async for item in result:
+                yield item, None
+        else:
+            yield await result, None
+    finally:
+        scheduler.release(ticket)
+
+
+SCHEDULER = LaneScheduler()
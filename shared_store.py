@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Shared Local Store for Multi-Process Servers
+Cache entries and counters that every worker process sees
+
+With several worker processes, in-process dicts and counters split into one
+copy per worker: a cached response only helps the worker that stored it and
+/metrics only reports whichever worker answered the scrape. SharedStore keeps
+both in one local SQLite database (WAL mode, so readers never wait for the
+writer), which makes a cache hit in one worker a hit in all of them.
+
+    STORE.set("chat:...", text, ttl=300)
+    STORE.get("chat:...")                      # None once expired
+    STORE.incr("server_requests_total", {"status": "ok"})
+    STORE.prometheus_text()                    # counters summed over all workers
+
+Connections are opened per thread and per process, so the store is safe to
+use from forked workers.
+
+Configuration (environment variables):
+    SHARED_STORE_PATH=agent_shared.db
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+SHARED_STORE_PATH = os.getenv("SHARED_STORE_PATH", "agent_shared.db")
+
+# Expired cache entries are deleted on every PURGE_EVERY-th set()
+PURGE_EVERY = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+);
+"""
+
+
+def cache_key(namespace, *parts):
+    """Compact key for arbitrary (e.g. user supplied) text"""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+    return f"{namespace}:{digest[:32]}"
+
+
+def _render_labels(labels):
+    return ",".join(f'{name}="{value}"' for name, value in sorted((labels or {}).items()))
+
+
+class SharedStore:
+    """SQLite-backed TTL cache and counters shared between processes"""
+
+    def __init__(self, path=SHARED_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _conn(self):
+        """This thread's connection (reopened after a fork)"""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            local.conn.execute("PRAGMA synchronous=NORMAL")
+            local.pid = os.getpid()
+        return local.conn
+
+    # ------------------------------------------------------------------- cache
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + ttl),
+        )
+        self._sets += 1
+        if self._sets % PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    # ---------------------------------------------------------------- counters
+
+    def incr(self, name, labels=None, amount=1):
+        self._conn().execute(
+            "INSERT INTO counters (name, labels, value) VALUES (?, ?, ?)"
+            " ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value",
+            (name, _render_labels(labels), amount),
+        )
+
+    def reset_counters(self):
+        """Zero all counters, e.g. when a server (and its workers) starts"""
+        self._conn().execute("DELETE FROM counters")
+
+    def counters(self):
+        """{name: {rendered labels: value}} over all processes"""
+        result = {}
+        for name, labels, value in self._conn().execute(
+            "SELECT name, labels, value FROM counters ORDER BY name, labels"
+        ):
+            result.setdefault(name, {})[labels] = value
+        return result
+
+    def prometheus_text(self):
+        lines = []
+        for name, series in self.counters().items():
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                value = int(value) if float(value).is_integer() else value
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+STORE = SharedStore()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Local Stub Model for Benchmarks
+Stands in for Gemini without API calls, quota or network jitter
+
+LatencyModel answers after a fixed, injected latency. It can also burn CPU
+per call (holding the GIL, like response parsing and event processing do)
+so benchmarks can show where one Python process stops scaling.
+
+Agents using it must not have Google Search attached - built-in Gemini tools
+are rejected for other models.
+"""
+
+import time
+import asyncio
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+
+def burn_cpu(seconds):
+    """Busy-wait in pure Python, holding the GIL for `seconds`"""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class LatencyModel(BaseLlm):
+    """Local stand-in for Gemini that answers after a fixed delay.
+
+    If the calling agent has tools it has not called yet (e.g. the AgentTools
+    of the research coordinator) it calls them one by one before answering,
+    so LLM-orchestrated pipelines walk through all of their stages.
+    """
+
+    model: str = "latency-stub"
+    latency: float = 0.2
+    cpu_ms: float = 0.0
+    call_durations: list = []
+
+    async def generate_content_async(self, llm_request, stream=False):
+        started = time.perf_counter()
+        await asyncio.sleep(self.latency)
+        if self.cpu_ms:
+            burn_cpu(self.cpu_ms / 1000)
+
+        called = {
+            part.function_response.name
+            for content in llm_request.contents or []
+            for part in content.parts or []
+            if part.function_response
+        }
+        pending = [name for name in llm_request.tools_dict if name not in called]
+        if pending:
+            part = types.Part(
+                function_call=types.FunctionCall(name=pending[0], args={"request": "benchmark"})
+            )
+        else:
+            part = types.Part(text=f"Stub response after {self.latency:.2f}s of simulated latency.")
+
+        self.call_durations.append(time.perf_counter() - started)
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
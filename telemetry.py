@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+OpenTelemetry Spans for Requests, Agents and Tool Calls
+Ties a slow click to the sub-agent or tool call that made it slow
+
+ADK already creates OpenTelemetry spans for every agent invocation
+(invoke_agent <name>), model call (call_llm / generate_content <model>) and
+tool call (execute_tool <name>), with the model and token counts as gen_ai.*
+attributes - they just go nowhere until a tracer provider is installed. This module installs one when an
+exporter is configured, and adds the spans around them:
+
+    http chat / websocket chat / gradio research ...   one root span per request
+    │   app.pipeline, app.cache_hit, app.queue_wait_ms, http.response.status_code
+    └─ agent_run <pipeline>                            run_traced()
+       │   app.status, app.degrade_profile, token counts
+       └─ invoke_agent BlogPipeline                    ADK
+          ├─ invoke_agent OutlineAgent
+          │  └─ call_llm
+          │     └─ generate_content <model>            model, tokens, cached tokens,
+          │                                            app.model.backend, app.pacing_wait_ms,
+          │                                            google_search events (queries)
+          └─ execute_tool ...
+
+The span context travels with the run onto the model loop (model_client.py) and
+into each ParallelAgent branch - every branch is a task with its own copy of
+the context - so the branches show up as overlapping sibling spans. Google
+Search runs inside the Gemini call, so its queries are events on the model
+call's span rather than spans of their own.
+
+Exporters (environment variables; without one, spans cost next to nothing):
+    OTEL_SPANS_FILE=spans.jsonl        one JSON span per line, all processes appending
+    OTEL_EXPORTER_OTLP_ENDPOINT=http://localhost:4318
+                                       OTLP/HTTP to a local collector or Jaeger
+                                       (pip install opentelemetry-exporter-otlp-proto-http)
+Prompts and replies stay out of the spans unless ADK_CAPTURE_MESSAGE_CONTENT_IN_SPANS=true.
+
+    python telemetry.py spans.jsonl [trace id]    waterfall of the latest (or given) trace
+"""
+
+import os
+import sys
+import json
+import inspect
+import threading
+from contextlib import contextmanager, nullcontext
+
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+OTEL_SPANS_FILE = os.getenv("OTEL_SPANS_FILE", "")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT") or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "ai-agents-course")
+
+tracer = trace.get_tracer("ai_agents_course")
+
+
+def _span_record(span):
+    """One finished SDK span as a JSON-friendly dict (OTLP field names, hex ids)"""
+    context = span.get_span_context()
+    return {
+        "trace_id": format(context.trace_id, "032x"),
+        "span_id": format(context.span_id, "016x"),
+        "parent_span_id": format(span.parent.span_id, "016x") if span.parent else None,
+        "name": span.name,
+        "kind": span.kind.name,
+        "start_time_unix_nano": span.start_time,
+        "end_time_unix_nano": span.end_time,
+        "duration_ms": round((span.end_time - span.start_time) / 1e6, 3),
+        "status": span.status.status_code.name,
+        "status_message": span.status.description,
+        "attributes": dict(span.attributes or {}),
+        "events": [
+            {"name": event.name, "time_unix_nano": event.timestamp, "attributes": dict(event.attributes or {})}
+            for event in span.events
+        ],
+        "service": span.resource.attributes.get("service.name"),
+        "pid": os.getpid(),
+    }
+
+
+def setup_tracing():
+    """Install a tracer provider exporting to OTEL_SPANS_FILE and/or OTLP (no-op if neither is set)"""
+    if not (OTEL_SPANS_FILE or OTLP_ENDPOINT):
+        return False
+    os.environ.setdefault("ADK_CAPTURE_MESSAGE_CONTENT_IN_SPANS", "false")
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+    class JsonLinesSpanExporter(SpanExporter):
+        """Appends finished spans to a file, one JSON object per line"""
+
+        def __init__(self, path):
+            self.path = path
+            self._lock = threading.Lock()
+
+        def export(self, spans):
+            lines = "".join(json.dumps(_span_record(span), default=str) + "\n" for span in spans)
+            try:
+                with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+            except OSError:
+                return SpanExportResult.FAILURE
+            return SpanExportResult.SUCCESS
+
+    provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    if OTEL_SPANS_FILE:
+        provider.add_span_processor(BatchSpanProcessor(JsonLinesSpanExporter(OTEL_SPANS_FILE), schedule_delay_millis=1000))
+    if OTLP_ENDPOINT:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    return True
+
+
+TRACING_ENABLED = setup_tracing()
+
+
+def start_request_span(pipeline, entry_point, attributes=None, start_time=None):
+    """Start (without making it current) the root span of one request"""
+    return tracer.start_span(
+        f"{entry_point} {pipeline}",
+        context=trace.set_span_in_context(trace.INVALID_SPAN),
+        kind=SpanKind.SERVER,
+        attributes={"app.pipeline": pipeline, "app.entry_point": entry_point, **(attributes or {})},
+        start_time=start_time,
+    )
+
+
+def end_span(span, error=None):
+    if error is not None:
+        span.record_exception(error)
+        span.set_status(Status(StatusCode.ERROR, f"{type(error).__name__}: {error}"))
+    span.end()
+
+
+@contextmanager
+def request_span(pipeline, entry_point, attributes=None):
+    """Root span of a request handled by one function or coroutine, current while it runs"""
+    span = start_request_span(pipeline, entry_point, attributes)
+    with trace.use_span(span, end_on_exit=True):
+        yield span
+
+
+def span_scope(span, scope=None):
+    """Context manager making `span` current (inside `scope`, if given) - for starting tasks from generators
+
+    Async generators can't keep a span current across their yields, but tasks
+    started inside the scope inherit it.
+    """
+    @contextmanager
+    def scoped():
+        with scope or nullcontext(), trace.use_span(span, end_on_exit=False):
+            yield
+
+    return scoped()
+
+
+def in_span(span, work):
+    """Run `work` (a coroutine or an async generator) with `span` current, step by step"""
+    if inspect.isasyncgen(work):
+        async def steps():
+            try:
+                while True:
+                    with trace.use_span(span, end_on_exit=False):
+                        try:
+                            item = await work.__anext__()
+                        except StopAsyncIteration:
+                            return
+                    yield item
+            finally:
+                await work.aclose()
+
+        return steps()
+
+    async def run():
+        with trace.use_span(span, end_on_exit=False):
+            return await work
+
+    return run()
+
+
+def record_cache_hit(pipeline, entry_point, cache, started_ns):
+    """A finished root span for a request answered from `cache` (started_ns: when the lookup began)"""
+    span = start_request_span(pipeline, entry_point, {"app.cache_hit": True, "app.cache": cache}, started_ns)
+    span.end()
+
+
+def annotate(attributes):
+    """Set attributes on the current span (a no-op without tracing)"""
+    span = trace.get_current_span()
+    if span.is_recording():
+        span.set_attributes(attributes)
+
+
+def start_run_span(pipeline, attributes):
+    """Span of one agent run, child of the current span (see agent_tracing.run_traced())"""
+    return tracer.start_span(f"agent_run {pipeline}", attributes={"app.pipeline": pipeline, **attributes})
+
+
+def end_run_span(span, run_trace):
+    """Finish the span of an agent run with its status and token counts"""
+    if span.is_recording():
+        calls = run_trace.get("model_calls", run_trace["events"])
+        span.set_attributes({
+            "app.trace_id": run_trace["trace_id"],
+            "app.status": run_trace["status"],
+            "app.events": len(run_trace["events"]),
+            "gen_ai.usage.input_tokens": sum(call.get("prompt_tokens", 0) for call in calls),
+            "gen_ai.usage.output_tokens": sum(call.get("completion_tokens", 0) for call in calls),
+        })
+        if run_trace["status"] in ("error", "deadline_exceeded"):
+            span.set_status(Status(StatusCode.ERROR, run_trace.get("error", run_trace["status"])))
+    span.end()
+
+
+def annotate_model_response(span, response):
+    """Cached tokens and Google Search queries of one model response, on the model call's span"""
+    if not span.is_recording():
+        return
+    usage = response.usage_metadata
+    if usage is not None and usage.cached_content_token_count and not response.partial:
+        span.set_attribute("gen_ai.usage.cache_read_input_tokens", usage.cached_content_token_count)
+    grounding = response.grounding_metadata
+    if grounding is not None and grounding.web_search_queries:
+        span.add_event("google_search", {
+            "gen_ai.tool.name": "google_search",
+            "app.search.queries": list(grounding.web_search_queries),
+        })
+
+
+def print_waterfall(path, trace_id=None, width=60):
+    """Print one trace from a spans file as an indented waterfall (the latest trace by default)"""
+    with open(path, encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    if not spans:
+        print("No spans recorded yet")
+        return
+    if trace_id is None:
+        roots = [span for span in spans if span["parent_span_id"] is None]
+        trace_id = max(roots or spans, key=lambda span: span["start_time_unix_nano"])["trace_id"]
+    spans = [span for span in spans if span["trace_id"] == trace_id]
+    children = {}
+    for span in spans:
+        children.setdefault(span["parent_span_id"], []).append(span)
+    ids = {span["span_id"] for span in spans}
+    start = min(span["start_time_unix_nano"] for span in spans)
+    total = max(span["end_time_unix_nano"] for span in spans) - start or 1
+
+    print(f"trace {trace_id}  {total / 1e6:.1f} ms")
+
+    def show(span, depth):
+        offset = int((span["start_time_unix_nano"] - start) / total * width)
+        length = max(1, int((span["end_time_unix_nano"] - span["start_time_unix_nano"]) / total * width))
+        bar = " " * offset + "█" * length
+        label = ("  " * depth + span["name"])[:44]
+        print(f"{label:<44} {bar:<{width}} {span['duration_ms']:>9.1f} ms")
+        for child in sorted(children.get(span["span_id"], []), key=lambda s: s["start_time_unix_nano"]):
+            show(child, depth + 1)
+
+    # Spans whose parent was not recorded (e.g. still running) are shown as roots
+    for span in sorted(spans, key=lambda s: s["start_time_unix_nano"]):
+        if span["parent_span_id"] not in ids:
+            show(span, 0)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python telemetry.py spans.jsonl [trace id]")
+    print_waterfall(sys.argv[1], *sys.argv[2:3])
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Token and Cost Accounting for Agent Runs
+Aggregates model usage per request, per agent and per pipeline
+
+Works on the traces recorded by agent_tracing.run_traced(). Token counts
+come from an after_model_callback that run_traced() attaches to every LLM
+agent of the runner's tree (track_model_usage()), so every model call is
+counted under the agent that made it - including agents wrapped in AgentTool,
+whose calls happen in a runner of their own and never show up as events of
+the parent run. Tool calls are counted from the tool_call events. USAGE keeps
+process-wide counters that are exported in Prometheus text format by
+GET /metrics (web-chat/server.py).
+
+Prices are per million tokens and default to Gemini 2.5 Flash Lite list prices:
+    MODEL_INPUT_PRICE_PER_M=0.10  MODEL_OUTPUT_PRICE_PER_M=0.40
+"""
+
+import os
+import threading
+import contextvars
+from contextlib import contextmanager
+
+INPUT_PRICE_PER_M = float(os.getenv("MODEL_INPUT_PRICE_PER_M", "0.10"))
+OUTPUT_PRICE_PER_M = float(os.getenv("MODEL_OUTPUT_PRICE_PER_M", "0.40"))
+
+COUNTER_FIELDS = ("requests", "model_calls", "prompt_tokens", "completion_tokens", "tool_calls")
+
+
+def estimate_cost(prompt_tokens, completion_tokens):
+    """Estimated USD cost of the given token counts"""
+    return (prompt_tokens * INPUT_PRICE_PER_M + completion_tokens * OUTPUT_PRICE_PER_M) / 1_000_000
+
+
+def _new_counters():
+    return dict.fromkeys(COUNTER_FIELDS, 0)
+
+
+# The model call list of the run in progress (see collect_model_calls())
+_model_calls = contextvars.ContextVar("model_calls", default=None)
+
+
+@contextmanager
+def collect_model_calls(calls):
+    """Append a record of every model call made in this context (and the tasks it starts) to `calls`"""
+    token = _model_calls.set(calls)
+    try:
+        yield calls
+    finally:
+        _model_calls.reset(token)
+
+
+def record_model_usage(callback_context, llm_response):
+    """after_model_callback adding the token usage of one model call to the current run"""
+    calls = _model_calls.get()
+    usage = llm_response.usage_metadata
+    # Streamed chunks repeat the usage of the final, aggregated response
+    if calls is not None and usage and not llm_response.partial:
+        calls.append({
+            "agent": callback_context.agent_name,
+            "prompt_tokens": usage.prompt_token_count or 0,
+            "completion_tokens": usage.candidates_token_count or 0,
+        })
+    return None
+
+
+def track_model_usage(agent):
+    """Attach record_model_usage() to every LLM agent of the tree, AgentTool agents included.
+
+    Safe to call again on the same tree: agents that already have it are left alone.
+    """
+    from google.adk.tools import AgentTool
+
+    def walk(node):
+        if hasattr(node, "after_model_callback"):
+            existing = node.after_model_callback
+            callbacks = existing if isinstance(existing, list) else [existing] if existing else []
+            if record_model_usage not in callbacks:
+                # First, so a later callback that replaces the response can't skip it
+                node.after_model_callback = [record_model_usage, *callbacks]
+        for sub_agent in node.sub_agents:
+            walk(sub_agent)
+        for tool in getattr(node, "tools", None) or []:
+            if isinstance(tool, AgentTool):
+                walk(tool.agent)
+
+    walk(agent)
+    return agent
+
+
+def summarize_usage(trace):
+    """Aggregate the token usage and tool calls of one trace, overall and per agent"""
+    summary = _new_counters()
+    summary["requests"] = 1
+    by_agent = {}
+
+    # Traces recorded without model call records fall back to the usage on their events
+    calls = trace.get("model_calls")
+    if calls is None:
+        calls = [record for record in trace["events"] if "prompt_tokens" in record]
+
+    for call in calls:
+        agent = by_agent.setdefault(call["agent"], _new_counters())
+        for counters in (summary, agent):
+            counters["model_calls"] += 1
+            counters["prompt_tokens"] += call["prompt_tokens"]
+            counters["completion_tokens"] += call["completion_tokens"]
+
+    for record in trace["events"]:
+        tool_calls = len(record.get("tool_calls", ()))
+        if tool_calls:
+            summary["tool_calls"] += tool_calls
+            by_agent.setdefault(record["agent"], _new_counters())["tool_calls"] += tool_calls
+
+    for counters in [summary, *by_agent.values()]:
+        counters["total_tokens"] = counters["prompt_tokens"] + counters["completion_tokens"]
+        counters["estimated_cost_usd"] = round(
+            estimate_cost(counters["prompt_tokens"], counters["completion_tokens"]), 6
+        )
+
+    summary["pipeline"] = trace["pipeline"]
+    summary["by_agent"] = {
+        name: counters
+        for name, counters in by_agent.items()
+        if counters["model_calls"] or counters["tool_calls"]
+    }
+    return summary
+
+
+def format_usage(summary):
+    """One-line human readable usage summary for status boxes"""
+    if not summary:
+        return ""
+    agents = ", ".join(
+        f"{name} {counters['total_tokens']:,}" for name, counters in summary["by_agent"].items()
+    )
+    line = (
+        f"🔢 {summary['total_tokens']:,} tokens "
+        f"({summary['prompt_tokens']:,} in / {summary['completion_tokens']:,} out) · "
+        f"{summary['model_calls']} model calls · {summary['tool_calls']} tool calls · "
+        f"~${summary['estimated_cost_usd']:.4f}"
+    )
+    return f"{line}\n{agents}" if agents else line
+
+
+class UsageMeter:
+    """Thread-safe cumulative usage counters per pipeline and per agent"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pipelines = {}
+        self._agents = {}
+
+    def record(self, trace):
+        """Add a finished trace to the counters and return its per-request summary"""
+        summary = summarize_usage(trace)
+        pipeline = summary["pipeline"]
+
+        with self._lock:
+            counters = self._pipelines.setdefault(pipeline, _new_counters())
+            for field in COUNTER_FIELDS:
+                counters[field] += summary[field]
+            for name, agent_summary in summary["by_agent"].items():
+                counters = self._agents.setdefault((pipeline, name), _new_counters())
+                for field in COUNTER_FIELDS:
+                    counters[field] += agent_summary[field]
+                counters["requests"] += 1
+        return summary
+
+    def snapshot(self):
+        """Return copies of the counters, with estimated cost added"""
+        with self._lock:
+            pipelines = {name: dict(counters) for name, counters in self._pipelines.items()}
+            agents = {key: dict(counters) for key, counters in self._agents.items()}
+
+        for counters in [*pipelines.values(), *agents.values()]:
+            counters["estimated_cost_usd"] = round(
+                estimate_cost(counters["prompt_tokens"], counters["completion_tokens"]), 6
+            )
+        return {
+            "pipelines": pipelines,
+            "agents": [
+                {"pipeline": pipeline, "agent": agent, **counters}
+                for (pipeline, agent), counters in sorted(agents.items())
+            ],
+        }
+
+    def prometheus_text(self):
+        """Render the counters in Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for field in COUNTER_FIELDS:
+            name = f"agent_pipeline_{field}_total"
+            lines.append(f"# TYPE {name} counter")
+            for pipeline, counters in sorted(snapshot["pipelines"].items()):
+                lines.append(f'{name}{{pipeline="{pipeline}"}} {counters[field]}')
+        for field in COUNTER_FIELDS:
+            name = f"agent_{field}_total"
+            lines.append(f"# TYPE {name} counter")
+            for counters in snapshot["agents"]:
+                lines.append(
+                    f'{name}{{pipeline="{counters["pipeline"]}",agent="{counters["agent"]}"}} '
+                    f"{counters[field]}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+USAGE = UsageMeter()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Warm-Up Phase and Readiness Gating
+Makes the first request after a restart as fast as the steady state
+
+Agents, runners and the model client are all created lazily (see
+agent_runtime.py), and the first agent run also imports ADK's flow code and
+opens the first connection to the model endpoint. start_warm_up() does all
+of that in a background thread right after startup:
+
+1. build: every RunnerPool creates WARMUP_RUNNERS runner(s), which builds
+   its pipeline (build_research_system(), build_blog_pipeline(), ...)
+2. prime: one tiny real agent run ("Reply with OK") through the chat pool -
+   client setup, DNS, TLS handshake and lazy imports happen here
+
+READINESS flips to ready once warm-up has finished. The health endpoint
+reports it (503 while warming up), /api/chat and the Gradio handlers wait
+for it (at most WARMUP_WAIT_S). A failing step is recorded and reported, but
+does not keep the app from serving - the circuit breaker deals with a broken
+backend. Without start_warm_up() (or with WARMUP=0) nothing is gated.
+
+Agent runs share one model client (see model_client.py), so the connection
+the prime run opens is kept alive for the first requests.
+
+Configuration (environment variables):
+    WARMUP=1  WARMUP_PRIME_MODEL=1  WARMUP_RUNNERS=1  WARMUP_WAIT_S=60
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import threading
+from contextlib import contextmanager
+
+from agent_tracing import DEFAULT_USER_ID, discard_session, run_traced
+from usage_accounting import USAGE
+
+WARMUP_ENABLED = os.getenv("WARMUP", "1") != "0"
+WARMUP_PRIME_MODEL = os.getenv("WARMUP_PRIME_MODEL", "1") != "0"
+WARMUP_RUNNERS = int(os.getenv("WARMUP_RUNNERS", "1"))
+WARMUP_WAIT_S = float(os.getenv("WARMUP_WAIT_S", "60"))
+
+PRIME_PROMPT = "Reply with the single word OK."
+PRIME_TIMEOUT_S = 30
+
+
+class Readiness:
+    """Thread-safe warm-up state: idle -> warming -> ready | failed"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self.state = "idle"
+        self.steps = []
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def warming(self):
+        return self.state == "warming"
+
+    @property
+    def ready(self):
+        """True unless a warm-up is still running"""
+        return not self.warming
+
+    def begin(self):
+        with self._lock:
+            self.state = "warming"
+            self.steps = []
+            self.started_at = time.time()
+            self._done.clear()
+
+    @contextmanager
+    def step(self, name):
+        """Time one warm-up step; its failure is recorded, not raised"""
+        started = time.perf_counter()
+        record = {"name": name, "ok": True}
+        try:
+            yield record
+        except Exception as e:
+            record.update(ok=False, error=f"{type(e).__name__}: {e}")
+            print(f"⚠️ Warm-up step {name} failed: {e}")
+        finally:
+            record["duration_s"] = round(time.perf_counter() - started, 3)
+            with self._lock:
+                self.steps.append(record)
+
+    def finish(self):
+        with self._lock:
+            self.state = "ready" if all(step["ok"] for step in self.steps) else "failed"
+            self.finished_at = time.time()
+        self._done.set()
+        print(f"✅ Warm-up finished ({self.state}) in {self.finished_at - self.started_at:.1f}s")
+
+    def wait(self, timeout=WARMUP_WAIT_S):
+        """Block until warm-up has finished; False if it is still running after `timeout`"""
+        return self.ready or self._done.wait(timeout)
+
+    async def wait_async(self, timeout=WARMUP_WAIT_S, poll_interval=0.2):
+        deadline = time.monotonic() + timeout
+        while self.warming and time.monotonic() < deadline:
+            await asyncio.sleep(poll_interval)
+        return self.ready
+
+    def snapshot(self):
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "state": self.state,
+                "ready": self.ready,
+                "duration_s": round(end - self.started_at, 3) if self.started_at else None,
+                "steps": [dict(step) for step in self.steps],
+            }
+
+
+READINESS = Readiness()
+
+
+async def until_ready(timeout=WARMUP_WAIT_S):
+    """Async generator of status messages while warm-up is running - nothing once ready"""
+    if READINESS.ready:
+        return
+    yield "⏳ Warming up the agents - your request starts in a moment..."
+    await READINESS.wait_async(timeout)
+
+
+async def prime(pool):
+    """One tiny agent run through `pool`, in a session that is discarded afterwards"""
+    session_id = f"warmup-{uuid.uuid4().hex}"
+    with pool.lease() as runner:
+        try:
+            _, trace = await run_traced(
+                runner, PRIME_PROMPT, "warmup", session_id=session_id, timeout=PRIME_TIMEOUT_S
+            )
+        finally:
+            await discard_session(runner, DEFAULT_USER_ID, session_id)
+    USAGE.record(trace)
+    if trace["status"] != "ok":
+        raise RuntimeError(f"prime run ended with status {trace['status']}")
+
+
+def warm_up(pools, prime_pool=None):
+    """Run the warm-up steps in the calling thread"""
+    for pool in pools:
+        with READINESS.step(f"build:{pool.app_name}"):
+            pool.warm(WARMUP_RUNNERS)
+    if prime_pool is not None and WARMUP_PRIME_MODEL:
+        with READINESS.step(f"prime:{prime_pool.app_name}"):
+            asyncio.run(prime(prime_pool))
+    READINESS.finish()
+
+
+def start_warm_up(pools, prime_pool=None):
+    """Warm up `pools` in a background thread; READINESS is gated until it finishes"""
+    if not WARMUP_ENABLED:
+        return None
+    READINESS.begin()
+    print(f"🔥 Warming up {len(pools)} runner pool(s)...")
+    thread = threading.Thread(target=warm_up, args=(pools, prime_pool), name="warm-up", daemon=True)
+    thread.start()
+    return thread
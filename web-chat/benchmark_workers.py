@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Worker Scaling Benchmark for the Chat Server
+Measures /api/chat throughput for different numbers of worker processes
+
+Starts server.py with the local stub model (STUB_MODEL_LATENCY_S, no API
+calls) for each worker count, drives it with concurrent clients for a fixed
+duration and reports throughput, latency and the speedup over one worker.
+Every request uses a fresh message and bypasses the response cache, so the
+agent runs each time. STUB_MODEL_CPU_MS adds GIL-holding work per model call;
+with enough of it a single process stops scaling with concurrency, while
+worker processes scale with the cores of the machine.
+
+Usage:
+    python benchmark_workers.py --workers 1,2,4 --concurrency 16 --duration 10 -o workers.json
+
+Results are written as JSON (to stdout without --output) for trend tracking.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+
+
+def post_json(url, payload, timeout=60):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def wait_until_healthy(base_url, server, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with status {server.returncode}")
+        try:
+            with urllib.request.urlopen(f"{base_url}/api/health", timeout=2):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"server did not become healthy within {timeout}s")
+
+
+def start_server(workers, port, latency, cpu_ms, store_path):
+    env = dict(
+        os.environ,
+        GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY", "benchmark-stub-model"),
+        STUB_MODEL_LATENCY_S=str(latency),
+        STUB_MODEL_CPU_MS=str(cpu_ms),
+        SHARED_STORE_PATH=store_path,
+        # Every benchmark client shares one IP
+        CLIENT_LIMITS="0",
+    )
+    return subprocess.Popen(
+        [sys.executable, SERVER, "--workers", str(workers), "--port", str(port), "--host", "127.0.0.1"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def stop_server(server):
+    try:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait(timeout=15)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+
+
+def drive(base_url, concurrency, duration):
+    """Keep `concurrency` requests in flight for `duration` seconds"""
+    deadline = time.monotonic() + duration
+
+    def client():
+        latencies, errors = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                post_json(f"{base_url}/api/chat", {"message": f"benchmark {uuid.uuid4().hex}", "cache": False})
+                latencies.append(time.perf_counter() - started)
+            except OSError:
+                errors += 1
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: client(), range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2),
+        "latency_p50_s": round(statistics.median(latencies), 4) if latencies else None,
+        "latency_p95_s": round(latencies[int(0.95 * (len(latencies) - 1))], 4) if latencies else None,
+    }
+
+
+def run_benchmark(worker_counts, concurrency, duration, latency, cpu_ms, port):
+    results = []
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            server = start_server(workers, port, latency, cpu_ms, os.path.join(tmp, "shared.db"))
+            base_url = f"http://127.0.0.1:{port}"
+            try:
+                wait_until_healthy(base_url, server)
+                # Warm up every worker before measuring
+                drive(base_url, concurrency, min(duration, 2))
+                result = drive(base_url, concurrency, duration)
+            finally:
+                stop_server(server)
+        result["workers"] = workers
+        results.append(result)
+        print(f"👷 {workers} worker(s): {result['throughput_rps']} req/s", file=sys.stderr)
+
+    baseline = results[0]["throughput_rps"] or 1.0
+    for result in results:
+        result["speedup"] = round(result["throughput_rps"] / baseline, 2)
+
+    return {
+        "benchmark": "chat_server_workers",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "cpu_count": os.cpu_count(),
+        "model_latency_s": latency,
+        "model_cpu_ms": cpu_ms,
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark chat server throughput against the number of worker processes."
+    )
+    parser.add_argument(
+        "--workers", default="1,2,4",
+        help="Comma-separated worker counts; the first is the speedup baseline (default: 1,2,4)",
+    )
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients (default: 16)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds measured per worker count (default: 10)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per model call (default: 0.05)")
+    parser.add_argument(
+        "--cpu-ms", type=float, default=20,
+        help="GIL-holding CPU work per model call in ms (default: 20)",
+    )
+    parser.add_argument("--port", type=int, default=8095, help="Port for the benchmarked server (default: 8095)")
+    parser.add_argument("-o", "--output", help="Write the JSON results to this file instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    worker_counts = [int(count) for count in args.workers.split(",") if count.strip()]
+    report = run_benchmark(worker_counts, args.concurrency, args.duration, args.latency, args.cpu_ms, args.port)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
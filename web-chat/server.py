@@ -4,52 +4,149 @@ Flask API server for AI Agent Chat
 """
 
 import os
+import sys
+import json
+import uuid
+import signal
+import socket
 import asyncio
-from flask import Flask, request, jsonify
+import argparse
+import functools
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from google.adk.agents import Agent
-from google.adk.runners import InMemoryRunner
-from google.adk.tools import google_search
+try:  # optional: without flask-sock the page falls back to POST /api/chat
+    from flask_sock import Sock
+    from simple_websocket import ConnectionClosed
+except ImportError:
+    Sock = None
 
-# Set up API key
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# Shared helpers live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-if not GOOGLE_API_KEY:
-    raise ValueError(
-        "GOOGLE_API_KEY environment variable is required.\n"
-        "Set it with: export GOOGLE_API_KEY=your-key"
-    )
+from agent_tracing import DEFAULT_USER_ID, TRACES, discard_session, final_text, run_traced, timed_out_text
+from usage_accounting import USAGE
+from agent_runtime import MODEL_NAME, build_chat_agent, require_api_key
+from resilience import PIPELINE_TIMEOUTS, BREAKER, CircuitOpenError, parse_timeout
+from cancellation import (
+    ACTIVE_RUNS,
+    CANCELLATIONS,
+    RunCancelled,
+    run_cancellable,
+    socket_disconnect_checker,
+)
+from degrade import DEGRADE, degrade_model_callback, degrade_scope
+from runner_pool import RunnerPool
+from shared_store import STORE, cache_key
+from warmup import READINESS, WARMUP_WAIT_S, start_warm_up, until_ready
+from chat_session import stream_reply
+from model_client import CONNECTIONS
+from model_pool import model_pool
+from client_limits import CLIENT_LIMITS, client_id
+from profiling import (
+    PROFILE_INTERVAL_MS,
+    REQUEST_PROFILER,
+    ProfilerBusy,
+    admin_authorized,
+    admin_token,
+    sample_profile,
+)
+from telemetry import annotate, request_span
+
+require_api_key()
 
-os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
-os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "FALSE"
+# Cached replies are shared by all worker processes (0 disables the cache)
+RESPONSE_CACHE_TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", "300"))
+# A cancel for a run on another worker waits this long for that worker to pick it up
+CANCEL_FORWARD_TTL_S = 60
+
+# STUB_MODEL_LATENCY_S swaps Gemini for a local stub model, for load tests and
+# benchmarks (see benchmark_workers.py); STUB_MODEL_CPU_MS adds GIL-holding work per call
+STUB_MODEL_LATENCY_S = os.getenv("STUB_MODEL_LATENCY_S")
+MODEL_LABEL = "latency-stub" if STUB_MODEL_LATENCY_S else MODEL_NAME
+
+# Keeps idle chat sockets open through proxies that drop silent connections
+WS_PING_INTERVAL_S = float(os.getenv("WS_PING_INTERVAL_S", "25"))
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+app.config['SOCK_SERVER_OPTIONS'] = {'ping_interval': WS_PING_INTERVAL_S or None}
+sock = Sock(app) if Sock else None
+
 
-# Create the AI agent
-root_agent = Agent(
-    name="helpful_assistant",
-    model="gemini-2.5-flash-lite",
-    description="A helpful AI assistant that can answer questions and search the web.",
-    instruction="""You are a helpful and friendly AI assistant.
+def build_agent():
+    """The AI agent of one pooled runner, built when the runner is first needed"""
+    model, tools = None, None  # the shared Gemini client with Google Search
+    if STUB_MODEL_LATENCY_S:
+        from stub_model import LatencyModel
+
+        model = LatencyModel(
+            latency=float(STUB_MODEL_LATENCY_S),
+            cpu_ms=float(os.getenv("STUB_MODEL_CPU_MS", "0")),
+        )
+        tools = []  # Google Search only works with Gemini models
+    return build_chat_agent(
+        model=model,
+        tools=tools,
+        instruction="""You are a helpful and friendly AI assistant.
     Use Google Search for current information, news, weather, or any time-sensitive queries.
     Provide clear, concise, and accurate responses.
     Be conversational and engaging.""",
-    tools=[google_search],
-)
+        before_model_callback=degrade_model_callback,
+    )
+
 
-# Create the runner
-runner = InMemoryRunner(agent=root_agent)
+# Create the runners (a pool, so concurrent requests don't contend on one runner)
+runner = RunnerPool(build_agent, "chat")
 
 print("=" * 80)
 print("🚀 AI Agent Chat Server Starting...")
 print("=" * 80)
-print("✅ Agent initialized with Google Search tool")
-print("✅ Model: gemini-2.5-flash-lite")
+print("✅ Agent: helpful_assistant (built on the first request)")
+print(f"✅ Model: {MODEL_LABEL}")
+if sock is None:
+    print("⚠️ flask-sock not installed: /api/ws disabled, chat uses POST /api/chat")
 print("=" * 80)
 
 
+def response_cache_key(message, profile):
+    """Same question, same degrade profile -> same cached reply (/api/chat requests are single-turn)"""
+    return cache_key("chat", profile["name"], " ".join(message.lower().split()))
+
+
+def queue_depth():
+    """Runs in flight beyond what the runner pool serves side by side - this worker's queue"""
+    return max(len(ACTIVE_RUNS) - runner.size, 0)
+
+
+def cancel_checker(request_id, is_disconnected):
+    """Poll for client disconnects and for cancels forwarded by other workers (see cancel())"""
+    def check():
+        if STORE.get(f"cancel:{request_id}"):
+            ACTIVE_RUNS.cancel(request_id)
+            return False
+        return bool(is_disconnected and is_disconnected())
+
+    return check
+
+
+def traced(pipeline):
+    """Root span of the request (see telemetry.py), with its response status"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            attributes = {'http.request.method': request.method, 'url.path': request.path}
+            with request_span(pipeline, 'http', attributes) as span:
+                response = app.make_response(view(*args, **kwargs))
+                span.set_attribute('http.response.status_code', response.status_code)
+                return response
+
+        return wrapper
+
+    return decorator
+
+
 @app.route('/api/chat', methods=['POST'])
+@traced('chat')
 def chat():
     """Handle chat requests from the frontend"""
     try:
@@ -63,41 +160,455 @@ def chat():
         if not user_message.strip():
             return jsonify({'error': 'Message cannot be empty'}), 400
 
+        # One client can't monopolize the runners (budgets per IP / token, per worker)
+        retry_after = CLIENT_LIMITS.check(client_id(request.headers, request.remote_addr), 'chat')
+        if retry_after:
+            STORE.incr('server_chat_requests_total', {'status': 'rate_limited'})
+            response = jsonify({'error': 'Too many requests. Please slow down.', 'retry_after': round(retry_after, 1)})
+            response.headers['Retry-After'] = str(max(int(retry_after + 0.999), 1))
+            return response, 429
+
+        # Deadline in seconds: X-Request-Timeout header, then "timeout" field, then default
+        timeout = parse_timeout(
+            request.headers.get('X-Request-Timeout', data.get('timeout')),
+            default=PIPELINE_TIMEOUTS['chat'],
+        )
+
+        # Lets the page cancel this request via POST /api/cancel
+        request_id = request.headers.get('X-Request-Id') or str(uuid.uuid4())
+        annotate({'app.request_id': request_id})
+
         print(f"\n📨 Received: {user_message}")
 
-        # Run the agent query
+        # Requests beyond the runner pool's capacity are this server's queue: answer shorter under load
+        profile = DEGRADE.update(queue_depth())
+
+        # A reply cached by any worker answers repeated questions instantly
+        use_cache = RESPONSE_CACHE_TTL_S > 0 and data.get('cache', True)
+        if use_cache:
+            key = response_cache_key(user_message, profile)
+            cached = STORE.get(key)
+            STORE.incr('server_response_cache_total', {'result': 'hit' if cached else 'miss'})
+            annotate({'app.cache_hit': bool(cached), 'app.cache': 'response'})
+            if cached:
+                STORE.incr('server_chat_requests_total', {'status': 'cached'})
+                return jsonify({
+                    'response': cached,
+                    'cached': True,
+                    'degrade_profile': profile['name'],
+                    'success': True
+                })
+
+        # Right after a (re)start: wait for the warm-up rather than paying for it
+        if not READINESS.wait(WARMUP_WAIT_S):
+            STORE.incr('server_chat_requests_total', {'status': 'warming_up'})
+            response = jsonify({'error': 'The agent is still warming up. Please try again shortly.'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+
+        # Run the agent query, cancelling it if the client hangs up
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
-        response = loop.run_until_complete(runner.run_debug(user_message))
-        loop.close()
+        try:
+            # Each request is a conversation of its own: no history shared between
+            # clients, which also makes its reply safe to cache
+            session_id = f"http-{uuid.uuid4().hex}"
+            with runner.lease() as leased, degrade_scope(profile):
+                try:
+                    response, trace = loop.run_until_complete(run_cancellable(
+                        run_traced(leased, user_message, pipeline="chat", session_id=session_id, timeout=timeout),
+                        pipeline="chat",
+                        is_disconnected=cancel_checker(request_id, socket_disconnect_checker(request.environ)),
+                        request_id=request_id,
+                    ))
+                finally:
+                    loop.run_until_complete(discard_session(leased, DEFAULT_USER_ID, session_id))
+        finally:
+            loop.close()
+        usage = USAGE.record(trace)
+        DEGRADE.observe_latency(trace["duration_ms"] / 1000)
+        STORE.incr('server_chat_requests_total', {'status': trace['status']})
+        STORE.incr('server_chat_tokens_total', {'type': 'prompt'}, usage['prompt_tokens'])
+        STORE.incr('server_chat_tokens_total', {'type': 'completion'}, usage['completion_tokens'])
 
-        # Extract the text response
-        if response and len(response) > 0:
-            response_text = response[0].content.parts[0].text
+        if trace["status"] == "deadline_exceeded":
+            return jsonify({
+                'response': timed_out_text(response),
+                'usage': usage,
+                'partial': True,
+                'success': True
+            })
+
+        # The last final response is the answer (earlier events may be tool calls or searches)
+        response_text = final_text(response)
+        if response_text:
             print(f"💬 Response: {response_text[:100]}...")
+            if use_cache:
+                STORE.set(key, response_text, ttl=RESPONSE_CACHE_TTL_S)
 
             return jsonify({
                 'response': response_text,
+                'usage': usage,
+                'degrade_profile': profile['name'],
                 'success': True
             })
         else:
             return jsonify({'error': 'No response from agent'}), 500
 
+    except RunCancelled as e:
+        print(f"🛑 {str(e)}")
+        STORE.incr('server_chat_requests_total', {'status': 'cancelled'})
+        # 499: client closed request (nginx convention); nobody is listening anyway
+        return jsonify({'error': 'Request cancelled', 'cancelled': True}), 499
+
+    except CircuitOpenError as e:
+        print(f"⏳ {str(e)}")
+        STORE.incr('server_chat_requests_total', {'status': 'unavailable'})
+        response = jsonify({'error': 'The AI service is temporarily unavailable. Please try again shortly.'})
+        response.headers['Retry-After'] = str(int(e.retry_after))
+        return response, 503
+
     except Exception as e:
         print(f"❌ Error: {str(e)}")
+        STORE.incr('server_chat_requests_total', {'status': 'error'})
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
 
+@app.route('/api/cancel', methods=['POST'])
+def cancel():
+    """Cancel an in-flight chat request by its X-Request-Id
+
+    With several workers the run may live in another process: the cancel is
+    then left in the shared store, where that worker's cancel checker finds it.
+    """
+    data = request.get_json(silent=True) or {}
+    request_id = data.get('request_id')
+    if not request_id:
+        return jsonify({'error': 'No request_id provided'}), 400
+    if ACTIVE_RUNS.cancel(request_id):
+        return jsonify({'cancelled': True})
+    STORE.set(f"cancel:{request_id}", "1", ttl=CANCEL_FORWARD_TTL_S)
+    return jsonify({'cancelled': False, 'forwarded': True})
+
+
+def run_status(event):
+    """What the agent is doing, judging by one of its events (None if nothing new)"""
+    if event.get_function_calls():
+        return {'status': 'searching', 'detail': ', '.join(call.name for call in event.get_function_calls())}
+    if event.get_function_responses():
+        return {'status': 'summarizing'}
+    grounding = event.grounding_metadata
+    if grounding is not None and grounding.web_search_queries:
+        return {'status': 'searching', 'detail': ', '.join(grounding.web_search_queries)}
+    return None
+
+
+class ChatSocket:
+    """One browser session's WebSocket: a multi-turn chat, one reply streaming at a time
+
+    Messages are JSON objects. From the page:
+        {"type": "chat", "id": ..., "message": ..., "timeout": optional seconds}
+        {"type": "cancel", "id": ...}    stop the reply being streamed
+        {"type": "reset"}                start a new conversation
+    To the page, each with the "id" of its chat message:
+        status (thinking / warming_up / searching / summarizing, with an optional detail),
+        token (the next piece of the reply), then done, error or cancelled.
+
+    The conversation lives in an ADK session of its own, discarded when the
+    socket closes; closing the socket also cancels the reply being streamed.
+    """
+
+    def __init__(self, ws, client):
+        self.ws = ws
+        self.client = client
+        self.session_id = f"ws-{uuid.uuid4().hex}"
+        self.turn = None  # task streaming the current reply
+        self.request_id = None
+
+    def send(self, kind, **fields):
+        try:
+            self.ws.send(json.dumps({'type': kind, **fields}))
+        except ConnectionClosed:
+            pass  # serve() notices the close and cancels the run
+
+    async def serve(self):
+        self.send('ready', model=MODEL_LABEL)
+        try:
+            while True:
+                try:
+                    data = json.loads(await asyncio.to_thread(self.ws.receive))
+                except ValueError:
+                    data = None
+                if not isinstance(data, dict):
+                    self.send('error', error='Messages must be JSON objects')
+                    continue
+                kind = data.get('type')
+                if kind == 'chat':
+                    self.start_turn(data)
+                elif kind == 'cancel':
+                    if data.get('id') in (None, self.request_id):
+                        self.cancel_turn('user_cancel')
+                elif kind == 'reset':
+                    await self.stop_turn('user_cancel')
+                    await discard_session(runner, DEFAULT_USER_ID, self.session_id)
+                    self.session_id = f"ws-{uuid.uuid4().hex}"
+                else:
+                    self.send('error', error=f'Unknown message type: {kind}')
+        except ConnectionClosed:
+            pass
+        finally:
+            await self.stop_turn('client_disconnect')
+            await discard_session(runner, DEFAULT_USER_ID, self.session_id)
+
+    @property
+    def streaming(self):
+        return self.turn is not None and not self.turn.done()
+
+    def cancel_turn(self, reason):
+        if self.streaming and not ACTIVE_RUNS.cancel(self.request_id, reason=reason):
+            self.turn.cancel()  # the run has not started yet (warm-up)
+
+    async def stop_turn(self, reason):
+        if self.streaming:
+            self.cancel_turn(reason)
+            await asyncio.gather(self.turn, return_exceptions=True)
+
+    def start_turn(self, data):
+        request_id = str(data.get('id') or uuid.uuid4())
+        message = str(data.get('message') or '').strip()
+        if not message:
+            self.send('error', id=request_id, error='Message cannot be empty')
+            return
+        if self.streaming:
+            self.send('error', id=request_id, error='Please wait for the current reply to finish')
+            return
+
+        retry_after = CLIENT_LIMITS.check(self.client, 'chat')
+        if retry_after:
+            STORE.incr('server_chat_requests_total', {'status': 'rate_limited'})
+            self.send('error', id=request_id, error='Too many requests. Please slow down.',
+                      retry_after=round(retry_after, 1))
+            return
+
+        timeout = parse_timeout(data.get('timeout'), default=PIPELINE_TIMEOUTS['chat'])
+        self.request_id = request_id
+        self.turn = asyncio.ensure_future(self.reply(request_id, message, timeout))
+
+    async def reply(self, request_id, message, timeout):
+        """Stream the reply to one chat message, under its own root span"""
+        with request_span('chat', 'websocket', {'app.request_id': request_id, 'app.session_id': self.session_id}):
+            await self.stream(request_id, message, timeout)
+
+    async def stream(self, request_id, message, timeout):
+        print(f"\n📨 Received (websocket): {message}")
+        last_status = None
+
+        def status(update):
+            nonlocal last_status
+            if update is not None and update != last_status:
+                last_status = update
+                self.send('status', id=request_id, **update)
+
+        try:
+            async for text in until_ready():
+                status({'status': 'warming_up', 'detail': text})
+            if READINESS.warming:
+                STORE.incr('server_chat_requests_total', {'status': 'warming_up'})
+                self.send('error', id=request_id, retry_after=5,
+                          error='The agent is still warming up. Please try again shortly.')
+                return
+
+            status({'status': 'thinking'})
+            profile = DEGRADE.update(queue_depth())
+            streamed = 0
+            with runner.lease() as leased:
+                async for text, result in stream_reply(
+                    leased, message, self.session_id, timeout=timeout, scope=degrade_scope(profile),
+                    request_id=request_id, on_event=lambda event: status(run_status(event)),
+                ):
+                    if result is None:
+                        self.send('token', id=request_id, text=text[streamed:])
+                        streamed = len(text)
+                    else:
+                        events, trace = result
+
+            usage = USAGE.record(trace)
+            DEGRADE.observe_latency(trace["duration_ms"] / 1000)
+            STORE.incr('server_chat_requests_total', {'status': trace['status']})
+            STORE.incr('server_chat_tokens_total', {'type': 'prompt'}, usage['prompt_tokens'])
+            STORE.incr('server_chat_tokens_total', {'type': 'completion'}, usage['completion_tokens'])
+
+            partial = trace["status"] == "deadline_exceeded"
+            response_text = timed_out_text(events) if partial else final_text(events)
+            if not response_text:
+                self.send('error', id=request_id, error='No response from agent')
+                return
+            print(f"💬 Response: {response_text[:100]}...")
+            self.send('done', id=request_id, response=response_text, usage=usage,
+                      partial=partial, degrade_profile=profile['name'])
+
+        except RunCancelled as e:
+            print(f"🛑 {str(e)}")
+            STORE.incr('server_chat_requests_total', {'status': 'cancelled'})
+            self.send('cancelled', id=request_id)
+
+        except asyncio.CancelledError:
+            self.send('cancelled', id=request_id)
+            raise
+
+        except CircuitOpenError as e:
+            print(f"⏳ {str(e)}")
+            STORE.incr('server_chat_requests_total', {'status': 'unavailable'})
+            self.send('error', id=request_id, retry_after=int(e.retry_after),
+                      error='The AI service is temporarily unavailable. Please try again shortly.')
+
+        except Exception as e:
+            print(f"❌ Error: {str(e)}")
+            STORE.incr('server_chat_requests_total', {'status': 'error'})
+            self.send('error', id=request_id, error=f'Server error: {str(e)}')
+
+
+def chat_socket(ws):
+    """Multi-turn chat over one WebSocket per browser session (see ChatSocket)"""
+    STORE.incr('server_ws_connections_total')
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(ChatSocket(ws, client_id(request.headers, request.remote_addr)).serve())
+    finally:
+        ws.close()  # unblocks the receive if serve() failed
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+
+if sock is not None:
+    sock.route('/api/ws')(chat_socket)
+
+
 @app.route('/api/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
+    """Health check endpoint - 503 until the warm-up has finished"""
+    breaker = BREAKER.snapshot()
+    warmup = READINESS.snapshot()
+    if READINESS.warming:
+        status = 'starting'
+    elif breaker['state'] == 'closed' and warmup['state'] != 'failed':
+        status = 'healthy'
+    else:
+        status = 'degraded'
+    body = {
+        'status': status,
+        'agent': 'ready' if READINESS.ready else 'warming_up',
+        'model': MODEL_LABEL,
+        'worker_pid': os.getpid(),
+        'circuit_breaker': breaker,
+        'degrade': DEGRADE.snapshot(),
+        'runner_pool': runner.snapshot(),
+        'warmup': warmup,
+        'model_client': CONNECTIONS.snapshot(),
+    }
+    # API key state and per-client stats only with the ADMIN_TOKEN (see profiling.py)
+    if admin_authorized(admin_token(request.headers)):
+        body['model_pool'] = model_pool().snapshot()
+        body['client_limits'] = CLIENT_LIMITS.snapshot()
+    return jsonify(body), 200 if READINESS.ready else 503
+
+
+@app.route('/api/traces', methods=['GET'])
+def traces():
+    """Dump the most recent agent run traces (newest first)"""
+    limit = request.args.get('limit', default=20, type=int)
     return jsonify({
-        'status': 'healthy',
-        'agent': 'ready',
-        'model': 'gemini-2.5-flash-lite'
+        'capacity': TRACES.capacity,
+        'count': len(TRACES),
+        'traces': TRACES.recent(limit),
     })
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Metrics in Prometheus text format
+
+    The server_* counters are shared by all workers; the others describe the
+    worker that answered the scrape.
+    """
+    body = (
+        USAGE.prometheus_text()
+        + BREAKER.prometheus_text()
+        + CANCELLATIONS.prometheus_text()
+        + DEGRADE.prometheus_text()
+        + runner.prometheus_text()
+        + CONNECTIONS.prometheus_text()
+        + model_pool().prometheus_text()
+        + CLIENT_LIMITS.prometheus_text()
+        + STORE.prometheus_text()
+    )
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+def admin_only(view):
+    """Admin endpoints need the ADMIN_TOKEN; without one configured they don't exist"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not admin_authorized(admin_token(request.headers)):
+            return jsonify({'error': 'Not found'}), 404
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+@app.route('/api/admin/profile', methods=['POST'])
+@admin_only
+def profile():
+    """Sample every thread of this worker for N seconds (see profiling.py)
+
+    JSON body: {"seconds": 10, "interval_ms": 10, "mode": "cpu" | "wall"}.
+    ?format=folded returns just the collapsed stacks, for speedscope or flamegraph.pl.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        result = sample_profile(
+            data.get('seconds', 10),
+            interval_ms=data.get('interval_ms', PROFILE_INTERVAL_MS),
+            mode=data.get('mode', 'cpu'),
+        )
+    except ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+    except (TypeError, ValueError):
+        return jsonify({'error': 'seconds and interval_ms must be numbers'}), 400
+    if request.args.get('format') == 'folded':
+        return Response(result['folded'], mimetype='text/plain')
+    return jsonify(result)
+
+
+@app.route('/api/admin/profile/requests', methods=['GET', 'POST'])
+@admin_only
+def profile_requests():
+    """cProfile the next agent runs of a pipeline on this worker
+
+    POST {"pipeline": "chat", "count": 5} starts a capture; GET reports on it
+    (?format=pstats downloads the captured runs for snakeviz / flameprof).
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        pipeline = data.get('pipeline', 'chat')
+        if pipeline not in PIPELINE_TIMEOUTS:
+            return jsonify({'error': f'Unknown pipeline: {pipeline}'}), 400
+        try:
+            return jsonify(REQUEST_PROFILER.arm(pipeline, data.get('count', 5)))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'count must be a number'}), 400
+
+    if request.args.get('format') == 'pstats':
+        dump = REQUEST_PROFILER.pstats_bytes()
+        if dump is None:
+            return jsonify({'error': 'No runs captured yet'}), 404
+        return Response(dump, mimetype='application/octet-stream', headers={
+            'Content-Disposition': f'attachment; filename=requests-{os.getpid()}.pstats',
+        })
+    return jsonify(REQUEST_PROFILER.report())
+
+
 @app.route('/')
 def index():
     """Serve the HTML page"""
@@ -156,7 +667,7 @@ def index():
                 Open <code>index.html</code> in your browser to access the chat interface.
             </p>
             <p style="margin-top: 10px; font-size: 14px; color: #999;">
-                API endpoint: <code>POST /api/chat</code>
+                API endpoints: <code>POST /api/chat</code>, <code>WebSocket /api/ws</code>
             </p>
         </div>
     </body>
@@ -164,8 +675,79 @@ def index():
     """
 
 
+def serve_workers(host, port, workers):
+    """Serve with pre-forked worker processes sharing one listening socket.
+
+    Each worker runs its own threaded WSGI server (and GIL); crashed workers
+    are restarted, SIGINT/SIGTERM stop them all.
+    """
+    from werkzeug.serving import make_server
+
+    listener = socket.create_server((host, port), backlog=128)
+    listener.set_inheritable(True)
+    children = {}
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                server = make_server(host, port, app, threaded=True, fd=listener.fileno())
+                # After the fork: threads do not survive it
+                start_warm_up([runner], prime_pool=runner)
+                print(f"👷 Worker {index} (pid {os.getpid()}) ready")
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    for index in range(workers):
+        spawn(index)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            print(f"⚠️ Worker {index} (pid {pid}) exited with status {status}, restarting")
+            spawn(index)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI Agent Chat API server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_WORKERS", "0")) or None,
+        help="Serve with this many pre-forked worker processes (default: Flask's debug server)",
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == '__main__':
-    print("\n🌐 Starting Flask server on http://localhost:8080")
+    args = parse_args()
+    # Shared counters start from zero with every server start
+    STORE.reset_counters()
+    print(f"\n🌐 Starting Flask server on http://localhost:{args.port}")
     print("📱 Open index.html in your browser to use the chat interface")
     print("\nPress CTRL+C to stop the server\n")
-    app.run(debug=True, host='0.0.0.0', port=8080)
+    if args.workers:
+        print(f"👷 Starting {args.workers} worker processes")
+        serve_workers(args.host, args.port, args.workers)
+    else:
+        # Only the reloader's child process serves requests
+        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            start_warm_up([runner], prime_pool=runner)
+        app.run(debug=True, host=args.host, port=args.port)